@@ -0,0 +1,5 @@
+"""Offline benchmarks for image matching and OCR."""
+
+from .corpus import Corpus, CorpusFrame
+from .runner import STRATEGIES, BenchContext, run_benchmarks, compare_reports
+from .fake_adb import FakeDevice, read_taps
@@ -0,0 +1,122 @@
+import os
+import sys
+import json
+import logging
+import argparse
+
+from config import resource_path
+from bench.corpus import Corpus
+from bench.runner import STRATEGIES, BenchContext, run_benchmarks, compare_reports
+
+
+def parse_args(argv=None):
+    """Parses command line arguments of the benchmark runner."""
+    parser = argparse.ArgumentParser(
+        prog="python -m bench",
+        description="Бенчмарк распознавания шаблонов и OCR на корпусе размеченных скриншотов."
+    )
+    parser.add_argument("corpus", help="Каталог корпуса с файлом labels.json")
+    parser.add_argument("--templates", default=resource_path("resources/images"),
+                        help="Каталог шаблонов (по умолчанию resources/images)")
+    parser.add_argument("--strategy", action="append", choices=sorted(STRATEGIES),
+                        help="Запускаемая стратегия (можно указать несколько раз, по умолчанию все)")
+    parser.add_argument("--ocr-method", default="auto", choices=("auto", "builtin", "tesseract"),
+                        help="Способ распознавания чисел в OCRHelper")
+    parser.add_argument("--ocr-cache", type=int, default=0,
+                        help="Размер кеша результатов OCR (0 - без кеша, чтобы повторы измеряли распознавание)")
+    parser.add_argument("--learn-regions", action="store_true",
+                        help="Сужать поиск шаблонов до изученных областей (как в боте)")
+    parser.add_argument("--prefilter", type=float, default=0.0, metavar="MARGIN",
+                        help="Отсеивать шаблоны сравнением в половинном масштабе с указанным запасом "
+                             "(0 - выключено, в боте 0.9)")
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов на каждый кадр")
+    parser.add_argument("--tolerance", type=int, default=10,
+                        help="Допустимое отклонение координат совпадения в пикселях")
+    parser.add_argument("--output", help="Путь для JSON-отчета")
+    parser.add_argument("--compare", help="JSON-отчет предыдущего запуска для сравнения")
+    parser.add_argument("--verbose", action="store_true", help="Выводить журнал распознавания")
+    return parser.parse_args(argv)
+
+
+def print_report(report):
+    """Prints a compact table of the report."""
+    for strategy_name, labels in report["results"].items():
+        if not labels:
+            continue
+        print(f"\n== {strategy_name} ==")
+        print(f"{'шаблон':<32} {'n':>6} {'p50 мс':>9} {'p90 мс':>9} {'p99 мс':>9} {'в сек':>9} {'точность':>9}")
+        for label, summary in labels.items():
+            latency = summary["latency_ms"]
+            accuracy = summary["accuracy"]
+            accuracy_text = f"{accuracy * 100:.1f}%" if accuracy is not None else "-"
+            print(f"{label:<32} {summary['samples']:>6} {latency['p50']:>9.2f} {latency['p90']:>9.2f} "
+                  f"{latency['p99']:>9.2f} {summary['throughput_per_s']:>9.1f} {accuracy_text:>9}")
+
+
+def print_comparison(rows):
+    """Prints the comparison of two reports."""
+    print("\n== Сравнение с базовым запуском ==")
+    for row in rows:
+        old_p50, new_p50 = row["p50_ms"]
+        speedup = row["p50_speedup"]
+        speedup_text = f"x{speedup:.2f}" if speedup else "-"
+        accuracy_text = ""
+        if "accuracy_delta" in row:
+            accuracy_text = f", точность {row['accuracy_delta'] * 100:+.1f}%"
+        print(f"{row['strategy']}/{row['label']}: p50 {old_p50:.2f} -> {new_p50:.2f} мс "
+              f"({speedup_text}){accuracy_text}")
+
+
+def main(argv=None):
+    """Benchmark entry point."""
+    args = parse_args(argv)
+
+    # Per-match info logging would dominate the timings
+    logging.getLogger("BotLogger").setLevel(logging.DEBUG if args.verbose else logging.WARNING)
+
+    from core.image_matcher import ImageMatcher
+    from core.ocr_utils import OCRHelper
+    from core.search_regions import SearchRegionLearner
+
+    corpus = Corpus(args.corpus)
+    if not len(corpus):
+        print(f"Корпус {args.corpus} не содержит кадров", file=sys.stderr)
+        return 1
+
+    # Learned regions are kept in memory so runs do not influence each other
+    search_regions = SearchRegionLearner() if args.learn_regions else None
+    image_matcher = ImageMatcher(args.templates, search_regions, prefilter_margin=args.prefilter)
+    ocr_helper = OCRHelper(
+        method=args.ocr_method,
+        digits_dir=os.path.join(args.templates, "digits"),
+        cache_size=args.ocr_cache
+    )
+    # detect_keys should measure the same OCR configuration
+    image_matcher.ocr_helper = ocr_helper
+
+    context = BenchContext(
+        image_matcher,
+        ocr_helper,
+        repeat=args.repeat,
+        tolerance=args.tolerance
+    )
+
+    report = run_benchmarks(context, corpus, args.strategy)
+    print_report(report)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print_comparison(compare_reports(baseline, report))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"\nОтчет сохранен: {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+import os
+import sys
+import argparse
+import logging
+
+from config import resource_path
+from bench.corpus import Corpus
+from core.digit_recognizer import DigitRecognizer
+
+
+def main(argv=None):
+    """Builds reference digit glyphs from the labelled number regions of a corpus."""
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.build_digits",
+        description="Создание эталонов цифр для встроенного распознавателя из размеченного корпуса."
+    )
+    parser.add_argument("corpus", help="Каталог корпуса с файлом labels.json")
+    parser.add_argument("--output", default=resource_path("resources/images/digits"),
+                        help="Каталог эталонов (по умолчанию resources/images/digits)")
+    parser.add_argument("--samples", type=int, default=3, help="Максимум образцов на цифру")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("BotLogger").setLevel(logging.WARNING)
+
+    corpus = Corpus(args.corpus)
+    recognizer = DigitRecognizer(args.output)
+    saved = {digit: 0 for digit in range(10)}
+    skipped = 0
+
+    for frame in corpus:
+        for region in frame.numbers:
+            pairs = recognizer.extract_references(frame.crop(region["box"]), region["value"])
+            if not pairs:
+                skipped += 1
+                continue
+            for digit, glyph in pairs:
+                if saved[digit] < args.samples:
+                    DigitRecognizer.save_reference(args.output, digit, glyph, saved[digit])
+                    saved[digit] += 1
+
+    print(f"Сохранено эталонов: {sum(saved.values())} в {args.output}")
+    missing = [str(digit) for digit, count in saved.items() if count == 0]
+    if missing:
+        print(f"Нет образцов для цифр: {', '.join(missing)}")
+    if skipped:
+        print(f"Пропущено областей с несовпадающей сегментацией: {skipped}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
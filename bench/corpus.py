@@ -0,0 +1,117 @@
+import os
+import json
+import logging
+from typing import Dict, List, Optional, Tuple, Any
+
+import cv2
+import numpy as np
+
+
+class CorpusFrame:
+    """A single labelled screenshot of the corpus."""
+
+    def __init__(self, path: str, labels: Dict[str, Any]):
+        self.path = path
+        self.name = os.path.basename(path)
+
+        # Expected template locations: (x, y) if present on the frame, None if absent
+        self.templates: Dict[str, Optional[Tuple[int, int]]] = {}
+        for template_name, location in labels.get("templates", {}).items():
+            self.templates[template_name] = tuple(location) if location is not None else None
+
+        # Expected key count for detect_keys (None if the frame is not labelled)
+        self.keys: Optional[int] = labels.get("keys")
+
+        # Regions with numbers for recognize_number: [{"box": [x, y, w, h], "value": 12}]
+        self.numbers: List[Dict[str, Any]] = labels.get("numbers", [])
+
+        self._data: Optional[bytes] = None
+        self._image: Optional[np.ndarray] = None
+
+    @property
+    def data(self) -> bytes:
+        """Raw PNG bytes, exactly as `AdbController.capture_screen` would return them."""
+        if self._data is None:
+            with open(self.path, "rb") as f:
+                self._data = f.read()
+        return self._data
+
+    @property
+    def image(self) -> np.ndarray:
+        """Decoded BGR image of the frame."""
+        if self._image is None:
+            self._image = cv2.imdecode(np.frombuffer(self.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return self._image
+
+    def crop(self, box: List[int]) -> np.ndarray:
+        """
+        Crops a region of the frame.
+
+        Args:
+            box: Region as [x, y, width, height]
+
+        Returns:
+            Cropped BGR image
+        """
+        x, y, w, h = box
+        return self.image[y:y + h, x:x + w]
+
+
+class Corpus:
+    """
+    A directory of recorded screenshots with a `labels.json` file.
+
+    Layout of `labels.json`:
+
+        {
+            "frames": [
+                {
+                    "file": "victory_01.png",
+                    "templates": {"victory.png": [650, 120], "defeat.png": null},
+                    "keys": 12,
+                    "numbers": [{"box": [700, 600, 60, 30], "value": 12}]
+                }
+            ]
+        }
+
+    Only templates listed for a frame are scored for accuracy; a `null`
+    location means the template must not be found on that frame.
+    """
+
+    LABELS_FILE = "labels.json"
+
+    def __init__(self, corpus_dir: str):
+        self.corpus_dir = corpus_dir
+        self.logger = logging.getLogger("BotLogger")
+        self.frames: List[CorpusFrame] = []
+
+        self.load()
+
+    def load(self) -> None:
+        """Loads frame descriptions from the labels file."""
+        labels_path = os.path.join(self.corpus_dir, self.LABELS_FILE)
+        if not os.path.exists(labels_path):
+            raise FileNotFoundError(f"Файл разметки корпуса не найден: {labels_path}")
+
+        with open(labels_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        for labels in data.get("frames", []):
+            frame_path = os.path.join(self.corpus_dir, labels["file"])
+            if not os.path.exists(frame_path):
+                self.logger.warning(f"⚠ Кадр корпуса не найден: {frame_path}")
+                continue
+            self.frames.append(CorpusFrame(frame_path, labels))
+
+    def template_names(self) -> List[str]:
+        """Returns the sorted list of all templates labelled anywhere in the corpus."""
+        names = set()
+        for frame in self.frames:
+            names.update(frame.templates)
+        return sorted(names)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __iter__(self):
+        return iter(self.frames)
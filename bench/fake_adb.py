@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Fake `adb` executable for offline end-to-end runs.
+
+Point `config["adb"]["path"]` at this script (or at `fake_adb.cmd` on Windows)
+and set the FAKE_ADB_SCENARIO environment variable to a scenario directory
+containing `scenario.json` and the frames it references:
+
+    {
+        "device": "emulator-5554",
+        "latency_ms": 20,
+        "latency_jitter_ms": 10,
+        "screencap_latency_ms": 150,
+        "disconnects": [[300, 330]],
+        "failure_rate": 0.0,
+        "shell_crlf": true,
+        "loop": true,
+        "steps": [
+            {"name": "select", "frame": "select.png", "advance": {"tap": [1227, 832], "radius": 40}},
+            {"name": "battle", "frame": "battle.png", "advance": {"after": 30}},
+            {"name": "victory", "frame": "victory.png", "advance": {"tap": [743, 819]}, "next": "select"}
+        ]
+    }
+
+A step is left on a tap within `radius` of `tap` ("any" accepts every tap),
+after `after` seconds or after `captures` screenshots, whichever comes first.
+`disconnects` are [start, end) windows in seconds since the first command.
+
+Every invocation is a separate process, so the scenario position is kept in
+`state.json` and received taps are appended to `taps.jsonl` inside the state
+directory (FAKE_ADB_STATE, by default `<scenario>/.fake_adb`).
+Run `fake_adb.py fake-reset` to start the scenario over.
+
+Only the standard library is used so the script runs with any interpreter.
+"""
+import os
+import sys
+import json
+import time
+import random
+from contextlib import contextmanager
+
+SCENARIO_ENV = "FAKE_ADB_SCENARIO"
+STATE_ENV = "FAKE_ADB_STATE"
+
+NO_DEVICE_ERROR = b"error: no devices/emulators found\n"
+
+
+@contextmanager
+def _locked(path):
+    """Holds an exclusive lock on `path` so concurrent invocations see consistent state."""
+    with open(path, "a+b") as lock_file:
+        if os.name == "nt":
+            import msvcrt
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.01)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class FakeDevice:
+    """Scenario-driven device state shared by all fake adb invocations."""
+
+    def __init__(self, scenario_dir, state_dir=None):
+        self.scenario_dir = scenario_dir
+        self.state_dir = state_dir or os.path.join(scenario_dir, ".fake_adb")
+        os.makedirs(self.state_dir, exist_ok=True)
+
+        with open(os.path.join(scenario_dir, "scenario.json"), "r", encoding="utf-8") as f:
+            self.scenario = json.load(f)
+
+        self.steps = self.scenario.get("steps", [])
+        self.step_index = {step.get("name", str(i)): i for i, step in enumerate(self.steps)}
+
+        self.state_file = os.path.join(self.state_dir, "state.json")
+        self.taps_file = os.path.join(self.state_dir, "taps.jsonl")
+        self.lock_file = os.path.join(self.state_dir, "state.lock")
+
+    # --- state persistence -------------------------------------------------
+
+    def _load_state(self, now):
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"started": now, "step": 0, "entered": now, "captures": 0}
+
+    def _save_state(self, state):
+        temp_file = self.state_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temp_file, self.state_file)
+
+    def reset(self):
+        """Starts the scenario over and clears the recorded taps."""
+        with _locked(self.lock_file):
+            for path in (self.state_file, self.taps_file):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    # --- scenario logic ----------------------------------------------------
+
+    def _next_index(self, index):
+        step = self.steps[index]
+        if "next" in step:
+            return self.step_index[step["next"]]
+        if index + 1 < len(self.steps):
+            return index + 1
+        return 0 if self.scenario.get("loop", True) else index
+
+    def _enter(self, state, index, now):
+        state["step"] = index
+        state["entered"] = now
+        state["captures"] = 0
+
+    def _advance_by_time(self, state, now):
+        """Leaves steps whose `after`/`captures` condition has already been met."""
+        for _ in range(len(self.steps)):
+            advance = self.steps[state["step"]].get("advance", {})
+            timed_out = "after" in advance and now - state["entered"] >= advance["after"]
+            captured = "captures" in advance and state["captures"] >= advance["captures"]
+            if not (timed_out or captured):
+                break
+            entered = state["entered"] + advance["after"] if timed_out else now
+            self._enter(state, self._next_index(state["step"]), entered)
+
+    def is_disconnected(self, state, now):
+        """Checks the scripted disconnect windows and the random failure rate."""
+        elapsed = now - state["started"]
+        for start, end in self.scenario.get("disconnects", []):
+            if start <= elapsed < end:
+                return True
+        return random.random() < self.scenario.get("failure_rate", 0.0)
+
+    def _sleep_latency(self, extra_ms=0):
+        latency_ms = self.scenario.get("latency_ms", 0) + extra_ms
+        jitter_ms = self.scenario.get("latency_jitter_ms", 0)
+        if jitter_ms:
+            latency_ms += random.uniform(0, jitter_ms)
+        if latency_ms > 0:
+            time.sleep(latency_ms / 1000.0)
+
+    # --- commands ----------------------------------------------------------
+
+    def devices(self, out, err):
+        now = time.time()
+        with _locked(self.lock_file):
+            state = self._load_state(now)
+            disconnected = self.is_disconnected(state, now)
+            self._save_state(state)
+
+        self._sleep_latency()
+        out.write(b"List of devices attached\n")
+        if not disconnected:
+            out.write(f"{self.scenario.get('device', 'emulator-5554')}\tdevice\n".encode("utf-8"))
+        out.write(b"\n")
+        return 0
+
+    def tap(self, x, y, out, err):
+        now = time.time()
+        self._sleep_latency()
+
+        with _locked(self.lock_file):
+            state = self._load_state(now)
+            if self.is_disconnected(state, now):
+                self._save_state(state)
+                err.write(NO_DEVICE_ERROR)
+                return 1
+
+            self._advance_by_time(state, now)
+            step = self.steps[state["step"]] if self.steps else {}
+            advanced = False
+
+            advance = step.get("advance", {})
+            target = advance.get("tap")
+            if target == "any":
+                advanced = True
+            elif target is not None:
+                radius = advance.get("radius", 30)
+                advanced = (x - target[0]) ** 2 + (y - target[1]) ** 2 <= radius ** 2
+
+            with open(self.taps_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps({
+                    "t": now, "x": x, "y": y,
+                    "step": step.get("name", str(state["step"])),
+                    "advanced": advanced
+                }) + "\n")
+
+            if advanced:
+                self._enter(state, self._next_index(state["step"]), now)
+            self._save_state(state)
+        return 0
+
+    def screencap(self, out, err, crlf):
+        now = time.time()
+        self._sleep_latency(self.scenario.get("screencap_latency_ms", 0))
+
+        with _locked(self.lock_file):
+            state = self._load_state(now)
+            if self.is_disconnected(state, now):
+                self._save_state(state)
+                err.write(NO_DEVICE_ERROR)
+                return 1
+
+            if not self.steps:
+                self._save_state(state)
+                err.write(b"fake adb: scenario has no steps\n")
+                return 1
+
+            self._advance_by_time(state, now)
+            frame = self.steps[state["step"]]["frame"]
+            state["captures"] += 1
+            self._save_state(state)
+
+        with open(os.path.join(self.scenario_dir, frame), "rb") as f:
+            data = f.read()
+
+        # Legacy `adb shell` translates LF to CRLF; AdbController undoes exactly that
+        if crlf:
+            data = data.replace(b"\n", b"\r\n")
+        out.write(data)
+        return 0
+
+    def run(self, args, out, err):
+        """Executes one adb command line (without the program name)."""
+        # Device selection is accepted and ignored: the fake serves one device
+        while args and args[0] in ("-s", "-t", "-H", "-P"):
+            args = args[2:]
+        while args and args[0] in ("-d", "-e"):
+            args = args[1:]
+
+        if not args:
+            err.write(b"fake adb: no command\n")
+            return 1
+
+        command = args[0]
+        if command == "devices":
+            return self.devices(out, err)
+        if command in ("start-server", "kill-server", "connect", "disconnect"):
+            return 0
+        if command == "version":
+            out.write(b"Android Debug Bridge version 1.0.41 (fake)\n")
+            return 0
+        if command == "fake-reset":
+            self.reset()
+            return 0
+
+        if command in ("shell", "exec-out"):
+            shell_args = args[1:]
+            if shell_args[:2] == ["input", "tap"] and len(shell_args) >= 4:
+                return self.tap(int(float(shell_args[2])), int(float(shell_args[3])), out, err)
+            if shell_args[:1] == ["screencap"]:
+                crlf = command == "shell" and self.scenario.get("shell_crlf", True)
+                return self.screencap(out, err, crlf)
+
+        err.write(f"fake adb: unsupported command: {' '.join(args)}\n".encode("utf-8"))
+        return 1
+
+
+def read_taps(state_dir):
+    """
+    Reads the taps recorded by the fake device.
+
+    Args:
+        state_dir: State directory of the fake device
+
+    Returns:
+        List of {"t", "x", "y", "step", "advanced"} dictionaries in arrival order
+    """
+    taps_file = os.path.join(state_dir, "taps.jsonl")
+    if not os.path.exists(taps_file):
+        return []
+    with open(taps_file, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main(argv=None):
+    """Entry point used when the script is invoked as `adb`."""
+    scenario_dir = os.environ.get(SCENARIO_ENV)
+    if not scenario_dir:
+        sys.stderr.write(f"fake adb: {SCENARIO_ENV} is not set\n")
+        return 1
+
+    device = FakeDevice(scenario_dir, os.environ.get(STATE_ENV))
+    out = sys.stdout.buffer
+    err = sys.stderr.buffer
+    code = device.run(list(sys.argv[1:] if argv is None else argv), out, err)
+    out.flush()
+    err.flush()
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
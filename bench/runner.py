@@ -0,0 +1,247 @@
+import time
+import platform
+import datetime
+from typing import Dict, List, Callable, Any, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from bench.corpus import Corpus
+
+
+# Registered benchmark strategies: name -> function(context, corpus) -> {label: [Sample, ...]}
+STRATEGIES: Dict[str, Callable] = {}
+
+
+def strategy(name: str):
+    """Registers a benchmark strategy under the given name."""
+    def decorator(func):
+        STRATEGIES[name] = func
+        return func
+    return decorator
+
+
+class Sample:
+    """Result of a single timed call."""
+
+    __slots__ = ("latency", "correct", "outcome")
+
+    def __init__(self, latency: float, correct: Optional[bool], outcome: Optional[str] = None):
+        self.latency = latency
+        self.correct = correct
+        self.outcome = outcome
+
+
+class BenchContext:
+    """Objects under test shared by all strategies of a run."""
+
+    def __init__(self, image_matcher, ocr_helper, repeat: int = 5, tolerance: int = 10):
+        self.image_matcher = image_matcher
+        self.ocr_helper = ocr_helper
+        self.repeat = repeat
+        self.tolerance = tolerance
+
+    def timed(self, func: Callable, *args, **kwargs) -> Tuple[float, Any]:
+        """Calls `func` once and returns (elapsed seconds, result)."""
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        return time.perf_counter() - start, result
+
+
+def _location_outcome(found: Optional[Tuple[int, int]],
+                      expected: Optional[Tuple[int, int]],
+                      tolerance: int) -> str:
+    """Classifies a match result against its label as tp/fp/fn/tn."""
+    if expected is None:
+        return "fp" if found else "tn"
+    if not found:
+        return "fn"
+    dx = abs(found[0] - expected[0])
+    dy = abs(found[1] - expected[1])
+    # A match at the wrong place is both a miss and a false alarm; count it as fp
+    return "tp" if dx <= tolerance and dy <= tolerance else "fp"
+
+
+@strategy("find_in_screen")
+def bench_find_in_screen(context: BenchContext, corpus: Corpus) -> Dict[str, List[Sample]]:
+    """Times `ImageMatcher.find_in_screen` for every labelled template on every frame."""
+    results: Dict[str, List[Sample]] = {}
+    matcher = context.image_matcher
+
+    for template_name in corpus.template_names():
+        # Warm-up: load the template outside of the timed section
+        matcher.load_template(template_name)
+        samples = results.setdefault(template_name, [])
+
+        for frame in corpus:
+            expected = frame.templates.get(template_name, "unlabelled")
+            for _ in range(context.repeat):
+                latency, found = context.timed(matcher.find_in_screen, frame.data, template_name)
+                if expected == "unlabelled":
+                    samples.append(Sample(latency, None))
+                    continue
+                outcome = _location_outcome(found, expected, context.tolerance)
+                samples.append(Sample(latency, outcome in ("tp", "tn"), outcome))
+
+    return results
+
+
+def _number_sample(latency: float, value: Optional[int], expected: int) -> Sample:
+    """Scores a recognized number; None means the recognizer fell back to its default."""
+    if value is None:
+        return Sample(latency, False, "fallback")
+    return Sample(latency, value == expected, "ok" if value == expected else "wrong")
+
+
+@strategy("detect_keys")
+def bench_detect_keys(context: BenchContext, corpus: Corpus) -> Dict[str, List[Sample]]:
+    """
+    Times `ImageMatcher.detect_keys` on frames labelled with a key count.
+
+    The production default (12 keys) is replaced by None, so a failed
+    recognition is counted as a fallback and never scored as correct.
+    """
+    samples: List[Sample] = []
+
+    for frame in corpus:
+        if frame.keys is None:
+            continue
+        for _ in range(context.repeat):
+            latency, keys = context.timed(context.image_matcher.detect_keys, frame.data, None)
+            samples.append(_number_sample(latency, keys, frame.keys))
+
+    return {"key_icon.png": samples} if samples else {}
+
+
+@strategy("recognize_number")
+def bench_recognize_number(context: BenchContext, corpus: Corpus) -> Dict[str, List[Sample]]:
+    """Times `OCRHelper.recognize_number` on labelled number regions (fallbacks count as failures)."""
+    samples: List[Sample] = []
+
+    for frame in corpus:
+        for region in frame.numbers:
+            image = frame.crop(region["box"])
+            for _ in range(context.repeat):
+                latency, value = context.timed(context.ocr_helper.recognize_number, image, default_val=None)
+                samples.append(_number_sample(latency, value, region["value"]))
+
+    return {"number": samples} if samples else {}
+
+
+def summarize(samples: List[Sample]) -> Dict[str, Any]:
+    """
+    Aggregates samples into latency percentiles, throughput and accuracy.
+
+    Args:
+        samples: Timed samples of one template/strategy pair
+
+    Returns:
+        Dictionary suitable for JSON serialization
+    """
+    latencies = np.array([s.latency for s in samples], dtype=np.float64) * 1000.0
+    total_seconds = latencies.sum() / 1000.0
+
+    summary: Dict[str, Any] = {
+        "samples": len(samples),
+        "latency_ms": {
+            "min": float(latencies.min()),
+            "mean": float(latencies.mean()),
+            "p50": float(np.percentile(latencies, 50)),
+            "p90": float(np.percentile(latencies, 90)),
+            "p99": float(np.percentile(latencies, 99)),
+            "max": float(latencies.max()),
+        },
+        "throughput_per_s": len(samples) / total_seconds if total_seconds > 0 else 0.0,
+    }
+
+    scored = [s for s in samples if s.correct is not None]
+    if scored:
+        summary["accuracy"] = sum(1 for s in scored if s.correct) / len(scored)
+        outcomes = [s.outcome for s in scored if s.outcome]
+        if outcomes:
+            keys = ("tp", "fp", "fn", "tn") if outcomes[0] in ("tp", "fp", "fn", "tn") else ("ok", "wrong", "fallback")
+            summary["outcomes"] = {key: outcomes.count(key) for key in keys}
+    else:
+        summary["accuracy"] = None
+
+    return summary
+
+
+def run_benchmarks(context: BenchContext,
+                   corpus: Corpus,
+                   strategy_names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Runs the selected strategies over the corpus.
+
+    Args:
+        context: Objects under test and run parameters
+        corpus: Loaded frame corpus
+        strategy_names: Strategies to run (all registered ones if None)
+
+    Returns:
+        Report dictionary with metadata and per-strategy, per-template summaries
+    """
+    names = strategy_names or list(STRATEGIES)
+    unknown = [name for name in names if name not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"Неизвестные стратегии: {', '.join(unknown)}")
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "corpus": corpus.corpus_dir,
+            "frames": len(corpus),
+            "repeat": context.repeat,
+            "ocr_method": getattr(context.ocr_helper, "method", None),
+            "learn_regions": getattr(context.image_matcher, "search_regions", None) is not None,
+            "prefilter_margin": getattr(context.image_matcher, "prefilter_margin", 0.0),
+            "tolerance_px": context.tolerance,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+        },
+        "results": {}
+    }
+
+    for name in names:
+        per_label = STRATEGIES[name](context, corpus)
+        report["results"][name] = {
+            label: summarize(samples) for label, samples in per_label.items() if samples
+        }
+
+    return report
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Compares two reports produced by `run_benchmarks`.
+
+    Args:
+        baseline: Earlier report
+        current: New report
+
+    Returns:
+        Rows with p50/p90 latency ratios and accuracy differences for common entries
+    """
+    rows = []
+    for strategy_name, labels in current.get("results", {}).items():
+        base_labels = baseline.get("results", {}).get(strategy_name, {})
+        for label, summary in labels.items():
+            base = base_labels.get(label)
+            if not base:
+                continue
+
+            row = {"strategy": strategy_name, "label": label}
+            for key in ("p50", "p90"):
+                old = base["latency_ms"][key]
+                new = summary["latency_ms"][key]
+                row[f"{key}_ms"] = (old, new)
+                row[f"{key}_speedup"] = old / new if new > 0 else None
+
+            if base.get("accuracy") is not None and summary.get("accuracy") is not None:
+                row["accuracy_delta"] = summary["accuracy"] - base["accuracy"]
+
+            rows.append(row)
+
+    return rows
@@ -0,0 +1,527 @@
+"""
+Fast-forward simulation of the bot against a model of the game.
+
+Time, adb and the screen are replaced: a virtual clock advances instantly
+through sleeps and timeouts, a game model changes screens in response to
+taps and time, and a matcher reports which templates the current screen
+shows. The real BotEngine flow runs unchanged, so a day of battles takes
+seconds and the effect of timing changes on battles per hour can be
+measured before deploying them.
+
+    python -m bench.simulation --hours 24 --seed 1 --set bot.battle_timeout=90
+"""
+import sys
+import json
+import math
+import time
+import random
+import logging
+import threading
+import argparse
+from typing import Dict, Any, Optional, Callable, Tuple, List
+
+from core.image_matcher import ImageMatcher
+from core.cancellation import CancellationToken
+
+
+class VirtualClock:
+    """
+    Clock whose time only moves when something sleeps or spends simulated time.
+
+    Only the thread that created the clock (the one running the engine) moves
+    time. Other threads, such as the frame pipeline's capture thread, run
+    concurrently with it: their sleeps and costs wait until the engine's time
+    reaches the end of them. A timed sleep of the engine with a token jumps to
+    the next such moment first, so work in the background thread can finish
+    and cut the sleep short.
+    """
+
+    # Simulated runs start at a fixed epoch so reports are reproducible
+    EPOCH = 1_700_000_000.0
+
+    # Real time a background thread waits for the engine before moving time itself,
+    # e.g. while the engine joins it
+    IDLE_GRACE = 0.05
+    # Real time the engine waits for woken background threads to get back to the clock
+    SETTLE_LIMIT = 0.5
+
+    def __init__(self):
+        self.now = 0.0
+        self.deadline: Optional[float] = None
+        self.on_deadline: Optional[Callable[[], None]] = None
+        self._deadline_reached = False
+        self._driver = threading.get_ident()
+        self._changed = threading.Condition()
+        # Moments background threads are waiting for, and threads that got past their wait
+        self._wakeups: List[float] = []
+        self._running: List[threading.Thread] = []
+
+    def time(self) -> float:
+        return self.EPOCH + self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        """Moves time forward and fires the deadline callback once it is reached."""
+        if threading.get_ident() != self._driver:
+            self._wait_until(self.now + max(0.0, seconds), None)
+            return
+        self._move_to(self.now + max(0.0, seconds))
+
+    def sleep(self, seconds: float, cancel_token: Optional[CancellationToken] = None) -> bool:
+        if cancel_token is not None and cancel_token.is_cancelled():
+            return True
+        if threading.get_ident() != self._driver:
+            return self._wait_until(self.now + seconds, cancel_token)
+
+        target = self.now + seconds
+        if cancel_token is not None:
+            # Background work that ends before the sleep does may cancel the token
+            while True:
+                with self._changed:
+                    due = [moment for moment in self._wakeups if moment < target]
+                if not due:
+                    break
+                self._move_to(min(due))
+                if self._settle(cancel_token):
+                    return True
+        self._move_to(target)
+        return cancel_token.is_cancelled() if cancel_token is not None else False
+
+    def _move_to(self, moment: float) -> None:
+        with self._changed:
+            self.now = max(self.now, moment)
+            self._changed.notify_all()
+        if self.deadline is not None and self.now >= self.deadline and not self._deadline_reached:
+            self._deadline_reached = True
+            if self.on_deadline:
+                self.on_deadline()
+
+    def _settle(self, cancel_token: CancellationToken) -> bool:
+        """Waits until the woken background threads wait again, finish or cancel the token."""
+        give_up = time.perf_counter() + self.SETTLE_LIMIT
+        with self._changed:
+            while any(moment <= self.now for moment in self._wakeups) or \
+                    any(thread.is_alive() for thread in self._running):
+                if cancel_token.is_cancelled() or time.perf_counter() > give_up:
+                    break
+                self._changed.wait(0.001)
+            self._running = [thread for thread in self._running if thread.is_alive()]
+        return cancel_token.is_cancelled()
+
+    def _wait_until(self, moment: float, cancel_token: Optional[CancellationToken]) -> bool:
+        """Blocks a background thread until the engine's time reaches the moment."""
+        thread = threading.current_thread()
+        with self._changed:
+            if thread in self._running:
+                self._running.remove(thread)
+            self._wakeups.append(moment)
+            try:
+                while self.now < moment:
+                    if cancel_token is not None and cancel_token.is_cancelled():
+                        break
+                    if not self._changed.wait(self.IDLE_GRACE) and self.now < moment:
+                        # The engine is blocked outside the clock: time passes for this thread alone
+                        break
+            finally:
+                self._wakeups.remove(moment)
+                self._running.append(thread)
+                self._changed.notify_all()
+        return cancel_token.is_cancelled() if cancel_token is not None else False
+
+
+class SimulationProfile:
+    """Parameters of the game model and of simulated operation costs (seconds)."""
+
+    DEFAULTS = {
+        "load_time": 8.0,              # Confirmation -> battle screen
+        "battle_mean": 60.0,           # Battle duration
+        "battle_stddev": 15.0,
+        "battle_stuck_rate": 0.01,     # Share of battles that never end on their own
+        "win_rate": 0.6,               # Against an opponent of equal power
+        "own_power": 1000,
+        "power_mean": 1000,            # Opponent powers on the selection screen
+        "power_stddev": 250,
+        "power_win_slope": 0.0008,     # Win probability change per point of power advantage
+        "keys_min": 10,
+        "keys_max": 20,
+        "screen_transition": 1.5,      # Result / menu screen change after a tap
+        "disconnects_per_hour": 2.0,
+        "waiting_time": 10.0,          # "Waiting for server" before "Contact us" appears
+        "reconnect_time": 6.0,         # After tapping reconnect
+        "capture_cost": 0.25,          # adb screencap
+        "tap_cost": 0.08,              # adb input tap
+        "decode_cost": 0.03,
+        "match_cost": 0.02,            # One template match
+        "tap_radius": 40,              # Taps farther than this from a button miss it
+    }
+
+    def __init__(self, values: Optional[Dict[str, Any]] = None):
+        unknown = set(values or {}) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError(f"Неизвестные параметры профиля: {', '.join(sorted(unknown))}")
+        for key, value in {**self.DEFAULTS, **(values or {})}.items():
+            setattr(self, key, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.DEFAULTS}
+
+
+class GameModel:
+    """
+    Screen-level model of the game.
+
+    Screens: selection, confirm, loading, battle, victory, defeat, waiting
+    (for server), contact (us) and blank (between result and selection).
+    Taps are mapped to the nearest named tap point of the flow.
+    """
+
+    # Templates visible on every screen
+    SCREEN_TEMPLATES = {
+        "selection": {"cheak.png"},
+        "confirm": {"confirm_battle.png"},
+        "loading": set(),
+        "battle": {"auto_battle.png"},
+        "victory": {"victory.png", "key_icon.png"},
+        "defeat": {"defeat.png"},
+        "waiting": {"waiting_for_server.png"},
+        "contact": {"contact_us.png"},
+        "blank": set(),
+    }
+
+    def __init__(self, clock: VirtualClock, profile: SimulationProfile, taps: Dict[str, Tuple[int, int]], seed: int):
+        self.clock = clock
+        self.profile = profile
+        self.taps = taps
+        self.rng = random.Random(seed)
+
+        self.screen = "selection"
+        self._pending: Optional[Tuple[float, str]] = None  # (time, screen) of a scheduled change
+        self._resume_screen = "selection"
+        self.keys_on_screen = 0
+
+        # Opponent rows of the selection screen: powers and the selected row
+        self.opponent_count = sum(1 for name in taps if name.startswith("opponent_"))
+        self.opponent_powers: List[int] = []
+        self.selected_opponent = 0
+        self._draw_opponents()
+
+        self.stats = {"battles": 0, "victories": 0, "defeats": 0, "disconnects": 0, "stuck_battles": 0}
+        self._next_disconnect = self._draw_disconnect()
+
+    def _draw_disconnect(self) -> float:
+        rate = self.profile.disconnects_per_hour / 3600.0
+        return self.clock.now + (self.rng.expovariate(rate) if rate > 0 else math.inf)
+
+    def _draw_opponents(self) -> None:
+        self.opponent_powers = [max(1, int(self.rng.gauss(self.profile.power_mean, self.profile.power_stddev)))
+                                for _ in range(max(1, self.opponent_count))]
+        self.selected_opponent = 0
+
+    def _win_probability(self) -> float:
+        advantage = self.profile.own_power - self.opponent_powers[self.selected_opponent]
+        return min(0.98, max(0.02, self.profile.win_rate + self.profile.power_win_slope * advantage))
+
+    def _schedule(self, delay: float, screen: str) -> None:
+        self._pending = (self.clock.now + delay, screen)
+
+    def update(self) -> str:
+        """Applies time-driven changes and returns the current screen."""
+        now = self.clock.now
+
+        if now >= self._next_disconnect and self.screen not in ("waiting", "contact"):
+            self.stats["disconnects"] += 1
+            self._resume_screen = "battle" if self.screen in ("loading", "battle") else "selection"
+            self.screen = "waiting"
+            self._pending = (now + self.profile.waiting_time, "contact")
+            self._next_disconnect = math.inf
+
+        while self._pending and now >= self._pending[0]:
+            _, screen = self._pending
+            self._pending = None
+            self._enter(screen)
+
+        return self.screen
+
+    def _enter(self, screen: str) -> None:
+        self.screen = screen
+        if screen == "battle" and self._pending is None:
+            if self.rng.random() < self.profile.battle_stuck_rate:
+                self.stats["stuck_battles"] += 1
+                return
+            duration = max(5.0, self.rng.gauss(self.profile.battle_mean, self.profile.battle_stddev))
+            won = self.rng.random() < self._win_probability()
+            self._schedule(duration, "victory" if won else "defeat")
+        elif screen == "victory":
+            self.stats["victories"] += 1
+            self.keys_on_screen = self.rng.randint(self.profile.keys_min, self.profile.keys_max)
+        elif screen == "defeat":
+            self.stats["defeats"] += 1
+        elif screen == "selection":
+            self._draw_opponents()
+            if self._next_disconnect == math.inf:
+                self._next_disconnect = self._draw_disconnect()
+
+    def _tap_name(self, x: int, y: int) -> Optional[str]:
+        best, best_distance = None, float(self.profile.tap_radius)
+        for name, (tap_x, tap_y) in self.taps.items():
+            distance = math.hypot(tap_x - x, tap_y - y)
+            if distance <= best_distance:
+                best, best_distance = name, distance
+        return best
+
+    def tap(self, x: int, y: int) -> None:
+        """Reacts to a tap on the current screen."""
+        screen = self.update()
+        name = self._tap_name(x, y)
+        delay = self.profile.screen_transition
+
+        if screen == "selection" and name == "start_battle":
+            self._schedule(delay, "confirm")
+        elif screen == "selection" and name == "refresh_opponents":
+            self._draw_opponents()
+        elif screen == "selection" and name and name.startswith("opponent_"):
+            self.selected_opponent = int(name.split("_")[1])
+        elif screen == "confirm" and name == "confirm_battle":
+            self.stats["battles"] += 1
+            self.screen = "loading"
+            self._schedule(self.profile.load_time, "battle")
+        elif screen in ("victory", "defeat") and name == "exit_after_win":
+            self.screen = "blank"
+            self._schedule(delay, "selection")
+        elif screen == "battle" and self._pending is None and name in ("back_button", "exit_after_win"):
+            # Leaving a stuck battle
+            self._schedule(delay, "selection")
+        elif screen == "contact" and name == "reconnect_button":
+            self.screen = "blank"
+            self._schedule(self.profile.reconnect_time, self._resume_screen)
+
+    def templates(self) -> set:
+        return self.SCREEN_TEMPLATES[self.update()]
+
+
+class SimulatedAdb:
+    """adb replacement backed by the game model."""
+
+    def __init__(self, game: GameModel, clock: VirtualClock, profile: SimulationProfile):
+        self.game = game
+        self.clock = clock
+        self.profile = profile
+        self.cancel_token: Optional[CancellationToken] = None
+        self.captures = 0
+        self.taps = 0
+
+    def check_connection(self) -> bool:
+        return True
+
+    def capture_screen(self) -> Optional[bytes]:
+        if self.cancel_token is not None and self.cancel_token.is_cancelled():
+            return None
+        self.clock.advance(self.profile.capture_cost)
+        self.captures += 1
+        return self.game.update().encode("ascii")
+
+    def tap(self, x: int, y: int, add_randomness: bool = True) -> bool:
+        if self.cancel_token is not None and self.cancel_token.is_cancelled():
+            return False
+        self.clock.advance(self.profile.tap_cost)
+        self.taps += 1
+        self.game.tap(x, y)
+        return True
+
+
+class SimulatedMatcher(ImageMatcher):
+    """ImageMatcher whose frames are screen names of the game model."""
+
+    def __init__(self, game: GameModel, clock: VirtualClock, profile: SimulationProfile):
+        from config import config
+        super().__init__(template_dir="", clock=clock,
+                         pipeline_depth=config.get("matcher", "pipeline_depth", 1),
+                         max_frame_age=config.get("matcher", "max_frame_age", 2.0))
+        self.game = game
+        self.profile = profile
+        self.matches = 0
+
+    @staticmethod
+    def screen_size(screen_data: bytes) -> Optional[Tuple[int, int]]:
+        return ImageMatcher.REFERENCE_SIZE
+
+    def decode_screen(self, screen_data: bytes):
+        self.clock.advance(self.profile.decode_cost)
+        return screen_data.decode("ascii") if screen_data else None
+
+    def find_in_image(self, screen_img, template_name: str, threshold: float = 0.8, roi=None):
+        self.clock.advance(self.profile.match_cost)
+        self.matches += 1
+        return (0, 0) if template_name in GameModel.SCREEN_TEMPLATES.get(screen_img, ()) else None
+
+    def detect_keys(self, screen_data: bytes, default_val: Optional[int] = 12) -> Optional[int]:
+        return self.game.keys_on_screen if screen_data == b"victory" else 0
+
+    def read_numbers(self, screen_img, regions, min_val: int = 0, max_val: int = 10 ** 9):
+        self.clock.advance(self.profile.match_cost)
+        if screen_img != "selection":
+            return [None] * len(regions)
+        return list(self.game.opponent_powers[:len(regions)])
+
+
+def simulate(hours: float = 24.0,
+             seed: int = 1,
+             profile: Optional[SimulationProfile] = None,
+             flow_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Runs the bot engine against the game model for the given simulated time.
+
+    Args:
+        hours: Simulated duration
+        seed: Random seed of the game model
+        profile: Game model and cost parameters
+        flow_path: Flow description to test (resources/flow.json by default)
+
+    Returns:
+        Report dictionary
+    """
+    from core.bot_engine import BotEngine
+
+    profile = profile or SimulationProfile()
+    clock = VirtualClock()
+
+    # The game needs the tap points before the engine exists; load them the same way
+    from core.state_graph import StateGraph
+    if flow_path is None:
+        from config import resource_path
+        flow_path = resource_path("resources/flow.json")
+    flow = StateGraph.load(flow_path)
+    taps = dict(flow.taps)
+    taps.update({f"opponent_{index}": row["tap"] for index, row in enumerate(flow.opponents) if row["tap"]})
+
+    game = GameModel(clock, profile, taps, seed)
+    adb = SimulatedAdb(game, clock, profile)
+    matcher = SimulatedMatcher(game, clock, profile)
+    engine = BotEngine(adb, matcher, flow_path=flow_path, clock=clock)
+
+    # The watchdog runs on real time in its own thread; the flow's own checks are simulated
+    engine.watchdog.interval = 0
+
+    # Virtual time spent per state
+    state_time: Dict[str, float] = {}
+
+    def measured(state_name, handler):
+        def run():
+            started = clock.now
+            try:
+                return handler()
+            finally:
+                state_time[state_name] = state_time.get(state_name, 0.0) + clock.now - started
+        return run
+
+    engine.state_actions = {
+        state: measured(state.name, handler) for state, handler in engine.state_actions.items()
+    }
+
+    def stop_engine():
+        engine.running.clear()
+        engine.cancel_token.cancel()
+
+    clock.deadline = hours * 3600.0
+    clock.on_deadline = stop_engine
+
+    wall_start = time.perf_counter()
+    engine.start(background=False)
+    engine.keys_executor.shutdown(wait=True)
+    wall_seconds = time.perf_counter() - wall_start
+
+    simulated_hours = clock.now / 3600.0
+    stats = dict(engine.stats)
+    return {
+        "meta": {
+            "hours": hours,
+            "seed": seed,
+            "flow": flow_path,
+            "profile": profile.to_dict(),
+        },
+        "simulated_hours": simulated_hours,
+        "wall_seconds": wall_seconds,
+        "engine": stats,
+        "game": dict(game.stats),
+        "battles_per_hour": game.stats["battles"] / simulated_hours if simulated_hours else 0.0,
+        "victories_per_hour": game.stats["victories"] / simulated_hours if simulated_hours else 0.0,
+        "keys_per_hour": stats["keys_collected"] / simulated_hours if simulated_hours else 0.0,
+        "captures": adb.captures,
+        "taps": adb.taps,
+        "matches": matcher.matches,
+        "state_share": {
+            name: seconds / clock.now for name, seconds in sorted(state_time.items(), key=lambda x: -x[1])
+        } if clock.now else {},
+    }
+
+
+def _parse_override(text: str) -> Tuple[str, str, Any]:
+    """Parses "section.key=value"; the value is read as JSON when possible."""
+    name, _, raw = text.partition("=")
+    section, _, key = name.partition(".")
+    if not section or not key or not _:
+        raise argparse.ArgumentTypeError(f"ожидается section.key=value: {text}")
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = raw
+    return section, key, value
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.simulation",
+        description="Ускоренная симуляция работы бота с виртуальным временем."
+    )
+    parser.add_argument("--hours", type=float, default=24.0, help="Длительность симуляции в часах")
+    parser.add_argument("--seed", type=int, default=1, help="Начальное значение генератора случайных чисел")
+    parser.add_argument("--flow", help="Файл сценария (по умолчанию resources/flow.json)")
+    parser.add_argument("--profile", help="JSON-файл с параметрами модели игры")
+    parser.add_argument("--set", dest="overrides", action="append", type=_parse_override, default=[],
+                        metavar="SECTION.KEY=VALUE", help="Переопределить параметр конфигурации бота")
+    parser.add_argument("--output", help="Путь для JSON-отчета")
+    parser.add_argument("--verbose", action="store_true", help="Выводить журнал бота")
+    return parser.parse_args(argv)
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    game = report["game"]
+    print(f"Симулировано {report['simulated_hours']:.1f} ч за {report['wall_seconds']:.1f} с")
+    print(f"Боев в час: {report['battles_per_hour']:.1f}, побед в час: {report['victories_per_hour']:.1f}, "
+          f"ключей в час: {report['keys_per_hour']:.1f}")
+    print(f"Боев: {game['battles']}, побед: {game['victories']}, поражений: {game['defeats']}, "
+          f"разрывов: {game['disconnects']}, зависаний: {game['stuck_battles']}")
+    print(f"Снимков: {report['captures']}, нажатий: {report['taps']}, сопоставлений: {report['matches']}")
+    print("Доля времени по состояниям:")
+    for name, share in report["state_share"].items():
+        print(f"  {name:<20} {share * 100:6.2f}%")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.getLogger("BotLogger").setLevel(logging.DEBUG if args.verbose else logging.CRITICAL)
+
+    from config import config
+    for section, key, value in args.overrides:
+        config.set(section, key, value)
+
+    profile_values = None
+    if args.profile:
+        with open(args.profile, "r", encoding="utf-8") as f:
+            profile_values = json.load(f)
+
+    report = simulate(args.hours, args.seed, SimulationProfile(profile_values), args.flow)
+    report["meta"]["overrides"] = [f"{s}.{k}={v}" for s, k, v in args.overrides]
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+        print(f"\nОтчет сохранен: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
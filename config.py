@@ -33,9 +33,52 @@ class Config:
         "bot": {
             "battle_timeout": 120,
             "max_refresh_attempts": 3,
+            # Обновлять список, пока нет соперника слабее (0 - не выбирать). Работает, только если в
+            # "opponents" resources/flow.json внесены строки, измеренные на снимке экрана выбора
+            # ({"power": [x, y, w, h], "tap": [x, y]}); по умолчанию список пуст
+            "opponent_power_threshold": 0,
             "check_interval": 3,
+            "watchdog_interval": 5,  # Фоновая проверка потери соединения, сек (0 - выключена)
+            "stop_timeout": 5,  # Максимальное ожидание завершения потока бота при остановке, сек
             "debug_mode": False,  # Выключен режим отладки
         },
+        "ocr": {
+            # auto: встроенный распознаватель цифр, затем Tesseract. Эталоны цифр не поставляются:
+            # пока они не созданы командой "python -m bench.build_digits <корпус>" в
+            # resources/images/digits, встроенный распознаватель неактивен и используется только Tesseract
+            "method": "auto",
+            "worker": True,  # Постоянный движок Tesseract вместо процесса на каждый вызов
+            "worker_timeout": 2.0,
+            "cache_size": 64,  # LRU-кеш результатов по перцептивному хешу области
+        },
+        "stats": {
+            "write_delay": 2.0,  # Изменения за это время записываются на диск вместе, сек
+            "compact_every": 200,  # Сжатие журнала статистики в снимок через N записей
+            "raw_days": 90,  # Отдельные сессии хранятся N дней, затем сводятся по дням в архив (0 - вечно)
+            "daily_days": 365,  # Дневные сводки старше N дней объединяются по месяцам
+        },
+        "matcher": {
+            "learn_regions": True,  # Сужать поиск до изученных областей шаблонов
+            "region_margin": 20,
+            "region_min_samples": 3,
+            "region_verify_every": 20,  # Каждый N-й поиск выполняется по всему кадру
+            "pipeline_depth": 2,  # Захват следующего кадра во время сопоставления текущего (1 - последовательно)
+            "max_frame_age": 2.0,  # Кадры старше, сек, при ожидании не используются
+            "match_cache_size": 256,  # Кеш результатов для повторяющихся кадров (0 - выключен)
+            "match_cache_age": 10.0,
+            # Отсев шаблонов сравнением в половинном масштабе до полного сопоставления (0 - выключено)
+            "prefilter_margin": 0.9,
+        },
+        "trace": {
+            "enabled": False,  # Запись временной шкалы для Perfetto
+            "buffer_size": 200000,
+        },
+        "metrics": {
+            "enabled": False,  # Локальный HTTP-эндпоинт Prometheus
+            "host": "127.0.0.1",
+            "port": 9108,
+            "device": "",  # Метка устройства, по умолчанию имя_хоста:порт
+        },
         "license": {
             "directory": os.path.join(os.path.expanduser("~"), ".AOM_Bot"),
         },
@@ -5,3 +5,15 @@ from .adb_controller import AdbController
 from .image_matcher import ImageMatcher
 from .bot_engine import BotEngine, BotState
 from .logger import BotLogger, LogSignals
+from .timing import timings, TimingRegistry, LatencyHistogram
+from .tracing import tracer, TraceRecorder
+from .metrics_server import MetricsServer
+from .digit_recognizer import DigitRecognizer
+from .search_regions import SearchRegionLearner
+from .connection_watchdog import ConnectionWatchdog
+from .cancellation import CancellationToken, OperationCancelled
+from .state_graph import StateGraph, FlowError
+from .clock import SystemClock, system_clock
+from .frame_pipeline import FramePipeline
+from .match_cache import MatchCache
+from .session_history import SessionHistory
@@ -1,9 +1,14 @@
 import os
+import time
 import subprocess
 import random
 import logging
+from contextlib import contextmanager
 from typing import Tuple, Optional
 
+from core.timing import timings
+from core.cancellation import CancellationToken, OperationCancelled
+
 
 class AdbController:
     """Handles communication with the Android device via ADB."""
@@ -17,6 +22,58 @@ class AdbController:
         if os.name == 'nt':
             self.creation_flags = subprocess.CREATE_NO_WINDOW
 
+        # Token of the current bot run: cancelling it kills running adb commands
+        self.cancel_token: Optional[CancellationToken] = None
+
+    @contextmanager
+    def _killable(self, process: subprocess.Popen):
+        """Kills the process if the cancellation token is cancelled while it runs."""
+        token = self.cancel_token
+        if token is None:
+            yield
+            return
+
+        def kill():
+            try:
+                process.kill()
+            except OSError:
+                pass
+
+        token.add_callback(kill)
+        try:
+            yield
+        finally:
+            token.remove_callback(kill)
+        token.raise_if_cancelled()
+
+    def _run(self, args, timeout: float) -> Tuple[int, bytes, bytes]:
+        """
+        Runs an adb command that can be killed through the cancellation token.
+
+        Returns:
+            (return code, stdout, stderr)
+
+        Raises:
+            subprocess.TimeoutExpired: The command did not finish in time (it is killed)
+            OperationCancelled: The token was cancelled before or during the command
+        """
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+
+        process = subprocess.Popen(
+            [self.adb_path] + list(args),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            creationflags=self.creation_flags
+        )
+        with self._killable(process):
+            try:
+                stdout, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                raise
+        return process.returncode, stdout, stderr
+
     def check_connection(self) -> bool:
         """Checks if ADB is connected to a device."""
         try:
@@ -67,13 +124,15 @@ class AdbController:
             y += y_offset
 
         try:
-            subprocess.run(
-                [self.adb_path, "shell", "input", "tap", str(x), str(y)],
-                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
-                check=True, timeout=5, creationflags=self.creation_flags
-            )
+            args = ["shell", "input", "tap", str(x), str(y)]
+            with timings.span("adb.tap"):
+                returncode, _, _ = self._run(args, timeout=5)
+            if returncode != 0:
+                raise subprocess.CalledProcessError(returncode, [self.adb_path] + args)
             self.logger.info(f"Нажатие отправлено на координаты ({x}, {y})")
             return True
+        except OperationCancelled:
+            self.logger.debug(f"Нажатие на ({x}, {y}) отменено остановкой бота")
         except subprocess.TimeoutExpired:
             self.logger.error("🚨 Таймаут ADB нажатия: Команда не завершилась вовремя")
         except subprocess.CalledProcessError as e:
@@ -89,18 +148,28 @@ class AdbController:
         Returns:
             Raw screen data as bytes or None if failed
         """
+        with timings.span("adb.capture"):
+            return self._capture_screen()
+
+    def _capture_screen(self) -> Optional[bytes]:
+        """Capture attempts of `capture_screen`, timed by stage."""
         for attempt in range(3):
             try:
                 self.logger.debug(f"Попытка захвата экрана #{attempt + 1}")
 
-                process = subprocess.Popen(
-                    [self.adb_path, "shell", "screencap", "-p"],
-                    stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                    creationflags=self.creation_flags
-                )
+                if self.cancel_token is not None:
+                    self.cancel_token.raise_if_cancelled()
+
+                with timings.span("adb.spawn"):
+                    process = subprocess.Popen(
+                        [self.adb_path, "shell", "screencap", "-p"],
+                        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                        creationflags=self.creation_flags
+                    )
 
                 try:
-                    screen_data, stderr = process.communicate(timeout=5)
+                    with timings.span("adb.transfer"), self._killable(process):
+                        screen_data, stderr = process.communicate(timeout=5)
 
                     if stderr:
                         stderr_text = stderr.decode('utf-8', errors='ignore')
@@ -122,12 +191,19 @@ class AdbController:
                 self.logger.debug(f"Захват экрана успешен, размер данных: {len(screen_data)} байт")
                 return screen_data
 
+            except OperationCancelled:
+                self.logger.debug("Захват экрана отменен остановкой бота")
+                return None
             except Exception as e:
                 self.logger.error(f"🚨 Ошибка при захвате экрана (попытка {attempt + 1}): {e}")
 
             # Небольшая задержка перед следующей попыткой
-            import time
-            time.sleep(1)
+            with timings.span("adb.retry_sleep"):
+                if self.cancel_token is not None:
+                    if self.cancel_token.wait(1):
+                        return None
+                else:
+                    time.sleep(1)
 
         self.logger.error("🚨 Ошибка: Не удалось загрузить изображение из ADB после нескольких попыток.")
         return None
\ No newline at end of file
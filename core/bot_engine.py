@@ -1,9 +1,15 @@
-import time
 import logging
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from enum import Enum, auto
-from typing import Dict, Tuple, Optional, List, Callable
-from core.stats_manager import StatsManager
+from typing import Tuple, Optional
+from core.timing import timings
+from core.tracing import tracer
+from core.connection_watchdog import ConnectionWatchdog
+from core.cancellation import CancellationToken
+from core.clock import SystemClock, system_clock
+from core.state_graph import StateGraph, CompiledState, FrameContext
 
 
 class BotState(Enum):
@@ -22,39 +28,48 @@ class BotState(Enum):
 class BotEngine:
     """Main bot logic and state management."""
 
-    def __init__(self, adb_controller, image_matcher):
+    def __init__(self,
+                 adb_controller,
+                 image_matcher,
+                 flow_path: Optional[str] = None,
+                 clock: Optional[SystemClock] = None):
+        """
+        Args:
+            adb_controller: Device controller
+            image_matcher: Template matcher
+            flow_path: Declarative flow description (resources/flow.json by default)
+            clock: Time source for sleeps (the system clock by default)
+        """
         self.adb = adb_controller
         self.image_matcher = image_matcher
+        self.clock = clock or system_clock
         self.logger = logging.getLogger("BotLogger")
 
         # Event to control the bot thread
         self.running = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Cancelled on stop: wakes every wait and kills running adb commands.
+        # The wait token is a child that the connection watchdog can cancel alone.
+        self.cancel_token = CancellationToken()
+        self.wait_token = self.cancel_token.child()
 
         # Current state of the bot
         self.state = BotState.IDLE
 
-        # Click coordinates for different actions
-        self.click_coords = {
-            "start_battle": (1227, 832),
-            "confirm_battle": (1430, 830),
-            "auto_battle": (66, 642),
-            "exit_after_win": (743, 819),
-            "refresh_opponents": (215, 826),
-            "reconnect_button": (803, 821)
-        }
+        # Declarative flow: states, their templates, actions and transitions
+        if flow_path is None:
+            from config import resource_path
+            flow_path = resource_path("resources/flow.json")
+        self.flow = StateGraph.load(flow_path)
 
-        # Define actions for different bot states
-        self.state_actions = {
-            BotState.IDLE: self._handle_idle,
-            BotState.STARTING: self._handle_starting,
-            BotState.SELECTING_BATTLE: self._handle_selecting_battle,
-            BotState.CONFIRMING_BATTLE: self._handle_confirming_battle,
-            BotState.IN_BATTLE: self._handle_in_battle,
-            BotState.BATTLE_ENDED: self._handle_battle_ended,
-            BotState.CONNECTION_LOST: self._handle_connection_lost,
-            BotState.RECONNECTING: self._handle_reconnecting,
-            BotState.ERROR: self._handle_error
-        }
+        # Click coordinates for different actions at the reference resolution (1600x900)
+        self.reference_click_coords = self.flow.taps
+
+        # Coordinates scaled to the connected device; set up from the first captured frame
+        self.click_coords = dict(self.reference_click_coords)
+        self.screen_size: Optional[Tuple[int, int]] = None
+        self.scale = (1.0, 1.0)
 
         # Bot statistics
         self.stats = {
@@ -66,6 +81,37 @@ class BotEngine:
             "keys_collected": 0  # New statistic for tracking keys
         }
 
+        # Statistics are also updated from the background key recognition thread
+        self.stats_lock = threading.Lock()
+
+        # Key count recognition runs off the critical tap path
+        self.keys_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="KeyDetection")
+
+        # Latest captured frame (monotonic capture time, data), shared with the connection watchdog
+        self.last_frame: Tuple[Optional[float], Optional[bytes]] = (None, None)
+
+        # Background connection-loss check; its event interrupts waits and sleeps
+        from config import config
+        self.watchdog = ConnectionWatchdog(self, interval=config.get("bot", "watchdog_interval", 5),
+                                           templates=self.flow.watchdog_templates)
+
+        # Flow compiled into a dispatch table: each state only checks the templates that can follow it
+        self.flow_hooks = {
+            "check_connection": self._hook_check_connection,
+            "detect_keys": self._hook_detect_keys,
+            "pick_opponent": self._hook_pick_opponent,
+            "request_refresh": self._hook_request_refresh,
+            "update_stats": lambda context: self._update_stats_manager(),
+            "emit_stats": lambda context: self._emit_stats(),
+        }
+        self.opponents = self.flow.opponents
+        # Set after a defeat; pick_opponent decides how to refresh the list
+        self.refresh_requested = False
+        self.compiled_flow = self.flow.compile(BotState, self.flow_hooks, list(self.stats))
+        self.state_actions = {
+            state: partial(self._run_state, compiled) for state, compiled in self.compiled_flow.items()
+        }
+
         # Инициализация stats_manager
         self.stats_manager = None  # Будет установлен позже в main.py
 
@@ -78,31 +124,131 @@ class BotEngine:
 
     def capture_screen(self):
         """Captures the screen and returns the data."""
-        return self.adb.capture_screen()
+        screen_data = self.adb.capture_screen()
+        self._record_frame(screen_data)
+        return screen_data
+
+    def _record_frame(self, screen_data: Optional[bytes]):
+        """Makes a frame the latest one seen by the watchdog and calibrates taps from it."""
+        if screen_data:
+            self.last_frame = (self.clock.monotonic(), screen_data)
+            if self.screen_size is None:
+                self._calibrate(screen_data)
+
+    def _calibrate(self, screen_data: bytes):
+        """
+        Adapts tap coordinates to the device resolution detected from a frame.
+
+        Templates are rescaled by the image matcher, which caches them per resolution.
+        """
+        screen_size = self.image_matcher.screen_size(screen_data)
+        if not screen_size:
+            return
+
+        self.screen_size = tuple(screen_size)
+        self.scale = self.image_matcher.scale_factors(self.screen_size)
+        self.click_coords = {
+            action: self._scale_point(x, y) for action, (x, y) in self.reference_click_coords.items()
+        }
+
+        if self.scale != (1.0, 1.0):
+            self.logger.info(
+                f"Разрешение экрана {self.screen_size[0]}x{self.screen_size[1]}, "
+                f"масштаб {self.scale[0]:.3f}x{self.scale[1]:.3f}")
+
+    def _scale_point(self, x: int, y: int) -> Tuple[int, int]:
+        """Converts a point from the reference resolution to the device resolution."""
+        return int(round(x * self.scale[0])), int(round(y * self.scale[1]))
 
-    def start(self):
-        """Starts the bot in a separate thread."""
+    def start(self, background: bool = True):
+        """
+        Starts the bot in a separate thread.
+
+        Args:
+            background: Run the bot loop in a new thread; if False, the loop runs in the
+                        calling thread until the bot is stopped (used by simulations)
+        """
         if not self.running.is_set():
+            # A thread that outlived stop() would resume its loop once running is set again
+            previous = self._thread
+            if previous is not None and previous.is_alive():
+                self.logger.error("🚨 Предыдущий поток бота еще не завершился, запуск отменен")
+                if self.signals:
+                    self.signals.error.emit("Предыдущий поток бота еще не завершился. Повторите запуск позже.")
+                return False
+            self._thread = None
+
             if not self.adb.check_connection():
                 self.logger.error("🚨 ADB не подключен. Проверьте настройки эмулятора!")
                 if self.signals:
                     self.signals.error.emit("ADB не подключен. Проверьте настройки эмулятора!")
                 return False
 
+            # The emulator may have been switched while the bot was stopped
+            self.screen_size = None
+
+            # A previous run that did not finish in time must not share the new tokens
+            self.cancel_token = CancellationToken()
+            self.wait_token = self.cancel_token.child()
+            self.adb.cancel_token = self.cancel_token
+
             self.running.set()
             self.state = BotState.STARTING
-            threading.Thread(target=self._bot_loop, daemon=True).start()
+            self.last_frame = (None, None)
             self.logger.info("▶ Бот запущен")
+
+            if not background:
+                self._bot_loop()
+                return True
+
+            self._thread = threading.Thread(target=self._bot_loop, name="BotLoop", daemon=True)
+            self._thread.start()
+            if self.watchdog.interval > 0:
+                self.watchdog.start()
             return True
         return False
 
-    def stop(self):
-        """Stops the bot."""
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stops the bot.
+
+        Every wait, sleep and adb command of the bot thread is cancelled, so the
+        thread normally finishes within a fraction of a second.
+
+        Args:
+            timeout: Maximum time to wait for the bot thread, seconds (config bot.stop_timeout by default)
+        """
         if self.running.is_set():
+            from config import config
+            if timeout is None:
+                timeout = config.get("bot", "stop_timeout", 5)
+
             self.running.clear()
+            self.cancel_token.cancel()
+            self.watchdog.stop()
+
+            thread = self._thread
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(timeout=timeout)
+                if thread.is_alive():
+                    # Kept so that start() refuses to run a second loop next to it
+                    self.logger.warning(f"⚠ Поток бота не завершился за {timeout} сек")
+                else:
+                    self._thread = None
+
             self.state = BotState.IDLE
             self.logger.info("⛔ Бот остановлен")
 
+            # Let a pending key count reach the statistics before they are saved
+            try:
+                self.keys_executor.submit(lambda: None).result(timeout=timeout)
+            except Exception:
+                self.logger.warning("⚠ Подсчет ключей не завершился до остановки бота")
+
+            # Log where the session time went
+            for line in timings.summary_lines():
+                self.logger.debug(f"⏱ {line}")
+
             # Save stats when stopping the bot
             if self.stats_manager:
                 self.stats_manager.save_stats()
@@ -119,11 +265,30 @@ class BotEngine:
                 handler = self.state_actions.get(self.state)
                 if handler:
                     # State handlers return the next state
-                    next_state = handler()
+                    with timings.span("engine.state", self.state.name):
+                        next_state = handler()
+
+                    # Results of a cancelled handler are meaningless
+                    if not self.running.is_set():
+                        break
+
+                    # The watchdog saw a connection problem while the handler was waiting
+                    if self.watchdog.lost_event.is_set():
+                        self.watchdog.lost_event.clear()
+                        if self.connection_check_needed():
+                            next_state = BotState.CONNECTION_LOST
+                    if self.wait_token.is_cancelled():
+                        self.wait_token = self.cancel_token.child()
+
                     if next_state and next_state != self.state:
                         self.logger.info(f"Переход состояния: {self.state} -> {next_state}")
+                        tracer.instant("engine.transition", {"from": self.state.name, "to": next_state.name})
                         self.state = next_state
 
+                        # A detection racing with the transition must not cut recovery waits short
+                        if not self.connection_check_needed():
+                            self.watchdog.lost_event.clear()
+
                         # Update UI with state change
                         if self.signals:
                             self.signals.state_changed.emit(self.state.name)
@@ -132,106 +297,191 @@ class BotEngine:
                     self.state = BotState.ERROR
 
                 # Short sleep to prevent CPU hogging
-                time.sleep(0.1)
+                self.clock.sleep(0.1, self.cancel_token)
 
         except Exception as e:
             self.logger.error(f"🚨 Ошибка в цикле бота: {e}")
             self.state = BotState.ERROR
-            self.stats["errors"] += 1
+            with self.stats_lock:
+                self.stats["errors"] += 1
             if self.signals:
                 self.signals.error.emit(f"Ошибка бота: {e}")
         finally:
             # Clean up when the bot stops
             self.running.clear()
+            self.watchdog.stop()
             self.state = BotState.IDLE
             if self.signals:
                 self.signals.state_changed.emit(self.state.name)
 
-    def _handle_idle(self):
-        """Handler for IDLE state."""
-        # In the idle state, we just wait for the start command
-        time.sleep(0.5)
-        return BotState.IDLE
+    def _sleep(self, seconds: float):
+        """Sleeps inside a state handler, accounting the time as idle waiting.
 
-    def _handle_starting(self):
-        """Handler for STARTING state."""
-        self.logger.info("🔄 Запуск бота...")
+        The sleep ends early when the bot is stopped or, outside of recovery,
+        when the connection watchdog detects a connection loss.
+        """
+        with timings.span("engine.sleep"):
+            self.clock.sleep(seconds, self._wait_token())
 
-        # Look for the battle screen
-        self.logger.info("Делаем скриншот экрана...")
-        screen_data = self.capture_screen()
-        if screen_data:
-            self.logger.info("Скриншот получен, анализируем...")
-
-            # Check for connection issues first
-            if self._check_connection_issues(screen_data):
-                self.logger.info("Обнаружены проблемы с соединением")
-                return BotState.CONNECTION_LOST
-
-            # Check if we're already on the battle screen
-            if self.image_matcher.find_in_screen(screen_data, "cheak.png"):
-                self.logger.info("Найден экран выбора боя (cheak.png)")
-                return BotState.SELECTING_BATTLE
-
-            # Check if we're at the battle confirmation screen
-            if self.image_matcher.find_in_screen(screen_data, "confirm_battle.png"):
-                self.logger.info("Найден экран подтверждения боя (confirm_battle.png)")
-                return BotState.CONFIRMING_BATTLE
-
-            # Check if we're already in a battle
-            if self.image_matcher.find_in_screen(screen_data, "auto_battle.png"):
-                self.logger.info("Найден экран боя (auto_battle.png)")
-                return BotState.IN_BATTLE
-
-            # Check if a battle just ended
-            victory_found = self.image_matcher.find_in_screen(screen_data, "victory.png")
-            defeat_found = self.image_matcher.find_in_screen(screen_data, "defeat.png")
-
-            if victory_found:
-                self.logger.info("Найден экран победы (victory.png)")
-                return BotState.BATTLE_ENDED
-            elif defeat_found:
-                self.logger.info("Найден экран поражения (defeat.png)")
-                return BotState.BATTLE_ENDED
-
-            self.logger.warning("Не удалось найти ни один известный экран")
-        else:
-            self.logger.error("Не удалось получить скриншот экрана")
-
-        # If we couldn't find a known screen, wait and try again
-        self.logger.info("Ожидаем 2 секунды и пробуем снова...")
-        time.sleep(2)
-        return BotState.STARTING
-
-    def _handle_selecting_battle(self):
-        """Handler for SELECTING_BATTLE state."""
-        self.logger.info("Выбор боя...")
-        self.adb.tap(*self.click_coords["start_battle"])
-        time.sleep(2)
-        return BotState.CONFIRMING_BATTLE
-
-    def _handle_confirming_battle(self):
-        """Handler for CONFIRMING_BATTLE state."""
-        self.logger.info("Подтверждение боя...")
-        self.adb.tap(*self.click_coords["confirm_battle"])
-        self.stats["battles_started"] += 1
-
-        # Wait for the auto battle button to appear
-        _, match_loc = self.image_matcher.wait_for_images(
-            self.capture_screen, ["auto_battle.png"], timeout=50, check_interval=3
-        )
-
-        if match_loc:
-            return BotState.IN_BATTLE
+    def _wait_token(self) -> CancellationToken:
+        """Token that should interrupt waits in the current state."""
+        return self.wait_token if self.connection_check_needed() else self.cancel_token
+
+    def waits_cancelled(self) -> bool:
+        """True if waits of the current state were cancelled: the bot is stopping or the connection was lost."""
+        return self._wait_token().is_cancelled()
+
+    def interrupt_waits(self):
+        """Interrupts the current wait of a state handler without stopping the bot."""
+        self.wait_token.cancel()
+
+    def connection_check_needed(self) -> bool:
+        """True if the current state should be interrupted by a detected connection loss."""
+        return self.state not in (BotState.IDLE, BotState.CONNECTION_LOST, BotState.RECONNECTING)
+
+    def _run_state(self, compiled: CompiledState):
+        """
+        Runs one state of the compiled flow.
+
+        Returns:
+            Next state, or None if the run was cancelled
+        """
+        context = FrameContext()
+        for action in compiled.entry:
+            override = action(self, context)
+            if override is not None:
+                return override
+            if self.waits_cancelled():
+                return None
+
+        if not compiled.templates:
+            return compiled.otherwise.run(self, context)
+
+        timeout = compiled.timeout()
+        if timeout > 0:
+            wait_token = self._wait_token()
+            template, location = self.image_matcher.wait_for_images(
+                # Frames are recorded when matched, so a capture finishing after the wait is ignored
+                self.adb.capture_screen, list(compiled.templates),
+                timeout=timeout,
+                check_interval=compiled.interval(),
+                cancel_token=wait_token,
+                regions=compiled.regions,
+                on_frame=self._record_frame
+            )
+            if template is None and wait_token.is_cancelled():
+                # Stopped, or the watchdog saw a connection loss
+                return BotState.CONNECTION_LOST if self.watchdog.lost_event.is_set() else None
         else:
-            self.logger.error("🚨 Кнопка автобоя не найдена!")
+            # Classify a single frame
+            screen_data = self.capture_screen()
+            if not screen_data:
+                return compiled.no_frame.run(self, context)
+            context.screen_data = screen_data
+            template, location = self.image_matcher.classify_screen(
+                screen_data, list(compiled.templates), compiled.regions)
+
+        if template is None:
+            return compiled.otherwise.run(self, context)
+
+        self.logger.debug(f"Найден экран {template}")
+        context.template = template
+        context.location = location
+        return compiled.routes[template].run(self, context)
+
+    def _tap(self, action: str):
+        """Taps the named point of the flow, scaled to the device."""
+        self.adb.tap(*self.click_coords[action])
+
+    def _count(self, key: str):
+        """Increments a statistics counter."""
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def _emit_stats(self):
+        """Sends the current statistics to the UI."""
+        if self.signals:
+            self.signals.stats_updated.emit(self.stats)
+
+    def _hook_check_connection(self, context: FrameContext):
+        """Flow hook: switches to CONNECTION_LOST if the screen shows a connection problem."""
+        screen_data = context.screen_data or self.capture_screen()
+        if screen_data and self._check_connection_issues(screen_data):
+            return BotState.CONNECTION_LOST
+        return None
+
+    def _hook_detect_keys(self, context: FrameContext):
+        """Flow hook: counts keys on the victory frame in the background."""
+        # The captured frame stays valid after we leave the screen
+        if context.screen_data:
+            self.keys_executor.submit(self._detect_keys, context.screen_data)
+        return None
+
+    def _hook_pick_opponent(self, context: FrameContext):
+        """
+        Flow hook: refreshes the opponent list until someone weak enough appears.
 
-            # Check for connection issues
+        Powers of all opponents are read in one OCR batch. The list is refreshed
+        at most bot.max_refresh_attempts times; after that the weakest opponent
+        seen on the last list is chosen. If bot.opponent_power_threshold is 0 or
+        the flow describes no opponents, the list is only refreshed once after a
+        defeat, as before opponents were read.
+        """
+        from config import config
+
+        refresh_requested, self.refresh_requested = self.refresh_requested, False
+        threshold = config.get("bot", "opponent_power_threshold", 0)
+        if threshold <= 0 or not self.opponents:
+            if refresh_requested:
+                self.logger.info("Обновление списка соперников...")
+                self._tap("refresh_opponents")
+                self._sleep(2)
+            return None
+        # Negative values in the config mean "never refresh", not "never read the list"
+        max_refresh_attempts = max(0, config.get("bot", "max_refresh_attempts", 3))
+        regions = [row["power"] for row in self.opponents]
+
+        for attempt in range(max_refresh_attempts + 1):
             screen_data = self.capture_screen()
-            if screen_data and self._check_connection_issues(screen_data):
-                return BotState.CONNECTION_LOST
+            screen_img = self.image_matcher.decode_screen(screen_data) if screen_data else None
+            if screen_img is None:
+                self.logger.warning("⚠ Не удалось получить скриншот списка соперников")
+                return None
+
+            powers = self.image_matcher.read_numbers(screen_img, regions, min_val=1)
+            known = [(power, index) for index, power in enumerate(powers) if power is not None]
+            if not known:
+                self.logger.warning("⚠ Не удалось распознать силу соперников, выбор не выполняется")
+                return None
+
+            weakest_power, weakest = min(known)
+            self.logger.info(f"Сила соперников: {powers}")
+            if weakest_power <= threshold or attempt == max_refresh_attempts:
+                break
+
+            self.logger.info(f"Нет соперника слабее {threshold}, обновляем список "
+                             f"({attempt + 1}/{max_refresh_attempts})...")
+            self._tap("refresh_opponents")
+            self._sleep(2)
+            if self.waits_cancelled():
+                return None
+
+        if weakest_power <= threshold:
+            self.logger.info(f"✅ Выбран соперник {weakest + 1} с силой {weakest_power}")
+        else:
+            self.logger.warning(f"⚠ За {max_refresh_attempts} обновлений нет соперника слабее {threshold}, "
+                                f"выбран самый слабый ({weakest_power})")
 
-            return BotState.ERROR
+        tap = self.opponents[weakest]["tap"]
+        if tap is not None:
+            self.adb.tap(*self._scale_point(*tap))
+            self._sleep(0.5)
+        return None
+
+    def _hook_request_refresh(self, context: FrameContext):
+        """Flow hook: asks pick_opponent to refresh the opponent list before the next battle."""
+        self.refresh_requested = True
+        return None
 
     def update_settings(self, battle_timeout=None, max_refresh_attempts=None):
         """Обновляет настройки бота во время выполнения.
@@ -252,180 +502,32 @@ class BotEngine:
         # Логируем обновление настроек
         self.logger.info("Настройки бота обновлены")
 
-    def _handle_in_battle(self):
-        """Handler for IN_BATTLE state."""
-        from config import config
-
-        self.logger.info("В бою, включаем автобой...")
-        self.adb.tap(*self.click_coords["auto_battle"])
-
-        # Получаем значения из конфигурации
-        battle_timeout = config.get("bot", "battle_timeout", 120)
-        check_interval = config.get("bot", "check_interval", 3)
-
-        self.logger.info(f"Ожидание окончания боя (таймаут: {battle_timeout} сек)...")
-
-        # Wait for battle to end (victory or defeat)
-        result, _ = self.image_matcher.wait_for_images(
-            self.capture_screen, ["victory.png", "defeat.png"],
-            timeout=battle_timeout,
-            check_interval=check_interval
-        )
-
-        if result:
-            return BotState.BATTLE_ENDED
-        else:
-            # Check for connection issues
-            screen_data = self.capture_screen()
-            if screen_data and self._check_connection_issues(screen_data):
-                return BotState.CONNECTION_LOST
-
-            # Battle seems to be stuck, try emergency clicks
-            self.logger.warning("⚠ Бой, похоже, застрял! Выполняем экстренные нажатия.")
-            self._perform_emergency_clicks()
-            return BotState.STARTING
-
-    def _handle_battle_ended(self):
-        """Handler for BATTLE_ENDED state."""
-        from config import config
-
-        # Check which result screen we're on
-        screen_data = self.capture_screen()
-        if not screen_data:
-            return BotState.ERROR
-
-        if self.image_matcher.find_in_screen(screen_data, "victory.png"):
-            self.logger.info("🏆 Победа! Анализ полученных наград...")
-            self.stats["victories"] += 1
-
-            # Detect and count keys before clicking to exit
+    def _detect_keys(self, screen_data: bytes):
+        """Recognizes the key count of a victory frame and folds it into the statistics."""
+        try:
             keys_count = self.image_matcher.detect_keys(screen_data)
-            if keys_count > 0:
-                self.stats["keys_collected"] += keys_count
-                self.logger.info(f"🔑 Получено {keys_count} ключей. Всего собрано: {self.stats['keys_collected']}")
-
-                # If signals is set, emit stats_updated to refresh UI
-                if self.signals:
-                    self.signals.stats_updated.emit(self.stats)
-
-            # Continue with normal flow - exit after win
-            self.adb.tap(*self.click_coords["exit_after_win"])
-            time.sleep(5)
-
-            # Обновление статистики в реальном времени
-            if self.stats_manager:
-                self.stats_manager.update_stats(self.stats)
-
-            return BotState.STARTING
-
-        elif self.image_matcher.find_in_screen(screen_data, "defeat.png"):
-            self.logger.info("❌ Поражение! Обновляем список соперников и пробуем снова.")
-            self.stats["defeats"] += 1
-
-            # НОВЫЙ КОД: Эмитируем сигнал обновления статистики
-            if self.signals:
-                self.signals.stats_updated.emit(self.stats)
-
-            self.adb.tap(*self.click_coords["exit_after_win"])
-            time.sleep(10)
+        except Exception as e:
+            self.logger.error(f"🚨 Ошибка при подсчете ключей: {e}")
+            return
 
-            # Проверяем, не превышено ли максимальное количество попыток обновления
-            max_refresh = config.get("bot", "max_refresh_attempts", 3)
-            self.logger.info(f"Обновление списка соперников (макс. попыток: {max_refresh})...")
+        if keys_count <= 0:
+            return
 
-            self.adb.tap(*self.click_coords["refresh_opponents"])
-            time.sleep(2)
+        with self.stats_lock:
+            self.stats["keys_collected"] += keys_count
+            total_keys = self.stats["keys_collected"]
+        self.logger.info(f"🔑 Получено {keys_count} ключей. Всего собрано: {total_keys}")
 
-            # Обновление статистики в реальном времени
-            if self.stats_manager:
-                self.stats_manager.update_stats(self.stats)
+        # If signals is set, emit stats_updated to refresh UI
+        self._emit_stats()
 
-            return BotState.STARTING
+        self._update_stats_manager()
 
-        # Обновление статистики в любом случае
+    def _update_stats_manager(self):
+        """Passes the current statistics to the stats manager."""
         if self.stats_manager:
-            self.stats_manager.update_stats(self.stats)
-
-        return BotState.STARTING
-
-    def _handle_connection_lost(self):
-        """Handler for CONNECTION_LOST state."""
-        self.logger.warning("⚠ Соединение с сервером потеряно! Пытаемся переподключиться...")
-        self.stats["connection_losses"] += 1
-
-        # Wait for the "Связаться с нами" button to appear
-        screen_data = self.capture_screen()
-        if not screen_data:
-            return BotState.ERROR
-
-        # Check if we already see the contact us button
-        if self.image_matcher.find_in_screen(screen_data, "contact_us.png"):
-            # Click on the "Связаться с нами" button at coordinates 803, 821
-            self.adb.tap(*self.click_coords["reconnect_button"])
-            time.sleep(7)
-            return BotState.RECONNECTING
-
-        # If not, wait for it to appear
-        result, _ = self.image_matcher.wait_for_images(
-            self.capture_screen, ["contact_us.png"], timeout=60, check_interval=3
-        )
-
-        if result:
-            self.adb.tap(*self.click_coords["reconnect_button"])
-            time.sleep(7)
-            return BotState.RECONNECTING
-        else:
-            self.logger.error("🚨 Не удалось найти кнопку переподключения!")
-            return BotState.ERROR
-
-    def _handle_reconnecting(self):
-        """Handler for RECONNECTING state - implements the recovery algorithm."""
-        self.logger.info("Переподключение к игре...")
-
-        # Try to find cheak.png or confirm_battle.png first (5 seconds)
-        result, _ = self.image_matcher.wait_for_images(
-            self.capture_screen,
-            ["cheak.png", "confirm_battle.png"],
-            timeout=5,
-            check_interval=1
-        )
-
-        if result == "cheak.png":
-            return BotState.SELECTING_BATTLE
-        elif result == "confirm_battle.png":
-            return BotState.CONFIRMING_BATTLE
-
-        # If not found, try to find victory.png or defeat.png (another 5 seconds)
-        result, _ = self.image_matcher.wait_for_images(
-            self.capture_screen,
-            ["victory.png", "defeat.png"],
-            timeout=5,
-            check_interval=1
-        )
-
-        if result in ["victory.png", "defeat.png"]:
-            return BotState.BATTLE_ENDED
-
-        # If still not found, look for auto_battle.png
-        result, _ = self.image_matcher.wait_for_images(
-            self.capture_screen,
-            ["auto_battle.png"],
-            timeout=5,
-            check_interval=1
-        )
-
-        if result == "auto_battle.png":
-            return BotState.IN_BATTLE
-
-        # If we still can't find any known screens, return to starting state
-        self.logger.warning("⚠ Не удалось определить состояние игры после переподключения. Перезапуск...")
-        return BotState.STARTING
-
-    def _handle_error(self):
-        """Handler for ERROR state."""
-        self.logger.error("🚨 Бот столкнулся с ошибкой. Пытаемся восстановиться...")
-        time.sleep(5)
-        return BotState.STARTING
+            with self.stats_lock:
+                self.stats_manager.update_stats(self.stats)
 
     def _check_connection_issues(self, screen_data: bytes) -> bool:
         """
@@ -445,23 +547,3 @@ class BotEngine:
             return True
 
         return False
-
-    def _perform_emergency_clicks(self):
-        """Performs emergency clicks to try to recover from a stuck state."""
-        self.logger.warning("⚠ Выполнение экстренных нажатий...")
-
-        # Click back button
-        self.adb.tap(49, 50)
-        time.sleep(2)
-
-        # Click center of screen
-        self.adb.tap(588, 825)
-        time.sleep(2)
-
-        # Click exit button position
-        self.adb.tap(743, 819)
-        time.sleep(10)
-
-        # Click refresh button position
-        self.adb.tap(215, 826)
-        time.sleep(2)
\ No newline at end of file
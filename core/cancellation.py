@@ -0,0 +1,81 @@
+import threading
+from typing import Callable, List, Optional
+
+
+class OperationCancelled(Exception):
+    """Raised when an operation is aborted because its token was cancelled."""
+
+
+class CancellationToken:
+    """
+    Shared cancellation flag for waits, sleeps and subprocesses.
+
+    Waiting on the token instead of `time.sleep` lets a stop request wake the
+    waiting thread immediately. Callbacks (e.g. killing a running adb process)
+    run once when the token is cancelled. A child token is cancelled together
+    with its parent but can also be cancelled on its own, which interrupts the
+    current wait without stopping the whole run.
+    """
+
+    def __init__(self, parent: Optional["CancellationToken"] = None):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+        if parent is not None:
+            parent.add_callback(self.cancel)
+
+    def cancel(self) -> None:
+        """Cancels the token and runs its callbacks."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def is_cancelled(self) -> bool:
+        """True once the token has been cancelled."""
+        return self._event.is_set()
+
+    # Event-compatible name, so the token can be used where an Event is expected
+    is_set = is_cancelled
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Sleeps up to `timeout` seconds or until the token is cancelled.
+
+        Returns:
+            True if the token was cancelled
+        """
+        return self._event.wait(timeout)
+
+    def child(self) -> "CancellationToken":
+        """Creates a token cancelled together with this one."""
+        return CancellationToken(self)
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """Registers a callback to run on cancellation (runs at once if already cancelled)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]) -> None:
+        """Unregisters a callback added with `add_callback`."""
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
+
+    def raise_if_cancelled(self) -> None:
+        """Raises OperationCancelled if the token has been cancelled."""
+        if self._event.is_set():
+            raise OperationCancelled()
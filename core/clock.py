@@ -0,0 +1,37 @@
+import time
+from typing import Optional
+
+from core.cancellation import CancellationToken
+
+
+class SystemClock:
+    """
+    Wall clock used by the engine and the image matcher.
+
+    Time and sleeping go through a clock object so a simulation can replace
+    it with a virtual clock that advances instantly.
+    """
+
+    def time(self) -> float:
+        """Current time in seconds since the epoch."""
+        return time.time()
+
+    def monotonic(self) -> float:
+        """Monotonic time in seconds."""
+        return time.monotonic()
+
+    def sleep(self, seconds: float, cancel_token: Optional[CancellationToken] = None) -> bool:
+        """
+        Sleeps for the given time or until the token is cancelled.
+
+        Returns:
+            True if the sleep was cut short by the token
+        """
+        if cancel_token is not None:
+            return cancel_token.wait(seconds)
+        time.sleep(seconds)
+        return False
+
+
+# Shared default instance
+system_clock = SystemClock()
@@ -0,0 +1,106 @@
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from core.tracing import tracer
+
+
+class ConnectionWatchdog:
+    """
+    Background check for server connection loss.
+
+    The watchdog looks at the frames the bot engine already captures and,
+    at a low rate, searches them for the connection-loss templates. When one
+    is found it sets `lost_event` and interrupts the engine's waits and
+    sleeps, so a disconnect in battle is handled at once instead of after the
+    battle timeout. If the engine has not captured a fresh frame recently
+    (e.g. it is sleeping), the watchdog takes its own screenshot.
+    """
+
+    TEMPLATES = ["waiting_for_server.png", "contact_us.png"]
+
+    def __init__(self,
+                 bot_engine,
+                 interval: float = 5.0,
+                 templates: Optional[Dict[str, Optional[Tuple[int, int, int, int]]]] = None):
+        """
+        Args:
+            bot_engine: Engine whose frames are checked and whose waits are interrupted
+            interval: Seconds between checks
+            templates: Templates that indicate a lost connection -> search region (x, y, w, h)
+                       at the reference resolution or None; TEMPLATES over the full frame by default
+        """
+        self.bot_engine = bot_engine
+        self.interval = interval
+        self.templates = templates or {template: None for template in self.TEMPLATES}
+        # Only templates with a region narrow the search; the rest scan the full frame
+        self.regions = {template: roi for template, roi in self.templates.items() if roi is not None}
+        self.logger = logging.getLogger("BotLogger")
+
+        # Set when a connection problem is seen; cleared by the engine once it reacts
+        self.lost_event = threading.Event()
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_checked: Optional[float] = None
+
+    def start(self) -> None:
+        """Starts the watchdog thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.lost_event.clear()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="ConnectionWatchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the watchdog thread."""
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=self.interval + 5)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            if not self.bot_engine.running.is_set() or not self.bot_engine.connection_check_needed():
+                continue
+            try:
+                self.check()
+            except Exception as e:
+                self.logger.error(f"🚨 Ошибка в фоновой проверке соединения: {e}")
+
+    def _frame(self) -> Tuple[Optional[float], Optional[bytes]]:
+        """Returns (capture time, data) of a frame that was not checked yet."""
+        captured_at, screen_data = self.bot_engine.last_frame
+        now = self.bot_engine.clock.monotonic()
+        if captured_at is not None and now - captured_at <= self.interval:
+            if captured_at == self._last_checked:
+                return None, None
+            return captured_at, screen_data
+
+        # The engine is not capturing at the moment, take a frame of our own
+        return now, self.bot_engine.adb.capture_screen()
+
+    def check(self) -> bool:
+        """
+        Checks the latest frame for connection problems.
+
+        Returns:
+            True if a connection problem was detected
+        """
+        captured_at, screen_data = self._frame()
+        if not screen_data:
+            return False
+        self._last_checked = captured_at
+
+        template_name, _ = self.bot_engine.image_matcher.classify_screen(
+            screen_data, list(self.templates), self.regions)
+        if template_name is None:
+            return False
+
+        self.logger.warning(f"⚠ Фоновая проверка: обнаружена потеря соединения ({template_name})")
+        tracer.instant("watchdog.connection_lost", {"template": template_name})
+        self.lost_event.set()
+        self.bot_engine.interrupt_waits()
+        return True
@@ -0,0 +1,276 @@
+import os
+import logging
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class DigitRecognizer:
+    """
+    In-process recognizer for numbers rendered in the game's fixed digit font.
+
+    The number region is binarised, split into glyphs by connected components
+    and every glyph, normalised to a small bitmap, is classified by nearest
+    neighbour against reference glyphs loaded from `<digits_dir>/<digit>*.png`
+    (several samples per digit are allowed, e.g. `7.png`, `7_bold.png`).
+    """
+
+    # Normalised glyph bitmap size (width, height)
+    GLYPH_SIZE = (12, 16)
+
+    def __init__(self, digits_dir: str, max_distance: float = 0.15):
+        """
+        Initialize the recognizer.
+
+        Args:
+            digits_dir: Directory with reference glyph images
+            max_distance: Maximum mean squared distance of an accepted glyph (0-1)
+        """
+        self.digits_dir = digits_dir
+        self.max_distance = max_distance
+        self.logger = logging.getLogger("BotLogger")
+
+        # Reference glyphs: (N, W*H) float32 matrix and the digit of every row
+        self.references = np.empty((0, self.GLYPH_SIZE[0] * self.GLYPH_SIZE[1]), dtype=np.float32)
+        self.labels = np.empty(0, dtype=np.int8)
+
+        self.load_references()
+
+    @property
+    def available(self) -> bool:
+        """True if reference glyphs are loaded."""
+        return len(self.labels) > 0
+
+    def load_references(self) -> int:
+        """
+        Loads reference glyphs from the digits directory.
+
+        Returns:
+            Number of loaded reference glyphs
+        """
+        if not os.path.isdir(self.digits_dir):
+            self.logger.debug(f"Каталог эталонов цифр не найден: {self.digits_dir}")
+            return 0
+
+        vectors, labels = [], []
+        for file_name in sorted(os.listdir(self.digits_dir)):
+            if not file_name.endswith(".png") or not file_name[0].isdigit():
+                continue
+
+            image = cv2.imread(os.path.join(self.digits_dir, file_name), cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                self.logger.warning(f"⚠ Не удалось загрузить эталон цифры: {file_name}")
+                continue
+
+            # References are stored already binarised: white glyph on black
+            _, binary = cv2.threshold(image, 127, 255, cv2.THRESH_BINARY)
+            glyphs = self.segment(binary)
+            if len(glyphs) != 1:
+                self.logger.warning(f"⚠ Эталон {file_name} содержит {len(glyphs)} символов вместо одного")
+                continue
+
+            vectors.append(self.normalize(glyphs[0]))
+            labels.append(int(file_name[0]))
+
+        if vectors:
+            self.references = np.vstack(vectors)
+            self.labels = np.array(labels, dtype=np.int8)
+            self.logger.info(f"✅ Загружено {len(labels)} эталонов цифр из {self.digits_dir}")
+        return len(labels)
+
+    def binarize(self, image: np.ndarray) -> np.ndarray:
+        """
+        Converts a number region into a binary image with white glyphs on black.
+
+        Args:
+            image: BGR or grayscale region
+
+        Returns:
+            Binary uint8 image (0 or 255)
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim > 2 else image
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+        # The region border is background whatever the colour scheme
+        border = np.concatenate((binary[0], binary[-1], binary[:, 0], binary[:, -1]))
+        if cv2.countNonZero(border) > border.size // 2:
+            binary = cv2.bitwise_not(binary)
+        return binary
+
+    def segment(self, binary: np.ndarray) -> List[np.ndarray]:
+        """
+        Splits a binary region into glyph bitmaps ordered left to right.
+
+        Args:
+            binary: Output of `binarize`
+
+        Returns:
+            List of cropped glyph bitmaps
+        """
+        count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        if count <= 1:
+            return []
+
+        # Skip the background component and specks much lower than the tallest glyph
+        boxes = stats[1:, :4]
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        max_height = boxes[:, 3].max()
+        keep = (boxes[:, 3] >= max_height * 0.5) & (areas >= 4)
+        boxes = boxes[keep]
+        if not len(boxes):
+            return []
+
+        # Merge components that overlap horizontally (broken strokes of one glyph)
+        boxes = boxes[np.argsort(boxes[:, 0])]
+        merged: List[List[int]] = []
+        for x, y, w, h in boxes.tolist():
+            if merged and x < merged[-1][0] + merged[-1][2] - 1:
+                last = merged[-1]
+                x2 = max(last[0] + last[2], x + w)
+                y2 = max(last[1] + last[3], y + h)
+                last[0], last[1] = min(last[0], x), min(last[1], y)
+                last[2], last[3] = x2 - last[0], y2 - last[1]
+            else:
+                merged.append([x, y, w, h])
+
+        return [binary[y:y + h, x:x + w] for x, y, w, h in merged]
+
+    def normalize(self, glyph: np.ndarray) -> np.ndarray:
+        """
+        Scales a glyph into the fixed bitmap, preserving its aspect ratio.
+
+        Args:
+            glyph: Cropped binary glyph
+
+        Returns:
+            Flattened float32 vector with values in [0, 1]
+        """
+        width, height = self.GLYPH_SIZE
+        h, w = glyph.shape[:2]
+        scale = min(width / w, height / h)
+        new_w, new_h = max(1, round(w * scale)), max(1, round(h * scale))
+
+        canvas = np.zeros((height, width), dtype=np.float32)
+        resized = cv2.resize(glyph, (new_w, new_h), interpolation=cv2.INTER_AREA)
+        x0, y0 = (width - new_w) // 2, (height - new_h) // 2
+        canvas[y0:y0 + new_h, x0:x0 + new_w] = resized / 255.0
+        return canvas.ravel()
+
+    def classify(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Classifies normalised glyphs by nearest reference.
+
+        Args:
+            vectors: (N, W*H) matrix of normalised glyphs
+
+        Returns:
+            (digits, distances) arrays; distances are mean squared differences
+        """
+        # ||a - b||^2 = ||a||^2 - 2ab + ||b||^2 for all pairs at once
+        distances = (
+            (vectors ** 2).sum(axis=1)[:, None]
+            - 2.0 * vectors @ self.references.T
+            + (self.references ** 2).sum(axis=1)[None, :]
+        ) / vectors.shape[1]
+        nearest = distances.argmin(axis=1)
+        return self.labels[nearest], distances[np.arange(len(nearest)), nearest]
+
+    def recognize(self, image: np.ndarray) -> Optional[int]:
+        """
+        Recognizes the number in a region.
+
+        Args:
+            image: BGR or grayscale region containing only the number
+
+        Returns:
+            Recognized number or None if the region cannot be read confidently
+        """
+        if not self.available or image is None or image.size == 0:
+            return None
+
+        glyphs = self.segment(self.binarize(image))
+        if not glyphs:
+            return None
+
+        digits, distances = self.classify(np.vstack([self.normalize(glyph) for glyph in glyphs]))
+        if distances.max() > self.max_distance:
+            self.logger.debug(f"Встроенный распознаватель не уверен: расстояния {np.round(distances, 3)}")
+            return None
+
+        return int("".join(str(digit) for digit in digits))
+
+    def recognize_many(self, images: List[np.ndarray]) -> List[Optional[int]]:
+        """
+        Recognizes the numbers in several regions with a single classification.
+
+        Glyphs of all regions are stacked into one matrix, so reading a list
+        of values (e.g. opponent powers) costs one distance computation.
+
+        Args:
+            images: Regions each containing only a number
+
+        Returns:
+            Recognized number or None for every region, in the same order
+        """
+        results: List[Optional[int]] = [None] * len(images)
+        if not self.available:
+            return results
+
+        vectors, owners = [], []
+        for index, image in enumerate(images):
+            if image is None or image.size == 0:
+                continue
+            for glyph in self.segment(self.binarize(image)):
+                vectors.append(self.normalize(glyph))
+                owners.append(index)
+        if not vectors:
+            return results
+
+        digits, distances = self.classify(np.vstack(vectors))
+        owners = np.array(owners)
+        for index in np.unique(owners):
+            mine = owners == index
+            if distances[mine].max() > self.max_distance:
+                self.logger.debug(f"Встроенный распознаватель не уверен в области {index}: "
+                                  f"расстояния {np.round(distances[mine], 3)}")
+                continue
+            results[index] = int("".join(str(digit) for digit in digits[mine]))
+        return results
+
+    def extract_references(self, image: np.ndarray, value: int) -> List[Tuple[int, np.ndarray]]:
+        """
+        Splits a labelled number region into (digit, glyph) pairs for building references.
+
+        Args:
+            image: Region with a known number
+            value: The number shown in the region
+
+        Returns:
+            List of (digit, glyph bitmap) pairs, empty if segmentation does not match the value
+        """
+        glyphs = self.segment(self.binarize(image))
+        digits = [int(ch) for ch in str(value)]
+        if len(glyphs) != len(digits):
+            return []
+        return list(zip(digits, glyphs))
+
+    @staticmethod
+    def save_reference(digits_dir: str, digit: int, glyph: np.ndarray, index: int = 0) -> str:
+        """
+        Saves a glyph bitmap as a reference image.
+
+        Args:
+            digits_dir: Directory with reference glyph images
+            digit: Digit shown by the glyph
+            glyph: Binary glyph bitmap (white on black)
+            index: Sample number, used to keep several samples per digit
+
+        Returns:
+            Path of the written file
+        """
+        os.makedirs(digits_dir, exist_ok=True)
+        file_name = f"{digit}.png" if index == 0 else f"{digit}_{index}.png"
+        path = os.path.join(digits_dir, file_name)
+        cv2.imwrite(path, cv2.copyMakeBorder(glyph, 2, 2, 2, 2, cv2.BORDER_CONSTANT, value=0))
+        return path
@@ -0,0 +1,147 @@
+import queue
+import logging
+import threading
+from typing import Callable, Optional, Tuple
+
+from core.cancellation import CancellationToken
+from core.clock import SystemClock, system_clock
+from core.timing import timings
+
+
+class FramePipeline:
+    """
+    Captures screen frames in a background thread while the caller matches.
+
+    Capture starts are spaced by `interval`, so the adb round-trip of frame
+    N+1 overlaps with decoding and matching of frame N. At most `depth`
+    frames are in flight: one being matched, the rest being captured or
+    waiting. Frames that waited longer than `max_age` seconds after their
+    capture finished are dropped, so the caller never acts on an outdated
+    screen. A frame has no effect until `next_frame` returns it, so a capture
+    that finishes after `close` is simply lost.
+    """
+
+    def __init__(self,
+                 screen_provider: Callable[[], Optional[bytes]],
+                 interval: float,
+                 depth: int = 2,
+                 max_age: float = 2.0,
+                 cancel_token: Optional[CancellationToken] = None,
+                 clock: Optional[SystemClock] = None):
+        """
+        Args:
+            screen_provider: Function that returns fresh screen data
+            interval: Minimum time between capture starts, seconds
+            depth: Frames in flight, including the one being matched (at least 2)
+            max_age: Frames older than this when taken are dropped, seconds
+            cancel_token: Token that stops the pipeline when cancelled
+            clock: Time source
+        """
+        self.screen_provider = screen_provider
+        self.interval = interval
+        self.max_age = max_age
+        self.clock = clock or system_clock
+        self.cancel_token = cancel_token or CancellationToken()
+        self.logger = logging.getLogger("BotLogger")
+
+        # Stops the producer without cancelling the caller's token
+        self._stop = CancellationToken()
+        self._frames: "queue.Queue[Tuple[float, Optional[bytes]]]" = queue.Queue()
+        # Frames the producer may hold besides the one being matched; taken before a capture
+        # starts and given back when the caller takes the frame
+        self._slots = threading.Semaphore(max(1, depth - 1))
+        self._thread: Optional[threading.Thread] = None
+        # Cancelled by the producer when it queues a frame; replaced before every wait
+        self._arrived = CancellationToken()
+        self.dropped = 0
+
+    def __enter__(self) -> "FramePipeline":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self) -> None:
+        """Starts capturing."""
+        self._thread = threading.Thread(target=self._run, name="FramePipeline", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 2.0) -> None:
+        """
+        Stops capturing and waits for the producer thread.
+
+        A capture in progress is never delivered. If it takes longer than
+        `timeout`, the thread is left to finish in the background.
+
+        Args:
+            timeout: Maximum time to wait for the producer, seconds
+        """
+        self._stop.cancel()
+        thread = self._thread
+        if thread is None or thread is threading.current_thread():
+            return
+        thread.join(timeout)
+        if thread.is_alive():
+            self.logger.warning(f"⚠ Поток захвата кадров не завершился за {timeout} с")
+        else:
+            self._thread = None
+
+    def _stopped(self) -> bool:
+        return self._stop.is_cancelled() or self.cancel_token.is_cancelled()
+
+    def _run(self) -> None:
+        while not self._stopped():
+            # Blocks while `depth` frames are in flight
+            if not self._slots.acquire(timeout=0.1):
+                continue
+
+            started_at = self.clock.monotonic()
+            try:
+                screen_data = self.screen_provider()
+            except Exception as e:
+                self.logger.error(f"🚨 Ошибка при захвате кадра: {e}")
+                screen_data = None
+            captured_at = self.clock.monotonic()
+            self._frames.put((captured_at, screen_data))
+            self._arrived.cancel()
+
+            remaining = self.interval - (self.clock.monotonic() - started_at)
+            if remaining > 0:
+                # Pacing goes through the clock, so a virtual clock is not held up in real time
+                self.clock.sleep(remaining, self._stop)
+
+    def next_frame(self, timeout: float) -> Optional[bytes]:
+        """
+        Returns the next sufficiently fresh frame.
+
+        Args:
+            timeout: Maximum time to wait, seconds
+
+        Returns:
+            Screen data or None if no fresh frame arrived in time (or capture failed)
+        """
+        deadline = self.clock.monotonic() + timeout
+        with timings.span("matcher.wait.frame"):
+            while not self.cancel_token.is_cancelled():
+                remaining = deadline - self.clock.monotonic()
+                if remaining <= 0:
+                    return None
+                # The token is replaced before the queue is checked, so a frame queued
+                # in between still cuts the wait short
+                self._arrived = CancellationToken()
+                try:
+                    captured_at, screen_data = self._frames.get_nowait()
+                except queue.Empty:
+                    # Waiting goes through the clock, so a virtual clock moves on meanwhile
+                    self.clock.sleep(min(remaining, 0.1), self._arrived)
+                    continue
+                self._slots.release()
+
+                age = self.clock.monotonic() - captured_at
+                if age > self.max_age:
+                    self.dropped += 1
+                    self.logger.debug(f"Кадр отброшен как устаревший ({age:.2f} с)")
+                    continue
+                return screen_data
+        return None
@@ -1,21 +1,131 @@
 import os
 import cv2
+import struct
 import numpy as np
 import logging
-import time
+import threading
 from typing import Tuple, Optional, List, Dict, Union, Callable
 
+from core.timing import timings
+from core.search_regions import SearchRegionLearner
+from core.cancellation import CancellationToken
+from core.clock import SystemClock, system_clock
+from core.frame_pipeline import FramePipeline
+from core.match_cache import MatchCache
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, max_overlap: float = 0.3,
+                        max_results: Optional[int] = None) -> np.ndarray:
+    """
+    Greedy non-maximum suppression of boxes.
+
+    Each step keeps the best remaining box and drops, in one vectorised
+    operation, every remaining box that overlaps it by more than max_overlap (IoU).
+
+    Args:
+        boxes: Array of shape (N, 4) with x1, y1, x2, y2
+        scores: Array of shape (N,)
+        max_overlap: Boxes overlapping a kept box more than this are suppressed
+        max_results: Stop after this many boxes (None - no limit)
+
+    Returns:
+        Indices of the kept boxes, best first
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(scores)[::-1]
+
+    keep = []
+    while order.size and (max_results is None or len(keep) < max_results):
+        best, rest = order[0], order[1:]
+        keep.append(best)
+
+        width = np.clip(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0, None)
+        height = np.clip(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0, None)
+        intersection = width * height
+        iou = intersection / (areas[best] + areas[rest] - intersection)
+        order = rest[iou <= max_overlap]
+
+    return np.array(keep, dtype=np.intp)
+
+
+class _Frame:
+    """Screen capture whose image is decoded on first use."""
+
+    __slots__ = ("matcher", "data", "raw_key", "_image", "_decoded")
+
+    def __init__(self, matcher: "ImageMatcher", screen_data: bytes):
+        self.matcher = matcher
+        self.data = screen_data
+        self.raw_key = MatchCache.raw_key(screen_data) if matcher.match_cache is not None else None
+        self._image = None
+        self._decoded = False
+
+    def image(self) -> Optional[np.ndarray]:
+        if not self._decoded:
+            self._image = self.matcher.decode_screen(self.data)
+            self._decoded = True
+        return self._image
+
 
 class ImageMatcher:
     """Handles image recognition for game elements."""
 
-    def __init__(self, template_dir: str):
+    # Screen resolution (width, height) the templates were captured at
+    REFERENCE_SIZE = (1600, 900)
+
+    # Scale of the frame and template copies compared by the prefilter
+    PREFILTER_SCALE = 0.5
+
+    def __init__(self,
+                 template_dir: str,
+                 search_regions: Optional[SearchRegionLearner] = None,
+                 clock: Optional[SystemClock] = None,
+                 pipeline_depth: int = 1,
+                 max_frame_age: float = 2.0,
+                 match_cache: Optional[MatchCache] = None,
+                 prefilter_margin: float = 0.0):
+        """
+        Args:
+            template_dir: Directory with template images
+            search_regions: Learner of template locations used to narrow the search (None - full-frame search)
+            clock: Time source for waits (the system clock by default)
+            pipeline_depth: Frames in flight in wait_for_images (1 - capture and match serially)
+            max_frame_age: Pipelined frames older than this are not used, seconds
+            match_cache: Cache of results for repeated frames (None - always match)
+            prefilter_margin: A template is rejected without full-size matching when its
+                              half-size score is below margin x threshold x its own half-size
+                              score at the worst pixel phase (0 - disabled)
+        """
         self.template_dir = template_dir
         self.logger = logging.getLogger("BotLogger")
 
         # Cache for loaded templates
         self.templates: Dict[str, np.ndarray] = {}
 
+        # Templates rescaled for other resolutions: (width, height) -> {template name: image}
+        self.template_banks: Dict[Tuple[int, int], Dict[str, np.ndarray]] = {}
+
+        self.search_regions = search_regions
+        self.clock = clock or system_clock
+
+        # Capture of the next frame overlaps with matching of the current one in waits
+        self.pipeline_depth = pipeline_depth
+        self.max_frame_age = max_frame_age
+
+        # Identical frames of loading and battle screens are answered from the cache
+        self.match_cache = match_cache
+
+        # Half-size copies of scaled templates: (template name, screen size) -> (copy, own score)
+        self.prefilter_margin = prefilter_margin
+        self.template_signatures: Dict[Tuple[str, Tuple[int, int]], Tuple[np.ndarray, float]] = {}
+        # Half-size copy of the last full frame searched: (frame, copy)
+        self._prefilter_frame: Tuple[Optional[np.ndarray], Optional[np.ndarray]] = (None, None)
+
+        # Created on first use by the bot thread or the key detection executor, whichever comes first
+        self.ocr_helper = None
+        self._ocr_helper_lock = threading.Lock()
+
     def load_template(self, template_name: str) -> Optional[np.ndarray]:
         """
         Loads a template image from the template directory.
@@ -46,6 +156,133 @@ class ImageMatcher:
         self.logger.debug(f"Шаблон {template_name} загружен успешно, размер: {template.shape}")
         return template
 
+    def scale_factors(self, screen_size: Tuple[int, int]) -> Tuple[float, float]:
+        """
+        Returns the (x, y) scale of a screen relative to the reference resolution.
+
+        Args:
+            screen_size: (width, height) of the screen
+        """
+        return screen_size[0] / self.REFERENCE_SIZE[0], screen_size[1] / self.REFERENCE_SIZE[1]
+
+    def get_template(self, template_name: str, screen_size: Tuple[int, int]) -> Optional[np.ndarray]:
+        """
+        Returns the template scaled for the given screen resolution.
+
+        Templates are resized once per resolution and kept in a bank, so matching
+        on a lower-resolution emulator costs no more than on the reference one.
+
+        Args:
+            template_name: Name of the template file
+            screen_size: (width, height) of the screen
+
+        Returns:
+            Template as NumPy array or None if it could not be loaded
+        """
+        screen_size = (int(screen_size[0]), int(screen_size[1]))
+        if screen_size == self.REFERENCE_SIZE:
+            return self.load_template(template_name)
+
+        bank = self.template_banks.setdefault(screen_size, {})
+        template = bank.get(template_name)
+        if template is not None:
+            return template
+
+        template = self.load_template(template_name)
+        if template is None:
+            return None
+
+        scale_x, scale_y = self.scale_factors(screen_size)
+        width = max(1, int(round(template.shape[1] * scale_x)))
+        height = max(1, int(round(template.shape[0] * scale_y)))
+        interpolation = cv2.INTER_AREA if scale_x * scale_y < 1 else cv2.INTER_LINEAR
+        template = cv2.resize(template, (width, height), interpolation=interpolation)
+
+        bank[template_name] = template
+        self.logger.debug(f"Шаблон {template_name} масштабирован под {screen_size[0]}x{screen_size[1]}: {template.shape}")
+        return template
+
+    @classmethod
+    def _half_size(cls, image: np.ndarray) -> np.ndarray:
+        scale = cls.PREFILTER_SCALE
+        return cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    def template_signature(self, template_name: str, template: np.ndarray,
+                           screen_size: Tuple[int, int]) -> Tuple[np.ndarray, float]:
+        """
+        Returns the half-size copy of a scaled template and its own half-size score.
+
+        The own score is the template matched against itself shifted by one
+        pixel, i.e. what a true match scores when it does not fall on the
+        even pixel grid of the half-size frame. It sets the per-template
+        bar of the prefilter. Computed once per resolution.
+
+        Args:
+            template_name: Name of the template file
+            template: Template scaled for the screen
+            screen_size: (width, height) of the screen
+
+        Returns:
+            (half-size template, worst own score over the pixel phases)
+        """
+        key = (template_name, screen_size)
+        signature = self.template_signatures.get(key)
+        if signature is None:
+            small = self._half_size(template)
+            own_score = 1.0
+            for dx in (0, 1):
+                for dy in (0, 1):
+                    shifted = cv2.copyMakeBorder(template, dy, 1 - dy, dx, 1 - dx, cv2.BORDER_REPLICATE)
+                    result = cv2.matchTemplate(self._half_size(shifted), small, cv2.TM_CCOEFF_NORMED)
+                    own_score = min(own_score, float(result.max()))
+            signature = (small, own_score)
+            self.template_signatures[key] = signature
+        return signature
+
+    def prefilter_score(self, small_template: np.ndarray, search_img: np.ndarray) -> float:
+        """
+        Best match score of a half-size template in the half-size search region.
+
+        Matching at half size costs about a sixteenth of the full-size match and
+        keeps the layout and colours of the template, so a screen that does
+        not show it (e.g. the red defeat banner on a victory frame) scores far
+        below a true match. The half-size copy of a full frame is reused by the
+        following templates of the same frame.
+
+        Returns:
+            Score in [-1, 1]; 1 if the region is too small to judge
+        """
+        frame, small = self._prefilter_frame
+        if frame is not search_img:
+            small = self._half_size(search_img)
+            self._prefilter_frame = (search_img, small)
+        if small.shape[0] < small_template.shape[0] or small.shape[1] < small_template.shape[1]:
+            return 1.0
+        return float(cv2.matchTemplate(small, small_template, cv2.TM_CCOEFF_NORMED).max())
+
+    @staticmethod
+    def screen_size(screen_data: bytes) -> Optional[Tuple[int, int]]:
+        """
+        Reads the (width, height) of a screen capture without decoding it.
+
+        Args:
+            screen_data: Raw screen capture data (PNG)
+
+        Returns:
+            (width, height) or None if the size could not be determined
+        """
+        # PNG signature (8 bytes), IHDR chunk length and type (8 bytes), then width and height
+        if screen_data and screen_data[:8] == b"\x89PNG\r\n\x1a\n" and screen_data[12:16] == b"IHDR":
+            return struct.unpack(">II", screen_data[16:24])
+
+        try:
+            screen_img = cv2.imdecode(np.frombuffer(screen_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        except Exception:
+            return None
+        if screen_img is None:
+            return None
+        return screen_img.shape[1], screen_img.shape[0]
+
     def find_in_screen(self,
                    screen_data: bytes,
                    template_name: str,
@@ -61,21 +298,75 @@ class ImageMatcher:
         Returns:
             (x, y) coordinates of the top-left corner of the match or None if not found
         """
-        # Convert screen data to OpenCV format
+        return self._match_frame(_Frame(self, screen_data), template_name, threshold)
+
+    def _match_frame(self,
+                     frame: _Frame,
+                     template_name: str,
+                     threshold: float = 0.8,
+                     roi: Optional[Tuple[int, int, int, int]] = None) -> Optional[Tuple[int, int]]:
+        """Matches a template on a frame, using the result cache if there is one."""
+        cache = self.match_cache
+        match_key = (template_name, threshold, roi)
+        if cache is not None:
+            cached = cache.lookup(match_key, frame.raw_key)
+            if cached is not None:
+                self.logger.debug(f"Результат поиска шаблона {template_name} взят из кеша: {cached or None}")
+                return cached or None
+
+        screen_img = frame.image()
+        if screen_img is None:
+            return None
+        location = self.find_in_image(screen_img, template_name, threshold, roi)
+
+        if cache is not None:
+            cache.store(match_key, frame.raw_key, location)
+        return location
+
+    def decode_screen(self, screen_data: bytes) -> Optional[np.ndarray]:
+        """
+        Decodes raw screen data into an OpenCV image.
+
+        Args:
+            screen_data: Raw screen capture data
+
+        Returns:
+            BGR image or None if decoding failed
+        """
         try:
-            screen_array = np.frombuffer(screen_data, dtype=np.uint8)
-            screen_img = cv2.imdecode(screen_array, cv2.IMREAD_COLOR)
+            with timings.span("matcher.decode"):
+                screen_array = np.frombuffer(screen_data, dtype=np.uint8)
+                screen_img = cv2.imdecode(screen_array, cv2.IMREAD_COLOR)
             if screen_img is None:
                 self.logger.error("🚨 Не удалось декодировать изображение экрана")
                 return None
 
             self.logger.debug(f"Размеры скриншота: {screen_img.shape}")
+            return screen_img
         except Exception as e:
             self.logger.error(f"🚨 Ошибка при обработке данных экрана: {e}")
             return None
 
-        # Load template
-        template = self.load_template(template_name)
+    def find_in_image(self,
+                      screen_img: np.ndarray,
+                      template_name: str,
+                      threshold: float = 0.8,
+                      roi: Optional[Tuple[int, int, int, int]] = None) -> Optional[Tuple[int, int]]:
+        """
+        Searches for a template in an already decoded screen image.
+
+        Args:
+            screen_img: Decoded screen image
+            template_name: Name of the template to find
+            threshold: Matching threshold (0-1)
+            roi: Search region (x, y, width, height) at the reference resolution;
+                 overrides the learned region of the template
+
+        Returns:
+            (x, y) coordinates of the top-left corner of the match or None if not found
+        """
+        # Load template (scaled to the screen resolution)
+        template = self.get_template(template_name, (screen_img.shape[1], screen_img.shape[0]))
         if template is None:
             self.logger.error(f"🚨 Не удалось загрузить шаблон: {template_name}")
             return None
@@ -83,14 +374,46 @@ class ImageMatcher:
         # Perform template matching
         try:
             self.logger.debug(f"Поиск шаблона {template_name} с порогом {threshold}")
-            result = cv2.matchTemplate(screen_img, template, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+
+            # Limit the search to the given or learned region of the template if there is one
+            region = None
+            if roi is not None:
+                region = self._scale_roi(roi, screen_img.shape, template.shape)
+            elif self.search_regions is not None:
+                region = self.search_regions.region(template_name, screen_img.shape, template.shape)
+
+            if region is not None:
+                x, y, width, height = region
+                search_img = screen_img[y:y + height, x:x + width]
+            else:
+                search_img = screen_img
+
+            # Cheap half-size check first: full-size matching is skipped for templates that are not there
+            if self.prefilter_margin > 0:
+                with timings.span("matcher.prefilter", template_name):
+                    screen_size = (screen_img.shape[1], screen_img.shape[0])
+                    small_template, own_score = self.template_signature(template_name, template, screen_size)
+                    score = self.prefilter_score(small_template, search_img)
+                cutoff = self.prefilter_margin * threshold * own_score
+                if score < cutoff:
+                    self.logger.debug(
+                        f"❌ Шаблон {template_name} отсеян предфильтром (score={score:.2f} < {cutoff:.2f})")
+                    return None
+
+            with timings.span("matcher.match", template_name):
+                result = cv2.matchTemplate(search_img, template, cv2.TM_CCOEFF_NORMED)
+                _, max_val, _, max_loc = cv2.minMaxLoc(result)
+
+            if region is not None:
+                max_loc = (max_loc[0] + region[0], max_loc[1] + region[1])
 
             self.logger.debug(f"Результат поиска шаблона {template_name}: max_val={max_val:.2f}, max_loc={max_loc}")
 
             if max_val >= threshold:
                 self.logger.info(
                     f"✅ Найдено изображение ({template_name}) с точностью {max_val:.2f} на координатах {max_loc}")
+                if self.search_regions is not None:
+                    self.search_regions.record(template_name, screen_img.shape, max_loc)
                 return max_loc
             else:
                 self.logger.debug(
@@ -100,77 +423,281 @@ class ImageMatcher:
             self.logger.error(f"🚨 Ошибка при сопоставлении шаблона: {e}")
             return None
 
+    def find_all(self,
+                 screen: Union[bytes, np.ndarray],
+                 template_name: str,
+                 threshold: float = 0.8,
+                 max_results: Optional[int] = None,
+                 roi: Optional[Tuple[int, int, int, int]] = None,
+                 max_overlap: float = 0.3) -> List[Tuple[Tuple[int, int], float]]:
+        """
+        Finds every occurrence of a template (opponent lists, reward rows).
+
+        The response map is thresholded and reduced to its local maxima,
+        then overlapping hits are removed by non-maximum suppression.
+
+        Args:
+            screen: Raw screen data or an already decoded screen image
+            template_name: Name of the template to find
+            threshold: Matching threshold (0-1)
+            max_results: Maximum number of hits (None - all)
+            roi: Search region (x, y, width, height) at the reference resolution
+            max_overlap: Hits overlapping a better one more than this (IoU) are dropped
+
+        Returns:
+            List of ((x, y), score) for the top-left corners of the hits, best first
+        """
+        screen_img = self.decode_screen(screen) if isinstance(screen, (bytes, bytearray)) else screen
+        if screen_img is None:
+            return []
+
+        template = self.get_template(template_name, (screen_img.shape[1], screen_img.shape[0]))
+        if template is None:
+            self.logger.error(f"🚨 Не удалось загрузить шаблон: {template_name}")
+            return []
+
+        try:
+            offset_x = offset_y = 0
+            search_img = screen_img
+            if roi is not None:
+                offset_x, offset_y, width, height = self._scale_roi(roi, screen_img.shape, template.shape)
+                search_img = screen_img[offset_y:offset_y + height, offset_x:offset_x + width]
+
+            with timings.span("matcher.match_all", template_name):
+                result = cv2.matchTemplate(search_img, template, cv2.TM_CCOEFF_NORMED)
+
+                # Only local maxima above the threshold are candidates
+                template_h, template_w = template.shape[:2]
+                kernel = np.ones((max(1, template_h // 2) | 1, max(1, template_w // 2) | 1), np.uint8)
+                peaks = (result >= threshold) & (result >= cv2.dilate(result, kernel))
+                ys, xs = np.nonzero(peaks)
+                if xs.size == 0:
+                    self.logger.debug(f"❌ Шаблон {template_name} не найден (threshold={threshold:.2f})")
+                    return []
+
+                scores = result[ys, xs]
+                boxes = np.stack([xs, ys, xs + template_w, ys + template_h], axis=1).astype(np.float32)
+                keep = non_max_suppression(boxes, scores, max_overlap, max_results)
+
+            hits = [((int(xs[i]) + offset_x, int(ys[i]) + offset_y), float(scores[i])) for i in keep]
+            self.logger.debug(f"Найдено совпадений шаблона {template_name}: {len(hits)}")
+            return hits
+        except Exception as e:
+            self.logger.error(f"🚨 Ошибка при сопоставлении шаблона: {e}")
+            return []
+
+    def _scale_roi(self,
+                   roi: Tuple[int, int, int, int],
+                   screen_shape: Tuple[int, ...],
+                   template_shape: Tuple[int, ...]) -> Optional[Tuple[int, int, int, int]]:
+        """Scales a reference-resolution region to the screen, or returns None if the template does not fit."""
+        scale_x, scale_y = self.scale_factors((screen_shape[1], screen_shape[0]))
+        x1 = max(0, int(roi[0] * scale_x))
+        y1 = max(0, int(roi[1] * scale_y))
+        x2 = min(screen_shape[1], int(round((roi[0] + roi[2]) * scale_x)))
+        y2 = min(screen_shape[0], int(round((roi[1] + roi[3]) * scale_y)))
+        if x2 - x1 < template_shape[1] or y2 - y1 < template_shape[0]:
+            return None
+        return x1, y1, x2 - x1, y2 - y1
+
+    def classify(self,
+                 screen_img: np.ndarray,
+                 image_list: List[str],
+                 regions: Optional[Dict[str, Tuple[int, int, int, int]]] = None
+                 ) -> Tuple[Optional[str], Optional[Tuple[int, int]]]:
+        """
+        Finds the first of the images present on a decoded screen.
+
+        Args:
+            screen_img: Decoded screen image
+            image_list: Template names in priority order
+            regions: Optional search regions per template at the reference resolution
+
+        Returns:
+            (image_name, location) of the first matched image or (None, None)
+        """
+        for image_name in image_list:
+            roi = regions.get(image_name) if regions else None
+            match_location = self.find_in_image(screen_img, image_name, roi=roi)
+            if match_location:
+                return image_name, match_location
+        return None, None
+
+    def classify_screen(self,
+                        screen_data: bytes,
+                        image_list: List[str],
+                        regions: Optional[Dict[str, Tuple[int, int, int, int]]] = None
+                        ) -> Tuple[Optional[str], Optional[Tuple[int, int]]]:
+        """
+        Finds the first of the images present in raw screen data.
+
+        The frame is decoded at most once, and not at all if every result is cached.
+
+        Args:
+            screen_data: Raw screen capture data
+            image_list: Template names in priority order
+            regions: Optional search regions per template at the reference resolution
+
+        Returns:
+            (image_name, location) of the first matched image or (None, None)
+        """
+        frame = _Frame(self, screen_data)
+        for image_name in image_list:
+            roi = regions.get(image_name) if regions else None
+            match_location = self._match_frame(frame, image_name, roi=roi)
+            if match_location:
+                return image_name, match_location
+        return None, None
+
     def wait_for_images(self,
                     screen_provider: Callable[[], Optional[bytes]],
                     image_list: List[str],
                     timeout: int = 90,
-                    check_interval: float = 3) -> Tuple[Optional[str], Optional[Tuple[int, int]]]:
+                    check_interval: float = 3,
+                    cancel_token: Optional[CancellationToken] = None,
+                    regions: Optional[Dict[str, Tuple[int, int, int, int]]] = None,
+                    on_frame: Optional[Callable[[bytes], None]] = None
+                    ) -> Tuple[Optional[str], Optional[Tuple[int, int]]]:
         """
         Waits for one of the specified images to appear on screen.
 
+        Every frame is decoded once and checked for all images in list order,
+        so several screens can be watched at once. With a pipeline depth above 1
+        the next frame is captured while the current one is matched.
+
         Args:
             screen_provider: Function that returns fresh screen data
             image_list: List of template names to look for
             timeout: Maximum wait time in seconds
             check_interval: Time between checks in seconds
+            cancel_token: Token that aborts the wait when cancelled
+            regions: Optional search regions per template at the reference resolution
+            on_frame: Called in the caller's thread with every frame before it is matched;
+                      frames the pipeline captured but did not hand over are never passed
 
         Returns:
-            (image_name, location) of the first matched image or (None, None) if timeout
+            (image_name, location) of the first matched image or (None, None) if timeout or cancelled
         """
-        import time
-        start_time = time.time()
-
-        while time.time() - start_time < timeout:
-            screen_data = screen_provider()
-            if screen_data is None:
-                time.sleep(check_interval)
-                continue
+        def pause():
+            with timings.span("matcher.wait.sleep"):
+                self.clock.sleep(check_interval, cancel_token)
+
+        pipeline = None
+        if self.pipeline_depth > 1:
+            pipeline = FramePipeline(screen_provider, check_interval, self.pipeline_depth,
+                                     self.max_frame_age, cancel_token, self.clock)
+
+        with timings.span("matcher.wait"):
+            start_time = self.clock.time()
+            if pipeline:
+                pipeline.start()
+
+            try:
+                while self.clock.time() - start_time < timeout:
+                    if cancel_token is not None and cancel_token.is_cancelled():
+                        self.logger.info("Ожидание изображений прервано")
+                        return None, None
+
+                    if pipeline:
+                        screen_data = pipeline.next_frame(timeout - (self.clock.time() - start_time))
+                    else:
+                        screen_data = screen_provider()
+                    if screen_data is not None:
+                        if on_frame:
+                            on_frame(screen_data)
+                        image_name, match_location = self.classify_screen(screen_data, image_list, regions)
+                        if image_name:
+                            self.logger.info(f"🏆 Изображение найдено: {image_name}")
+                            return image_name, match_location
+
+                    # The pipeline paces captures itself
+                    if not pipeline:
+                        pause()
+            finally:
+                if pipeline:
+                    pipeline.close()
+
+            self.logger.warning("⚠ Таймаут ожидания изображений")
+            return None, None
+
+    def get_ocr_helper(self):
+        """Returns the OCR helper, creating it on first use (thread-safe)."""
+        if self.ocr_helper is None:
+            with self._ocr_helper_lock:
+                if self.ocr_helper is None:
+                    from config import config
+                    from core.ocr_utils import OCRHelper
+                    self.ocr_helper = OCRHelper(
+                        method=config.get("ocr", "method", "auto"),
+                        digits_dir=os.path.join(self.template_dir, "digits"),
+                        use_worker=config.get("ocr", "worker", True),
+                        worker_timeout=config.get("ocr", "worker_timeout", 2.0),
+                        cache_size=config.get("ocr", "cache_size", 64)
+                    )
+        return self.ocr_helper
+
+    def read_numbers(self,
+                     screen_img: np.ndarray,
+                     regions: List[Tuple[int, int, int, int]],
+                     min_val: int = 0,
+                     max_val: int = 10 ** 9) -> List[Optional[int]]:
+        """
+        Reads numbers from several regions of a decoded screen in one OCR batch.
 
-            for image_name in image_list:
-                match_location = self.find_in_screen(screen_data, image_name)
-                if match_location:
-                    self.logger.info(f"🏆 Изображение найдено: {image_name}")
-                    return image_name, match_location
+        Args:
+            screen_img: Decoded screen image
+            regions: Regions (x, y, width, height) at the reference resolution
+            min_val: Minimum accepted value
+            max_val: Maximum accepted value
 
-            time.sleep(check_interval)
+        Returns:
+            Number or None for every region, in the same order
+        """
+        crops = []
+        for roi in regions:
+            region = self._scale_roi(roi, screen_img.shape, (1, 1))
+            if region is None:
+                crops.append(None)
+                continue
+            x, y, width, height = region
+            crops.append(screen_img[y:y + height, x:x + width])
 
-        self.logger.warning("⚠ Таймаут ожидания изображений")
-        return None, None
+        with timings.span("matcher.read_numbers"):
+            return self.get_ocr_helper().recognize_numbers(crops, min_val, max_val)
 
-    def detect_keys(self, screen_data: bytes) -> int:
+    def detect_keys(self, screen_data: bytes, default_val: Optional[int] = 12) -> Optional[int]:
         """
         Детектирует количество ключей, отображаемых на экране победы.
 
         Args:
             screen_data: Данные снимка экрана
+            default_val: Значение, возвращаемое, если число ключей прочитать не удалось
 
         Returns:
-            Количество обнаруженных ключей или 0, если ничего не найдено
+            Количество обнаруженных ключей, 0, если иконка ключа не найдена, или default_val
         """
         try:
-            # Импортируем OCRHelper
-            from core.ocr_utils import OCRHelper
-
-            # Создаем OCR Helper при первом использовании
-            if not hasattr(self, 'ocr_helper'):
-                self.ocr_helper = OCRHelper()
+            ocr_helper = self.get_ocr_helper()
 
             # Конвертация данных экрана в формат OpenCV
-            screen_array = np.frombuffer(screen_data, dtype=np.uint8)
-            screen_img = cv2.imdecode(screen_array, cv2.IMREAD_COLOR)
+            with timings.span("matcher.decode"):
+                screen_array = np.frombuffer(screen_data, dtype=np.uint8)
+                screen_img = cv2.imdecode(screen_array, cv2.IMREAD_COLOR)
             if screen_img is None:
                 self.logger.error("🚨 Не удалось декодировать изображение экрана")
                 return 0
 
             # Сначала находим иконку ключа
-            key_icon = self.load_template("key_icon.png")
+            screen_size = (screen_img.shape[1], screen_img.shape[0])
+            key_icon = self.get_template("key_icon.png", screen_size)
             if key_icon is None:
                 self.logger.warning("⚠ Не найден шаблон ключа (key_icon.png)")
-                return 12  # Возвращаем значение по умолчанию
+                return default_val  # Возвращаем значение по умолчанию
 
             # Поиск иконки ключа на экране
-            result = cv2.matchTemplate(screen_img, key_icon, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            with timings.span("matcher.match", "key_icon.png"):
+                result = cv2.matchTemplate(screen_img, key_icon, cv2.TM_CCOEFF_NORMED)
+                _, max_val, _, max_loc = cv2.minMaxLoc(result)
 
             # Если иконка ключа найдена с достаточной уверенностью
             if max_val >= 0.7:
@@ -179,9 +706,10 @@ class ImageMatcher:
 
                 # Определяем область под ключом, где отображается число
                 # Делаем область немного шире для лучшего захвата
-                number_region_x = max(0, key_x - 10)
+                padding = int(round(10 * self.scale_factors(screen_size)[0]))
+                number_region_x = max(0, key_x - padding)
                 number_region_y = key_y + key_height
-                number_region_width = min(key_width + 20, screen_img.shape[1] - number_region_x)
+                number_region_width = min(key_width + 2 * padding, screen_img.shape[1] - number_region_x)
                 number_region_height = key_height  # Примерная высота числа
 
                 # Извлекаем область, где должно быть число
@@ -193,19 +721,19 @@ class ImageMatcher:
                                     ]
 
                     # Используем OCR для распознавания числа
-                    keys_count = self.ocr_helper.recognize_number(number_region, default_val=12)
+                    keys_count = ocr_helper.recognize_number(number_region, default_val=default_val)
                     return keys_count
 
                 # Если извлечение области не удалось, возвращаем значение по умолчанию
                 self.logger.warning("⚠ Не удалось извлечь область с числом ключей")
-                return 12  # Разумное значение по умолчанию
+                return default_val  # Разумное значение по умолчанию
 
             self.logger.debug(f"❌ Иконка ключа не найдена на экране (max_val={max_val:.2f})")
             return 0
 
         except Exception as e:
             self.logger.error(f"🚨 Ошибка при распознавании количества ключей: {e}")
-            return 12  # Возвращаем значение по умолчанию в случае ошибки
+            return default_val  # Возвращаем значение по умолчанию в случае ошибки
 
     def _estimate_digit(self, contour):
         """
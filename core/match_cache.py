@@ -0,0 +1,110 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from core.clock import SystemClock, system_clock
+
+try:
+    import xxhash
+except ImportError:  # Optional: blake2b from the standard library is used instead
+    xxhash = None
+
+
+def fast_digest(data) -> bytes:
+    """64-bit digest of a bytes-like object (xxh3 if available, otherwise blake2b)."""
+    if xxhash is not None:
+        return xxhash.xxh3_64_digest(data)
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+
+class MatchCache:
+    """
+    Cache of template match results keyed by a frame digest.
+
+    A frame is identified by a digest of its raw capture bytes, so an
+    identical frame is answered without even decoding it. Only exact
+    repeats are reused: a near-duplicate frame may differ exactly where a
+    button appeared. Entries are evicted by count (LRU) and by age, so a
+    result is never reused long after it was computed.
+    """
+
+    # Stored for "template not found"; None means "not cached"
+    NOT_FOUND = ()
+
+    def __init__(self, max_entries: int = 256, max_age: float = 10.0, clock: Optional[SystemClock] = None):
+        """
+        Args:
+            max_entries: Maximum number of cached results
+            max_age: Results older than this are not reused, seconds
+            clock: Time source
+        """
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.clock = clock or system_clock
+
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def raw_key(screen_data: bytes) -> bytes:
+        """Digest of the raw capture bytes."""
+        return b"r" + fast_digest(screen_data)
+
+    def _get(self, key: Hashable, now: float) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry[0] > self.max_age:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _put(self, key: Hashable, value: Any, now: float) -> None:
+        self._entries[key] = (now, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def lookup(self, match_key: Hashable, raw_key: bytes) -> Optional[Any]:
+        """
+        Returns a cached result of a match on a frame.
+
+        Args:
+            match_key: Template name and match parameters
+            raw_key: Digest of the raw frame bytes
+
+        Returns:
+            The cached location, NOT_FOUND for a cached miss, or None if nothing usable is cached
+        """
+        with self._lock:
+            value = self._get((raw_key, match_key), self.clock.monotonic())
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def store(self, match_key: Hashable, raw_key: bytes, location: Optional[Tuple[int, int]]) -> None:
+        """Stores a match result (None - template not found) for a frame."""
+        value = self.NOT_FOUND if location is None else location
+        with self._lock:
+            self._put((raw_key, match_key), value, self.clock.monotonic())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,193 @@
+import json
+import socket
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Optional
+
+from core.timing import timings
+from core.tracing import tracer
+
+
+# Bot counters exported as Prometheus counters: stats key -> (metric name, help)
+COUNTERS = {
+    "battles_started": ("aom_bot_battles_started_total", "Battles started"),
+    "victories": ("aom_bot_victories_total", "Battles won"),
+    "defeats": ("aom_bot_defeats_total", "Battles lost"),
+    "keys_collected": ("aom_bot_keys_collected_total", "Keys collected after victories"),
+    "connection_losses": ("aom_bot_connection_losses_total", "Server connection losses"),
+    "errors": ("aom_bot_errors_total", "Errors in the bot loop"),
+}
+
+# Timing stages with dedicated metric names: stage -> (metric name, label name, help)
+NAMED_HISTOGRAMS = {
+    "adb.capture": ("aom_bot_capture_duration_seconds", None, "Screen capture latency via adb"),
+    "matcher.match": ("aom_bot_match_duration_seconds", "template", "Template matching latency"),
+    "engine.state": ("aom_bot_state_duration_seconds", "state", "Time spent in a state handler"),
+}
+
+GENERIC_HISTOGRAM = ("aom_bot_stage_duration_seconds", "Latency of other instrumented stages")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class MetricsServer:
+    """
+    Optional local HTTP endpoint exposing bot metrics in Prometheus text format.
+
+    The server runs in its own daemon thread and only reads `BotEngine.stats`
+    and the timing registry when scraped, so the bot thread never waits on it.
+    Endpoints: /metrics (Prometheus), /trace (Chrome Trace JSON of the timeline).
+    """
+
+    def __init__(self, bot_engine, host: str = "127.0.0.1", port: int = 9108, device: str = ""):
+        self.bot_engine = bot_engine
+        self.host = host
+        self.port = port
+        self.device = device or f"{socket.gethostname()}:{port}"
+        self.logger = logging.getLogger("BotLogger")
+
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """
+        Starts serving in a background thread.
+
+        Returns:
+            True if the server was started, False otherwise
+        """
+        if self._server is not None:
+            return False
+
+        metrics_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body = metrics_server.render().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/trace":
+                    body = json.dumps(tracer.to_trace()).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Scrapes every few seconds would flood the bot log
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self._server.daemon_threads = True
+        except OSError as e:
+            self.logger.error(f"🚨 Не удалось запустить сервер метрик на {self.host}:{self.port}: {e}")
+            self._server = None
+            return False
+
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Сервер метрик запущен: http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self) -> None:
+        """Stops the server and waits for its thread."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._server = None
+        self._thread = None
+
+    def render(self) -> str:
+        """Renders all metrics in Prometheus text exposition format."""
+        lines: List[str] = []
+        device = {"device": self.device}
+
+        stats = dict(self.bot_engine.stats)
+        for key, (metric, help_text) in COUNTERS.items():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_labels(device)} {stats.get(key, 0)}")
+
+        lines.append("# HELP aom_bot_running Whether the bot loop is running")
+        lines.append("# TYPE aom_bot_running gauge")
+        lines.append(f"aom_bot_running{_labels(device)} {1 if self.bot_engine.running.is_set() else 0}")
+
+        current_state = self.bot_engine.state.name
+        lines.append("# HELP aom_bot_state Current state of the bot")
+        lines.append("# TYPE aom_bot_state gauge")
+        lines.append(f"aom_bot_state{_labels({**device, 'state': current_state})} 1")
+
+        ocr_helper = getattr(self.bot_engine.image_matcher, "ocr_helper", None)
+        if ocr_helper is not None and hasattr(ocr_helper, "cache_stats"):
+            cache = ocr_helper.cache_stats()
+            lines.append("# HELP aom_bot_ocr_cache_hits_total OCR results served from the cache")
+            lines.append("# TYPE aom_bot_ocr_cache_hits_total counter")
+            lines.append(f"aom_bot_ocr_cache_hits_total{_labels(device)} {cache['hits']}")
+            lines.append("# HELP aom_bot_ocr_cache_misses_total OCR cache lookups that needed recognition")
+            lines.append("# TYPE aom_bot_ocr_cache_misses_total counter")
+            lines.append(f"aom_bot_ocr_cache_misses_total{_labels(device)} {cache['misses']}")
+
+        match_cache = getattr(self.bot_engine.image_matcher, "match_cache", None)
+        if match_cache is not None:
+            cache = match_cache.stats()
+            lines.append("# HELP aom_bot_match_cache_hits_total Template matches answered from the frame cache")
+            lines.append("# TYPE aom_bot_match_cache_hits_total counter")
+            lines.append(f"aom_bot_match_cache_hits_total{_labels(device)} {cache['hits']}")
+            lines.append("# HELP aom_bot_match_cache_misses_total Template matches that had to be computed")
+            lines.append("# TYPE aom_bot_match_cache_misses_total counter")
+            lines.append(f"aom_bot_match_cache_misses_total{_labels(device)} {cache['misses']}")
+
+        lines.extend(self._render_histograms(timings.snapshot(), device))
+        return "\n".join(lines) + "\n"
+
+    def _render_histograms(self, snapshot: Dict, device: Dict[str, str]) -> List[str]:
+        """Converts timing histograms into cumulative Prometheus histograms."""
+        grouped: Dict[str, List] = {}
+        help_texts: Dict[str, str] = {}
+
+        for (stage, label), data in sorted(snapshot.items()):
+            if stage in NAMED_HISTOGRAMS:
+                metric, label_name, help_text = NAMED_HISTOGRAMS[stage]
+                labels = dict(device)
+                if label_name:
+                    labels[label_name] = label
+            else:
+                metric, help_text = GENERIC_HISTOGRAM
+                labels = {**device, "stage": stage, "label": label}
+
+            grouped.setdefault(metric, []).append((labels, data))
+            help_texts[metric] = help_text
+
+        lines: List[str] = []
+        for metric, series in grouped.items():
+            lines.append(f"# HELP {metric} {help_texts[metric]}")
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, data in series:
+                cumulative = 0
+                for bound_ms, count in data["buckets"]:
+                    cumulative += count
+                    le = "+Inf" if bound_ms == float("inf") else repr(bound_ms / 1000.0)
+                    lines.append(f"{metric}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+                lines.append(f"{metric}_sum{_labels(labels)} {data['sum_ms'] / 1000.0}")
+                lines.append(f"{metric}_count{_labels(labels)} {data['count']}")
+        return lines
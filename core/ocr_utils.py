@@ -1,28 +1,75 @@
 import os
 import sys
 import logging
+import threading
+from collections import OrderedDict
 import numpy as np
 import cv2
 from PIL import Image
 import pytesseract
 from pathlib import Path
 
+from core.timing import timed
+from core.digit_recognizer import DigitRecognizer
+from core.ocr_worker import TesseractWorker
+
 
 class OCRHelper:
     """Класс-помощник для работы с OCR."""
 
-    def __init__(self):
+    # Способы распознавания: встроенный распознаватель цифр, Tesseract или оба по очереди
+    METHODS = ("auto", "builtin", "tesseract")
+
+    # Размер (ширина, высота) бинарной миниатюры для перцептивного хеша
+    HASH_SIZE = (24, 8)
+
+    def __init__(self, method="auto", digits_dir=None, use_worker=True, worker_timeout=2.0, cache_size=64):
+        """
+        Args:
+            method: Способ распознавания ("auto", "builtin" или "tesseract")
+            digits_dir: Каталог эталонов цифр для встроенного распознавателя
+            use_worker: Использовать постоянный OCR-воркер вместо запуска tesseract на каждый вызов
+            worker_timeout: Таймаут одного распознавания в OCR-воркере, сек
+            cache_size: Размер LRU-кеша результатов (0 - кеш отключен)
+        """
         self.logger = logging.getLogger("BotLogger")
 
+        # LRU-кеш: перцептивный хеш области -> распознанное число
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        # Результаты Tesseract, ожидающие подтверждения повторным чтением
+        self._pending = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        if method not in self.METHODS:
+            self.logger.warning(f"⚠ Неизвестный способ OCR '{method}', используется 'auto'")
+            method = "auto"
+        self.method = method
+
+        # Встроенный распознаватель цифр фиксированного шрифта игры
+        if digits_dir is None:
+            from config import resource_path
+            digits_dir = resource_path("resources/images/digits")
+        self.digit_recognizer = DigitRecognizer(digits_dir)
+        if self.method != "tesseract" and not self.digit_recognizer.available:
+            self.logger.warning(f"⚠ Эталоны цифр не найдены в {digits_dir}. Встроенный распознаватель отключен "
+                                f"до их создания (python -m bench.build_digits <корпус>).")
+
         # Пытаемся найти Tesseract
         self.tesseract_path = self._find_tesseract()
         if self.tesseract_path:
             pytesseract.pytesseract.tesseract_cmd = self.tesseract_path
             self.logger.info(f"✅ Tesseract OCR найден: {self.tesseract_path}")
             self.ocr_available = True
+
+            # Постоянный воркер: движок Tesseract инициализируется один раз
+            self.ocr_worker = TesseractWorker(self.tesseract_path, worker_timeout) if use_worker else None
         else:
             self.logger.warning("⚠ Tesseract OCR не найден. Будет использоваться приблизительное определение.")
             self.ocr_available = False
+            self.ocr_worker = None
 
     def _find_tesseract(self):
         """Поиск исполняемого файла Tesseract OCR."""
@@ -66,6 +113,7 @@ class OCRHelper:
 
         return None
 
+    @timed("ocr.recognize")
     def recognize_number(self, image, min_val=10, max_val=99, default_val=12):
         """
         Распознает число на изображении с помощью OCR.
@@ -79,9 +127,81 @@ class OCRHelper:
         Returns:
             Распознанное число или значение по умолчанию
         """
-        if not self.ocr_available:
+        # Одинаковые числа отрисовываются одинаково: повторные значения берем из кеша
+        cache_key = self._region_hash(image) if self.cache_size > 0 else None
+        if cache_key is not None:
+            cached_number = self._cache_get(cache_key)
+            if cached_number is not None and min_val <= cached_number <= max_val:
+                self.logger.debug(f"OCR результат из кеша: {cached_number}")
+                return cached_number
+
+        recognized_number = None
+        confirmed = True
+
+        # Сначала встроенный распознаватель: без внешнего процесса, доли миллисекунды
+        if self.method != "tesseract" and self.digit_recognizer.available:
+            recognized_number = self.digit_recognizer.recognize(image)
+            if recognized_number is not None and min_val <= recognized_number <= max_val:
+                self.logger.debug(f"Встроенный OCR результат: {recognized_number}")
+            else:
+                self.logger.debug(f"Встроенный распознаватель не справился (результат: {recognized_number})")
+                recognized_number = None
+
+        # Tesseract используется только как запасной вариант
+        if recognized_number is None and self.method != "builtin" and self.ocr_available:
+            recognized_number = self._recognize_tesseract(image, min_val, max_val)
+            confirmed = False
+
+        if recognized_number is None:
+            # Если что-то пошло не так, возвращаем значение по умолчанию
             return default_val
 
+        if cache_key is not None:
+            if confirmed:
+                self._cache_put(cache_key, recognized_number)
+            else:
+                # Ошибка Tesseract не должна закрепиться в кеше: нужны два одинаковых чтения
+                self._cache_confirm(cache_key, recognized_number)
+        return recognized_number
+
+    @timed("ocr.recognize_many")
+    def recognize_numbers(self, images, min_val=0, max_val=10 ** 9):
+        """
+        Распознает числа сразу в нескольких областях (например, силу всех соперников).
+
+        Все области проходят встроенный распознаватель одним пакетом; Tesseract
+        используется только для областей, которые тот не прочитал.
+
+        Args:
+            images: Список изображений областей с числами
+            min_val: Минимальное допустимое значение
+            max_val: Максимальное допустимое значение
+
+        Returns:
+            Список распознанных чисел (None для нераспознанных областей) в том же порядке
+        """
+        numbers = [None] * len(images)
+
+        if self.method != "tesseract" and self.digit_recognizer.available:
+            for index, number in enumerate(self.digit_recognizer.recognize_many(images)):
+                if number is not None and min_val <= number <= max_val:
+                    numbers[index] = number
+
+        if self.method != "builtin" and self.ocr_available:
+            for index, image in enumerate(images):
+                if numbers[index] is None and image is not None and image.size:
+                    numbers[index] = self._recognize_tesseract(image, min_val, max_val)
+
+        self.logger.debug(f"Распознанные числа: {numbers}")
+        return numbers
+
+    def _recognize_tesseract(self, image, min_val, max_val):
+        """
+        Распознает число с помощью Tesseract.
+
+        Returns:
+            Распознанное число в допустимых пределах или None
+        """
         try:
             # Предварительная обработка изображения для лучшего распознавания
             # Увеличиваем размер для лучшего распознавания
@@ -101,14 +221,22 @@ class OCRHelper:
             kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
             thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
 
-            # Конвертируем в PIL Image для pytesseract
-            pil_img = Image.fromarray(thresh)
+            # Распознавание в постоянном воркере, без запуска процесса
+            result = None
+            if self.ocr_worker and self.ocr_worker.available:
+                result = self.ocr_worker.recognize(thresh)
+
+            if result is None:
+                # Конвертируем в PIL Image для pytesseract
+                pil_img = Image.fromarray(thresh)
 
-            # Настраиваем Tesseract для распознавания только цифр
-            custom_config = r'--oem 3 --psm 6 outputbase digits'
+                # Настраиваем Tesseract для распознавания только цифр
+                custom_config = r'--oem 3 --psm 6 outputbase digits'
 
-            # Распознавание текста
-            result = pytesseract.image_to_string(pil_img, config=custom_config).strip()
+                # Распознавание текста
+                result = pytesseract.image_to_string(pil_img, config=custom_config)
+
+            result = result.strip()
             self.logger.debug(f"OCR результат: '{result}'")
 
             # Извлекаем первое найденное число
@@ -129,5 +257,73 @@ class OCRHelper:
         except Exception as e:
             self.logger.error(f"🚨 Ошибка при OCR-распознавании: {e}")
 
-        # Если что-то пошло не так, возвращаем значение по умолчанию
-        return default_val
\ No newline at end of file
+        return None
+
+    def _region_hash(self, image):
+        """
+        Перцептивный хеш бинаризованной области с числом.
+
+        Область приводится к фиксированному размеру, поэтому сдвиг на пиксель
+        или шум сглаживания не меняют хеш, а разные числа дают разные хеши.
+        """
+        try:
+            binary = self.digit_recognizer.binarize(image)
+            small = cv2.resize(binary, self.HASH_SIZE, interpolation=cv2.INTER_AREA)
+            return np.packbits(small > 127).tobytes()
+        except Exception as e:
+            self.logger.debug(f"Не удалось вычислить хеш области: {e}")
+            return None
+
+    def _cache_get(self, key):
+        with self._cache_lock:
+            number = self._cache.get(key)
+            if number is None:
+                self.cache_misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return number
+
+    def _cache_put(self, key, number):
+        with self._cache_lock:
+            self._cache[key] = number
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_confirm(self, key, number):
+        """
+        Кеширует результат Tesseract, только если предыдущее чтение той же области дало то же число.
+
+        Args:
+            key: Хеш области
+            number: Распознанное число
+        """
+        with self._cache_lock:
+            if self._pending.pop(key, None) != number:
+                self._pending[key] = number
+                while len(self._pending) > self.cache_size:
+                    self._pending.popitem(last=False)
+                return
+        self._cache_put(key, number)
+
+    def cache_stats(self):
+        """
+        Статистика кеша результатов OCR.
+
+        Returns:
+            Словарь с числом попаданий, промахов, размером кеша и долей попаданий
+        """
+        with self._cache_lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "size": len(self._cache),
+                "hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        """Останавливает OCR-воркер."""
+        if self.ocr_worker:
+            self.ocr_worker.close()
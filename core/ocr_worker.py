@@ -0,0 +1,258 @@
+import os
+import glob
+import queue
+import ctypes
+import ctypes.util
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional, Any
+
+import numpy as np
+
+
+class _CApiEngine:
+    """Tesseract engine driven through the libtesseract C API via ctypes."""
+
+    PSM_SINGLE_BLOCK = 6
+
+    def __init__(self, library_path: str, tessdata_dir: Optional[str]):
+        library_dir = os.path.dirname(library_path)
+        if os.name == "nt" and library_dir and hasattr(os, "add_dll_directory"):
+            # Dependent DLLs (leptonica etc.) are shipped next to libtesseract
+            self._dll_directory = os.add_dll_directory(library_dir)
+
+        lib = ctypes.CDLL(library_path)
+        lib.TessBaseAPICreate.restype = ctypes.c_void_p
+        lib.TessBaseAPIInit3.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
+        lib.TessBaseAPIInit3.restype = ctypes.c_int
+        lib.TessBaseAPISetPageSegMode.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessBaseAPISetVariable.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
+        lib.TessBaseAPISetVariable.restype = ctypes.c_bool
+        lib.TessBaseAPISetImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int
+        ]
+        lib.TessBaseAPIGetUTF8Text.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIGetUTF8Text.restype = ctypes.c_void_p
+        lib.TessDeleteText.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIClear.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIEnd.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIDelete.argtypes = [ctypes.c_void_p]
+        self.lib = lib
+
+        self.handle = lib.TessBaseAPICreate()
+        datapath = tessdata_dir.encode("utf-8") if tessdata_dir else None
+        if lib.TessBaseAPIInit3(self.handle, datapath, b"eng") != 0:
+            lib.TessBaseAPIDelete(self.handle)
+            raise RuntimeError("TessBaseAPIInit3 завершился с ошибкой")
+
+        lib.TessBaseAPISetPageSegMode(self.handle, self.PSM_SINGLE_BLOCK)
+        lib.TessBaseAPISetVariable(self.handle, b"tessedit_char_whitelist", b"0123456789")
+
+    def recognize(self, image: np.ndarray) -> str:
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+
+        self.lib.TessBaseAPISetImage(
+            self.handle, image.ctypes.data, width, height, channels, image.strides[0]
+        )
+        text_ptr = self.lib.TessBaseAPIGetUTF8Text(self.handle)
+        try:
+            return ctypes.string_at(text_ptr).decode("utf-8", errors="ignore") if text_ptr else ""
+        finally:
+            if text_ptr:
+                self.lib.TessDeleteText(text_ptr)
+            self.lib.TessBaseAPIClear(self.handle)
+
+    def close(self) -> None:
+        self.lib.TessBaseAPIEnd(self.handle)
+        self.lib.TessBaseAPIDelete(self.handle)
+
+
+class _TesserocrEngine:
+    """Tesseract engine driven through the tesserocr binding."""
+
+    def __init__(self, tessdata_dir: Optional[str]):
+        import tesserocr
+        from PIL import Image
+
+        self._image_class = Image
+        kwargs = {"lang": "eng", "psm": tesserocr.PSM.SINGLE_BLOCK}
+        if tessdata_dir:
+            kwargs["path"] = tessdata_dir
+        self.api = tesserocr.PyTessBaseAPI(**kwargs)
+        self.api.SetVariable("tessedit_char_whitelist", "0123456789")
+
+    def recognize(self, image: np.ndarray) -> str:
+        self.api.SetImage(self._image_class.fromarray(image))
+        return self.api.GetUTF8Text()
+
+    def close(self) -> None:
+        self.api.End()
+
+
+class TesseractWorker:
+    """
+    Long-lived Tesseract OCR worker.
+
+    Instead of launching the `tesseract` executable for every call, one engine
+    is initialised once and kept in a dedicated thread that serves a request
+    queue. The tesserocr binding is used if installed, otherwise libtesseract
+    is loaded with ctypes from the Tesseract installation. Calls that exceed
+    the timeout return None so the caller can fall back to pytesseract.
+    """
+
+    def __init__(self, tesseract_path: Optional[str], timeout: float = 2.0, init_timeout: float = 30.0):
+        """
+        Initialize the worker and start creating the engine in its thread.
+
+        Args:
+            tesseract_path: Path of the tesseract executable, used to locate the library and tessdata
+            timeout: Maximum time to wait for one recognition, seconds
+            init_timeout: Maximum time to wait for the engine to be created, seconds
+        """
+        self.tesseract_path = tesseract_path
+        self.timeout = timeout
+        self.init_timeout = init_timeout
+        self.logger = logging.getLogger("BotLogger")
+
+        self._requests: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._engine: Any = None
+        # Guards `broken`/`_closed` against requests queued after the thread stopped reading
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._closed = False
+
+        # Set when the engine cannot be created or got stuck; callers fall back to pytesseract
+        self.broken = False
+
+        # Engine start-up does not count against the recognition timeout
+        self._thread = threading.Thread(target=self._run, name="OCRWorker", daemon=True)
+        self._thread.start()
+
+    @property
+    def available(self) -> bool:
+        """True if the worker can (still) be used."""
+        return not self.broken
+
+    def _tessdata_dir(self) -> Optional[str]:
+        prefix = os.environ.get("TESSDATA_PREFIX")
+        if prefix:
+            return prefix
+        if self.tesseract_path:
+            candidate = os.path.join(os.path.dirname(self.tesseract_path), "tessdata")
+            if os.path.isdir(candidate):
+                return candidate
+        return None
+
+    def _find_library(self) -> Optional[str]:
+        if self.tesseract_path:
+            base_dir = os.path.dirname(self.tesseract_path)
+            patterns = ["libtesseract*.dll", "tesseract*.dll"] if os.name == "nt" else [
+                "libtesseract*.so*", "libtesseract*.dylib", "../lib/libtesseract*.so*", "../lib/libtesseract*.dylib"
+            ]
+            for pattern in patterns:
+                matches = sorted(glob.glob(os.path.join(base_dir, pattern)))
+                if matches:
+                    return matches[-1]
+        return ctypes.util.find_library("tesseract")
+
+    def _create_engine(self):
+        tessdata_dir = self._tessdata_dir()
+        try:
+            engine = _TesserocrEngine(tessdata_dir)
+            self.logger.info("✅ OCR-воркер использует tesserocr")
+            return engine
+        except ImportError:
+            pass
+
+        library_path = self._find_library()
+        if not library_path:
+            raise RuntimeError("библиотека libtesseract не найдена")
+        engine = _CApiEngine(library_path, tessdata_dir)
+        self.logger.info(f"✅ OCR-воркер использует {library_path}")
+        return engine
+
+    def _run(self) -> None:
+        try:
+            self._engine = self._create_engine()
+        except Exception as e:
+            self.logger.warning(f"⚠ Постоянный OCR-воркер недоступен, используется pytesseract: {e}")
+            with self._lock:
+                self.broken = True
+            self._fail_pending(e)
+            return
+        finally:
+            self._ready.set()
+
+        while True:
+            request = self._requests.get()
+            if request is None:
+                break
+
+            image, future = request
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._engine.recognize(image))
+            except Exception as e:
+                future.set_exception(e)
+
+        self._engine.close()
+
+    def _fail_pending(self, error: Exception) -> None:
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                return
+            if request is not None:
+                request[1].set_exception(error)
+
+    def recognize(self, image: np.ndarray) -> Optional[str]:
+        """
+        Recognizes text on a preprocessed image.
+
+        Args:
+            image: Grayscale or binary image (numpy array)
+
+        Returns:
+            Recognized text or None if the worker is unavailable, failed or timed out
+        """
+        if self.broken:
+            return None
+
+        if not self._ready.wait(self.init_timeout):
+            self.logger.error(f"🚨 OCR-воркер не запустился за {self.init_timeout} с, переключаемся на pytesseract")
+            self.broken = True
+            return None
+
+        future: Future = Future()
+        with self._lock:
+            # Nobody reads the queue once the worker failed or was closed
+            if self.broken or self._closed:
+                return None
+            self._requests.put((image, future))
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            # A stuck engine cannot be interrupted in-process; stop using it
+            self.logger.error(f"🚨 OCR-воркер не ответил за {self.timeout} с, переключаемся на pytesseract")
+            self.broken = True
+        except Exception as e:
+            # Engine start-up failures are already reported by the worker thread
+            if not self.broken:
+                self.logger.error(f"🚨 Ошибка OCR-воркера: {e}")
+        return None
+
+    def close(self) -> None:
+        """Stops the worker thread and releases the engine."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._requests.put(None)
+        self._thread.join(timeout=self.timeout)
@@ -0,0 +1,161 @@
+import os
+import json
+import logging
+import threading
+from typing import Dict, Tuple, Optional, Any
+
+
+class SearchRegionLearner:
+    """
+    Learns where templates appear on screen and narrows the search to that region.
+
+    For every template and screen resolution the bounding box of past match
+    locations is kept. Once a template has been found `min_samples` times,
+    matching is limited to that box expanded by `margin` pixels. Every
+    `verify_every`-th search still scans the full frame, so a changed layout
+    is picked up: a full-frame match far outside the learned box restarts
+    learning for that template.
+    """
+
+    def __init__(self,
+                 regions_file: Optional[str] = None,
+                 margin: int = 20,
+                 min_samples: int = 3,
+                 verify_every: int = 20):
+        """
+        Initialize the learner.
+
+        Args:
+            regions_file: JSON file to persist learned regions (None - keep in memory only)
+            margin: Extra pixels around the learned box
+            min_samples: Matches required before the search is narrowed
+            verify_every: Every N-th search of a template scans the full frame
+        """
+        self.regions_file = regions_file
+        self.margin = margin
+        self.min_samples = min_samples
+        self.verify_every = verify_every
+        self.logger = logging.getLogger("BotLogger")
+
+        # "template|WxH" -> {"x1", "y1", "x2", "y2", "count"} (box of top-left match corners)
+        self.regions: Dict[str, Dict[str, int]] = {}
+        self._searches: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self.load()
+
+    @staticmethod
+    def _key(template_name: str, screen_shape: Tuple[int, ...]) -> str:
+        return f"{template_name}|{screen_shape[1]}x{screen_shape[0]}"
+
+    def load(self) -> bool:
+        """Loads learned regions from the regions file."""
+        if not self.regions_file or not os.path.exists(self.regions_file):
+            return False
+        try:
+            with open(self.regions_file, "r", encoding="utf-8") as f:
+                self.regions = json.load(f)
+            self.logger.info(f"Загружены области поиска для {len(self.regions)} шаблонов")
+            return True
+        except Exception as e:
+            self.logger.error(f"Ошибка при загрузке областей поиска: {e}")
+            return False
+
+    def save(self) -> bool:
+        """Writes learned regions to the regions file (atomically)."""
+        if not self.regions_file:
+            return False
+        try:
+            with self._lock:
+                data = json.dumps(self.regions, indent=4)
+            temp_file = self.regions_file + ".tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_file, self.regions_file)
+            return True
+        except Exception as e:
+            self.logger.error(f"Ошибка при сохранении областей поиска: {e}")
+            return False
+
+    def region(self,
+               template_name: str,
+               screen_shape: Tuple[int, ...],
+               template_shape: Tuple[int, ...]) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Returns the region to search for the template on this search.
+
+        Args:
+            template_name: Template file name
+            screen_shape: Shape of the decoded screen
+            template_shape: Shape of the template image
+
+        Returns:
+            (x, y, width, height) of the search window or None for a full-frame search
+        """
+        key = self._key(template_name, screen_shape)
+        with self._lock:
+            searches = self._searches.get(key, 0) + 1
+            self._searches[key] = searches
+
+            learned = self.regions.get(key)
+            if not learned or learned["count"] < self.min_samples:
+                return None
+            if self.verify_every and searches % self.verify_every == 0:
+                return None
+
+            screen_h, screen_w = screen_shape[:2]
+            template_h, template_w = template_shape[:2]
+            x1 = max(0, learned["x1"] - self.margin)
+            y1 = max(0, learned["y1"] - self.margin)
+            x2 = min(screen_w, learned["x2"] + template_w + self.margin)
+            y2 = min(screen_h, learned["y2"] + template_h + self.margin)
+
+        if x2 - x1 < template_w or y2 - y1 < template_h:
+            return None
+        return x1, y1, x2 - x1, y2 - y1
+
+    def record(self, template_name: str, screen_shape: Tuple[int, ...], location: Tuple[int, int]) -> None:
+        """
+        Records a match location.
+
+        Args:
+            template_name: Template file name
+            screen_shape: Shape of the decoded screen
+            location: Top-left corner of the match in full-frame coordinates
+        """
+        key = self._key(template_name, screen_shape)
+        x, y = int(location[0]), int(location[1])
+        changed = False
+
+        with self._lock:
+            learned = self.regions.get(key)
+            if learned is None:
+                self.regions[key] = {"x1": x, "y1": y, "x2": x, "y2": y, "count": 1}
+                changed = True
+            else:
+                far_away = (
+                    learned["count"] >= self.min_samples and
+                    (x < learned["x1"] - self.margin or x > learned["x2"] + self.margin or
+                     y < learned["y1"] - self.margin or y > learned["y2"] + self.margin)
+                )
+                if far_away:
+                    # The layout changed: start learning from the new location
+                    self.logger.info(f"Шаблон {template_name} найден вне изученной области, область сброшена")
+                    self.regions[key] = {"x1": x, "y1": y, "x2": x, "y2": y, "count": 1}
+                    changed = True
+                else:
+                    box = (min(learned["x1"], x), min(learned["y1"], y),
+                           max(learned["x2"], x), max(learned["y2"], y))
+                    changed = box != (learned["x1"], learned["y1"], learned["x2"], learned["y2"])
+                    changed = changed or learned["count"] + 1 == self.min_samples
+                    learned["x1"], learned["y1"], learned["x2"], learned["y2"] = box
+                    learned["count"] += 1
+
+        # Regions stabilise quickly, so the file is rewritten only when a box changes
+        if changed:
+            self.save()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns a copy of the learned regions."""
+        with self._lock:
+            return {key: dict(value) for key, value in self.regions.items()}
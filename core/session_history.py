@@ -0,0 +1,208 @@
+import logging
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class SessionHistory:
+    """
+    History of finished bot sessions held as NumPy columns.
+
+    Every session is a row: start and end as epoch seconds, duration, the
+    number of sessions it stands for (more than one for archive summaries)
+    and one int64 column per statistics counter. Rows are kept sorted by end
+    time, so a period is a `searchsorted` slice and a per-day breakdown is
+    a single `bincount`; timestamps are parsed once, when a row is added.
+    The list-of-dicts form used by the snapshot file and the UI is built
+    on demand and cached until the next change.
+
+    Changes replace the columns one by one, so the class is not safe for
+    concurrent use: StatsManager reads and writes it under its own lock.
+    """
+
+    def __init__(self, keys: Iterable[str]):
+        """
+        Args:
+            keys: Statistics counters stored per session, in column order
+        """
+        self.keys: List[str] = list(keys)
+        self.logger = logging.getLogger("BotLogger")
+
+        self.start = np.empty(0, dtype=np.float64)
+        self.end = np.empty(0, dtype=np.float64)
+        self.duration = np.empty(0, dtype=np.float64)
+        self.sessions = np.empty(0, dtype=np.int64)
+        self.counts = np.empty((0, len(self.keys)), dtype=np.int64)
+
+        self._records: Optional[List[Dict[str, Any]]] = None
+
+    @classmethod
+    def from_records(cls, keys: Iterable[str], records: Iterable[Dict[str, Any]]) -> "SessionHistory":
+        """
+        Builds the columns from session records ({"start_time", "end_time", "duration_seconds", "stats"}).
+
+        Records without valid timestamps are skipped with a warning.
+        """
+        history = cls(keys)
+        rows = [row for row in (history._parse(record) for record in records) if row is not None]
+        if rows:
+            starts, ends, durations, sessions, counts = zip(*rows)
+            order = np.argsort(np.array(ends), kind="stable")
+            history.start = np.array(starts, dtype=np.float64)[order]
+            history.end = np.array(ends, dtype=np.float64)[order]
+            history.duration = np.array(durations, dtype=np.float64)[order]
+            history.sessions = np.array(sessions, dtype=np.int64)[order]
+            history.counts = np.array(counts, dtype=np.int64).reshape(len(rows), len(history.keys))[order]
+        return history
+
+    def _parse(self, record: Dict[str, Any]) -> Optional[Tuple[float, float, float, int, List[int]]]:
+        try:
+            start = datetime.datetime.fromisoformat(record["start_time"]).timestamp()
+            end = datetime.datetime.fromisoformat(record["end_time"]).timestamp()
+        except (KeyError, TypeError, ValueError) as e:
+            self.logger.warning(f"Ошибка обработки записи истории: {e}")
+            return None
+        stats = record.get("stats", {})
+        duration = float(record.get("duration_seconds", end - start))
+        sessions = int(record.get("sessions", 1))
+        return start, end, duration, sessions, [int(stats.get(key, 0)) for key in self.keys]
+
+    def __len__(self) -> int:
+        return len(self.end)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Adds a session record, keeping rows sorted by end time."""
+        row = self._parse(record)
+        if row is None:
+            return
+        start, end, duration, sessions, counts = row
+        index = int(np.searchsorted(self.end, end, side="right"))
+        self.start = np.insert(self.start, index, start)
+        self.end = np.insert(self.end, index, end)
+        self.duration = np.insert(self.duration, index, duration)
+        self.sessions = np.insert(self.sessions, index, sessions)
+        self.counts = np.insert(self.counts, index, counts, axis=0)
+        self._records = None
+
+    def take_before(self, moment: float) -> List[Dict[str, Any]]:
+        """
+        Removes the sessions that ended before a moment.
+
+        Args:
+            moment: Epoch seconds
+
+        Returns:
+            Records of the removed sessions in chronological order
+        """
+        first = int(np.searchsorted(self.end, moment, side="left"))
+        if first == 0:
+            return []
+        taken = self.records()[:first]
+        self.start = self.start[first:]
+        self.end = self.end[first:]
+        self.duration = self.duration[first:]
+        self.sessions = self.sessions[first:]
+        self.counts = self.counts[first:]
+        self._records = None
+        return taken
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Sessions as a list of dicts in chronological order (cached, do not modify)."""
+        if self._records is None:
+            self._records = [
+                {
+                    "start_time": datetime.datetime.fromtimestamp(start).isoformat(),
+                    "end_time": datetime.datetime.fromtimestamp(end).isoformat(),
+                    "duration_seconds": float(duration),
+                    "sessions": int(sessions),
+                    "stats": dict(zip(self.keys, (int(value) for value in counts)))
+                }
+                for start, end, duration, sessions, counts in zip(self.start, self.end, self.duration,
+                                                                  self.sessions, self.counts)
+            ]
+        return self._records
+
+    def totals(self, since: Optional[float] = None) -> Tuple[np.ndarray, float, int]:
+        """
+        Sums the sessions that ended at or after a moment.
+
+        Args:
+            since: Epoch seconds (None - all sessions)
+
+        Returns:
+            (counter sums in `keys` order, total duration in seconds, number of sessions)
+        """
+        first = 0 if since is None else int(np.searchsorted(self.end, since, side="left"))
+        return (self.counts[first:].sum(axis=0), float(self.duration[first:].sum()),
+                int(self.sessions[first:].sum()))
+
+    def binned(self, now: float, bin_seconds: float, bins: int) -> np.ndarray:
+        """
+        Sums the sessions into bins counted back from a moment.
+
+        Bin 0 holds sessions that ended less than `bin_seconds` before `now`,
+        bin 1 the ones before that, and so on.
+
+        Returns:
+            (bins, len(keys)) array of counter sums
+        """
+        key_count = len(self.keys)
+        first = int(np.searchsorted(self.end, now - bins * bin_seconds, side="left"))
+        ago = np.floor((now - self.end[first:]) / bin_seconds).astype(np.int64)
+        inside = (ago >= 0) & (ago < bins)
+
+        cells = (ago[inside, None] * key_count + np.arange(key_count)).ravel()
+        sums = np.bincount(cells, weights=self.counts[first:][inside].ravel(), minlength=bins * key_count)
+        return sums.reshape(bins, key_count).astype(np.int64)
+
+
+def roll_up(records: Iterable[Dict[str, Any]],
+            level: str,
+            keys: Iterable[str],
+            summaries: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    Merges session (or daily summary) records into daily or monthly summary records.
+
+    A summary covers the sessions that ended on one calendar day ("day") or
+    in one month ("month"): counters and durations are summed, "sessions"
+    counts the original sessions, start/end span all of them.
+
+    Args:
+        records: Records to merge
+        level: "day" or "month"
+        keys: Statistics counters
+        summaries: Existing summaries to merge into (updated in place)
+
+    Returns:
+        The summaries, sorted by end time
+    """
+    period_format = "%Y-%m-%d" if level == "day" else "%Y-%m"
+    summaries = summaries if summaries is not None else []
+    by_period = {(summary["summary"], summary["period"]): summary for summary in summaries}
+
+    for record in records:
+        period = datetime.datetime.fromisoformat(record["end_time"]).strftime(period_format)
+        summary = by_period.get((level, period))
+        if summary is None:
+            summary = {
+                "summary": level,
+                "period": period,
+                "start_time": record["start_time"],
+                "end_time": record["end_time"],
+                "duration_seconds": 0.0,
+                "sessions": 0,
+                "stats": {key: 0 for key in keys}
+            }
+            by_period[(level, period)] = summary
+            summaries.append(summary)
+
+        summary["start_time"] = min(summary["start_time"], record["start_time"])
+        summary["end_time"] = max(summary["end_time"], record["end_time"])
+        summary["duration_seconds"] += record.get("duration_seconds", 0.0)
+        summary["sessions"] += record.get("sessions", 1)
+        for key, value in record.get("stats", {}).items():
+            summary["stats"][key] = summary["stats"].get(key, 0) + value
+
+    summaries.sort(key=lambda summary: summary["end_time"])
+    return summaries
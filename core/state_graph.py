@@ -0,0 +1,294 @@
+import json
+import logging
+from typing import Dict, List, Tuple, Optional, Callable, Any, Union
+
+
+class FlowError(ValueError):
+    """Raised when the flow description is invalid."""
+
+
+# A compiled action: (engine, frame context) -> next state that ends the outcome early, or None
+Action = Callable[[Any, "FrameContext"], Optional[Any]]
+
+
+class FrameContext:
+    """Data shared by the actions of one state run."""
+
+    __slots__ = ("screen_data", "template", "location")
+
+    def __init__(self, screen_data: Optional[bytes] = None):
+        self.screen_data = screen_data
+        self.template: Optional[str] = None
+        self.location: Optional[Tuple[int, int]] = None
+
+
+class Outcome:
+    """Actions to run followed by the state to switch to."""
+
+    __slots__ = ("actions", "next_state")
+
+    def __init__(self, actions: Tuple[Action, ...], next_state):
+        self.actions = actions
+        self.next_state = next_state
+
+    def run(self, engine, context: FrameContext):
+        for action in self.actions:
+            override = action(engine, context)
+            if override is not None:
+                return override
+            # The sleeps no longer wait, so the remaining taps would hit whatever is on screen;
+            # the engine turns this into CONNECTION_LOST if the watchdog cancelled them
+            if engine.waits_cancelled():
+                return None
+        return self.next_state
+
+
+class CompiledState:
+    """
+    Dispatch entry of one state.
+
+    Attributes:
+        state: The bot state
+        entry: Actions run when the state is entered
+        templates: Templates that can follow the state, in priority order
+        routes: Template name -> outcome when it is found
+        regions: Template name -> search region (x, y, width, height) at the reference resolution
+        timeout: Returns the wait time in seconds (0 - classify a single frame)
+        interval: Returns the time between checks in seconds
+        otherwise: Outcome when no template was found
+        no_frame: Outcome when a single-frame state could not capture the screen
+    """
+
+    __slots__ = ("state", "entry", "templates", "routes", "regions", "timeout", "interval",
+                 "otherwise", "no_frame")
+
+    def __init__(self, state, entry, templates, routes, regions, timeout, interval, otherwise, no_frame):
+        self.state = state
+        self.entry = entry
+        self.templates = templates
+        self.routes = routes
+        self.regions = regions
+        self.timeout = timeout
+        self.interval = interval
+        self.otherwise = otherwise
+        self.no_frame = no_frame
+
+
+class StateGraph:
+    """
+    Declarative bot flow loaded from a JSON file.
+
+    The file lists named tap coordinates, the opponent rows of the
+    selection screen and, for every bot state, the
+    actions to run on entry, the templates that can follow the state (with
+    optional search regions), what to do when one of them is found and what
+    to do otherwise. `compile` validates the description once and turns it
+    into a dispatch table, so at run time each state only evaluates its own
+    templates.
+
+    Actions: {"tap": name}, {"sleep": seconds}, {"count": stat}, {"call": hook},
+    {"log": text, "level": "info"|"warning"|"error"}. Timeouts and intervals are
+    numbers or config references such as "bot.battle_timeout".
+    """
+
+    LOG_LEVELS = ("debug", "info", "warning", "error")
+
+    def __init__(self, data: Dict[str, Any], source: str = "<flow>"):
+        self.data = data
+        self.source = source
+        self.logger = logging.getLogger("BotLogger")
+
+    @classmethod
+    def load(cls, path: str) -> "StateGraph":
+        """
+        Loads the flow description from a JSON file.
+
+        Raises:
+            FlowError: The file cannot be read or parsed
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f), path)
+        except (OSError, ValueError) as e:
+            raise FlowError(f"Не удалось загрузить описание сценария {path}: {e}")
+
+    @property
+    def taps(self) -> Dict[str, Tuple[int, int]]:
+        """Named tap coordinates at the reference resolution."""
+        return {name: (int(point[0]), int(point[1])) for name, point in self.data.get("taps", {}).items()}
+
+    @property
+    def opponents(self) -> List[Dict[str, Any]]:
+        """
+        Opponent rows of the selection screen at the reference resolution.
+
+        Returns:
+            List of {"power": (x, y, w, h) of the power value, "tap": (x, y) selecting the row or None}
+
+        Raises:
+            FlowError: A row has no valid power region or tap point
+        """
+        rows = []
+        for index, row in enumerate(self.data.get("opponents", [])):
+            power = row.get("power")
+            if not power or len(power) != 4:
+                raise FlowError(f"{self.source}: область силы соперника {index} должна быть [x, y, w, h]")
+            tap = row.get("tap")
+            if tap is not None and len(tap) != 2:
+                raise FlowError(f"{self.source}: точка выбора соперника {index} должна быть [x, y]")
+            rows.append({
+                "power": tuple(int(value) for value in power),
+                "tap": (int(tap[0]), int(tap[1])) if tap is not None else None,
+            })
+        return rows
+
+    @property
+    def watchdog_templates(self) -> Dict[str, Optional[Tuple[int, int, int, int]]]:
+        """
+        Connection-loss templates checked by the background watchdog.
+
+        Returns:
+            Template name -> search region (x, y, w, h) at the reference resolution or None
+            (full frame), in check order; empty if the flow has no "watchdog" section
+
+        Raises:
+            FlowError: A template has no name or an invalid region
+        """
+        templates = {}
+        for index, entry in enumerate(self.data.get("watchdog", {}).get("templates", [])):
+            template = entry.get("template")
+            if not template:
+                raise FlowError(f"{self.source}: шаблон фоновой проверки {index} без имени")
+            roi = entry.get("roi")
+            if roi is not None and len(roi) != 4:
+                raise FlowError(f"{self.source}: область {template} фоновой проверки должна быть [x, y, w, h]")
+            templates[template] = tuple(int(value) for value in roi) if roi is not None else None
+        return templates
+
+    def compile(self,
+                states,
+                hooks: Dict[str, Callable],
+                counters: List[str]) -> Dict[Any, CompiledState]:
+        """
+        Validates the flow and builds the dispatch table.
+
+        Args:
+            states: Enum of bot states
+            hooks: Callable hooks available to {"call": ...} actions, name -> function(context)
+            counters: Statistics keys available to {"count": ...} actions
+
+        Returns:
+            Dictionary state -> compiled state
+
+        Raises:
+            FlowError: The description refers to unknown states, taps, hooks or counters
+        """
+        described = self.data.get("states", {})
+        missing = [state.name for state in states if state.name not in described]
+        if missing:
+            raise FlowError(f"{self.source}: не описаны состояния {', '.join(missing)}")
+
+        taps = self.taps
+        table = {}
+        for name, spec in described.items():
+            state = self._state(states, name, name)
+            table[state] = self._compile_state(state, spec, states, taps, hooks, counters)
+        return table
+
+    def _state(self, states, name: str, where: str):
+        try:
+            return states[name]
+        except KeyError:
+            raise FlowError(f"{self.source}: неизвестное состояние '{name}' ({where})")
+
+    def _compile_state(self, state, spec, states, taps, hooks, counters) -> CompiledState:
+        where = state.name
+
+        def outcome(outcome_spec: Optional[Dict], default_next=None) -> Outcome:
+            outcome_spec = outcome_spec or {}
+            next_name = outcome_spec.get("next")
+            next_state = self._state(states, next_name, where) if next_name else default_next
+            if next_state is None:
+                raise FlowError(f"{self.source}: в состоянии {where} не указан переход 'next'")
+            actions = tuple(self._compile_action(action, where, taps, hooks, counters)
+                            for action in outcome_spec.get("actions", []))
+            return Outcome(actions, next_state)
+
+        entry = tuple(self._compile_action(action, where, taps, hooks, counters)
+                      for action in spec.get("actions", []))
+
+        detect = spec.get("detect")
+        if detect is None:
+            # Plain state: entry actions, then an unconditional transition
+            return CompiledState(state, entry, (), {}, {}, lambda: 0, lambda: 0,
+                                 outcome({"next": spec.get("next")}), None)
+
+        templates: List[str] = []
+        routes: Dict[str, Outcome] = {}
+        regions: Dict[str, Tuple[int, int, int, int]] = {}
+        for entry_spec in detect.get("templates", []):
+            template = entry_spec.get("template")
+            if not template:
+                raise FlowError(f"{self.source}: шаблон без имени в состоянии {where}")
+            templates.append(template)
+            routes[template] = outcome(entry_spec)
+            if entry_spec.get("roi"):
+                roi = entry_spec["roi"]
+                if len(roi) != 4:
+                    raise FlowError(f"{self.source}: область {template} в состоянии {where} должна быть [x, y, w, h]")
+                regions[template] = tuple(int(value) for value in roi)
+
+        otherwise = outcome(spec.get("otherwise"))
+        no_frame = outcome(spec["no_frame"]) if "no_frame" in spec else otherwise
+
+        return CompiledState(
+            state, entry, tuple(templates), routes, regions,
+            self._setting(detect.get("timeout", 0), where),
+            self._setting(detect.get("interval", 1), where),
+            otherwise, no_frame
+        )
+
+    def _setting(self, value: Union[int, float, str], where: str) -> Callable[[], float]:
+        """Compiles a number or a "section.key" config reference into a getter."""
+        if isinstance(value, (int, float)):
+            return lambda: value
+        if isinstance(value, str) and value.count(".") == 1:
+            section, key = value.split(".")
+
+            def getter():
+                from config import config
+                return config.get(section, key)
+            return getter
+        raise FlowError(f"{self.source}: некорректное значение '{value}' в состоянии {where}")
+
+    def _compile_action(self, spec: Dict[str, Any], where: str, taps, hooks, counters) -> Action:
+        if "tap" in spec:
+            name = spec["tap"]
+            if name not in taps:
+                raise FlowError(f"{self.source}: неизвестная точка нажатия '{name}' в состоянии {where}")
+            return lambda engine, context: engine._tap(name)
+
+        if "sleep" in spec:
+            seconds = float(spec["sleep"])
+            return lambda engine, context: engine._sleep(seconds)
+
+        if "count" in spec:
+            counter = spec["count"]
+            if counter not in counters:
+                raise FlowError(f"{self.source}: неизвестный счетчик '{counter}' в состоянии {where}")
+            return lambda engine, context: engine._count(counter)
+
+        if "call" in spec:
+            hook = hooks.get(spec["call"])
+            if hook is None:
+                raise FlowError(f"{self.source}: неизвестное действие '{spec['call']}' в состоянии {where}")
+            return lambda engine, context: hook(context)
+
+        if "log" in spec:
+            text = spec["log"]
+            level = spec.get("level", "info")
+            if level not in self.LOG_LEVELS:
+                raise FlowError(f"{self.source}: неизвестный уровень журнала '{level}' в состоянии {where}")
+            return lambda engine, context: getattr(engine.logger, level)(text)
+
+        raise FlowError(f"{self.source}: неизвестное действие {spec} в состоянии {where}")
@@ -2,36 +2,56 @@ import os
 import json
 import logging
 import datetime
+import threading
 from typing import Dict, List, Any, Optional
 
+from core.session_history import SessionHistory, roll_up
+
 
 class StatsManager:
     """
     Manages statistics for the bot, including persistence between sessions.
 
     Features:
-    - Load and save statistics to a JSON file
+    - Crash-safe persistence: changes are appended to a JSONL journal and
+      periodically compacted into an atomically written JSON snapshot
+    - Retention: sessions older than `raw_days` are rolled into daily summaries,
+      daily summaries older than `daily_days` into monthly ones, kept in an archive
     - Track statistics over time with timestamps
     - Provide aggregated statistics for different time periods
     - Maintain a historical record of all bot runs
     """
 
-    def __init__(self, stats_dir: str):
+    # Journal events appended before they are compacted into the snapshot
+    COMPACT_EVERY = 200
+
+    def __init__(self, stats_dir: str, compact_every: int = COMPACT_EVERY, write_delay: float = 2.0,
+                 raw_days: int = 90, daily_days: int = 365):
         """
         Initialize the stats manager.
 
         Args:
             stats_dir: Directory to store statistics files
+            compact_every: Compact the journal into the snapshot after this many events
+            write_delay: Updates arriving within this window are written together, seconds
+            raw_days: Keep individual sessions for this many days (0 - forever)
+            daily_days: Keep daily summaries for this many days, then merge them by month
         """
         self.logger = logging.getLogger("BotLogger")
         self.stats_dir = stats_dir
+        self.compact_every = compact_every
+        self.write_delay = write_delay
+        self.raw_days = raw_days
+        self.daily_days = daily_days
 
         # Create stats directory if it doesn't exist
         if not os.path.exists(self.stats_dir):
             os.makedirs(self.stats_dir, exist_ok=True)
 
-        # Path to the main stats file
+        # Snapshot of all sessions and the append-only journal of changes since it
         self.stats_file = os.path.join(self.stats_dir, "bot_stats.json")
+        self.journal_file = os.path.join(self.stats_dir, "bot_stats.journal.jsonl")
+        self.archive_file = os.path.join(self.stats_dir, "bot_stats_archive.json")
 
         # Current session stats
         self.current_stats = {
@@ -43,8 +63,27 @@ class StatsManager:
             "keys_collected": 0
         }
 
-        # Historical stats with timestamps
-        self.history = []
+        # Values of the current session already written to the journal.
+        # The engine shares current_stats, so changes are found against this copy.
+        self._journaled = dict(self.current_stats)
+
+        # Historical stats with timestamps (finished sessions), stored as columns
+        self.sessions = SessionHistory(self.current_stats)
+
+        # Daily and monthly summaries of older sessions; sessions that ended
+        # before archived_before (epoch seconds) are counted only here
+        self.archive_summaries: List[Dict[str, Any]] = []
+        self.archive = SessionHistory(self.current_stats)
+        self.archived_before = 0.0
+
+        # Sequence number of the last journal event and events since the last compaction
+        self._journal_seq = 0
+        self._journal_events = 0
+
+        # _lock guards the in-memory state and is never held during disk I/O;
+        # _io_lock serialises writes of the journal and the snapshot
+        self._lock = threading.RLock()
+        self._io_lock = threading.Lock()
 
         # Session start time
         self.session_start = datetime.datetime.now()
@@ -52,88 +91,318 @@ class StatsManager:
         # Load previous stats
         self.load_stats()
 
+        # Writes happen in the background, so the bot thread never waits for the disk
+        self._dirty = threading.Event()
+        self._closing = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="StatsWriter", daemon=True)
+        self._writer.start()
+
         # Log initialization
-        self.logger.info(f"Статистика инициализирована. Загружено {len(self.history)} исторических записей.")
+        self.logger.info(f"Статистика инициализирована. Загружено {len(self.sessions)} исторических записей.")
+
+    @property
+    def history(self) -> List[Dict[str, Any]]:
+        """Sessions as a list of dicts in chronological order, the current one last if it has any stats."""
+        with self._lock:
+            history = list(self.sessions.records())
+            session_record = self._session_record(self.current_stats)
+        if session_record is not None:
+            history.append(session_record)
+        return history
 
     def load_stats(self) -> bool:
         """
-        Load statistics from file.
+        Load statistics: the snapshot, then the journal events written after it.
 
         Returns:
             True if statistics were successfully loaded, False otherwise
         """
-        if not os.path.exists(self.stats_file):
-            self.logger.info("Файл статистики не найден. Будет создан новый файл.")
-            return False
+        with self._lock:
+            snapshot_seq = 0
+            loaded = False
+            records = []
+            if os.path.exists(self.stats_file):
+                try:
+                    with open(self.stats_file, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+
+                    records = data.get("history", [])
+                    snapshot_seq = data.get("journal_seq", 0)
+                    loaded = True
+                except Exception as e:
+                    self.logger.error(f"Ошибка при загрузке статистики: {e}")
+            else:
+                self.logger.info("Файл статистики не найден. Будет создан новый файл.")
+
+            replayed = self._replay_journal(snapshot_seq, records)
+            self.sessions = SessionHistory.from_records(self.current_stats, records)
+            self._journal_seq = max(self._journal_seq, snapshot_seq)
+
+            # A crash after the archive was written may have left archived sessions in the snapshot
+            self._load_archive()
+            self.sessions.take_before(self.archived_before)
 
+            if replayed:
+                self.logger.info(f"Восстановлено {replayed} изменений статистики из журнала.")
+            journal_pending = os.path.exists(self.journal_file) and os.path.getsize(self.journal_file) > 0
+            try:
+                archive = self._retain()
+                if archive is not None:
+                    self._write_json(self.archive_file, archive)
+                if archive is not None or journal_pending:
+                    # Fold the journal into the snapshot so new events never follow a torn record
+                    self._write_snapshot(self._snapshot_data())
+            except Exception as e:
+                self.logger.error(f"Ошибка при сжатии журнала статистики: {e}")
+            if loaded and not replayed:
+                self.logger.info("Статистика успешно загружена.")
+            return loaded or replayed > 0
+
+    def _load_archive(self) -> None:
+        """Loads the daily and monthly summaries of old sessions."""
+        if not os.path.exists(self.archive_file):
+            return
         try:
-            with open(self.stats_file, "r", encoding="utf-8") as f:
+            with open(self.archive_file, "r", encoding="utf-8") as f:
                 data = json.load(f)
+            self.archive_summaries = data.get("summaries", [])
+            self.archived_before = data.get("archived_before", 0.0)
+            self.archive = SessionHistory.from_records(self.current_stats, self.archive_summaries)
+        except Exception as e:
+            self.logger.error(f"Ошибка при загрузке архива статистики: {e}")
 
-            if "history" in data:
-                self.history = data["history"]
+    def _retain(self, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Moves sessions older than the retention window into the archive summaries.
 
-            if "total" in data:
-                # Initialize current stats with total values
-                for key in self.current_stats:
-                    if key in data["total"]:
-                        # Only keep the value for display purposes, will be added to later
-                        pass
+        Args:
+            now: Current time, epoch seconds
 
-            self.logger.info("Статистика успешно загружена.")
-            return True
-        except Exception as e:
-            self.logger.error(f"Ошибка при загрузке статистики: {e}")
-            return False
+        Returns:
+            Archive data to write, or None if nothing had to be moved
+        """
+        if self.raw_days <= 0:
+            return None
+        now = now if now is not None else datetime.datetime.now().timestamp()
+        raw_cutoff = now - self.raw_days * 86400
+        daily_cutoff = now - max(self.daily_days, self.raw_days) * 86400
+
+        with self._lock:
+            expired = self.sessions.take_before(raw_cutoff)
+            summaries = roll_up(expired, "day", self.current_stats, list(self.archive_summaries))
+            # Days that expired in this pass may already be older than daily_days
+            stale_days = [summary for summary in summaries
+                          if summary["summary"] == "day" and
+                          datetime.datetime.fromisoformat(summary["end_time"]).timestamp() < daily_cutoff]
+            if not expired and not stale_days:
+                return None
+
+            stale_ids = {id(summary) for summary in stale_days}
+            summaries = [summary for summary in summaries if id(summary) not in stale_ids]
+            roll_up(stale_days, "month", self.current_stats, summaries)
+
+            self.archive_summaries = summaries
+            self.archive = SessionHistory.from_records(self.current_stats, summaries)
+            self.archived_before = max(self.archived_before, raw_cutoff)
+
+            self.logger.info(f"В архив статистики перенесено сессий: {len(expired)}, "
+                             f"дневных сводок объединено по месяцам: {len(stale_days)}")
+            return {"archived_before": self.archived_before, "summaries": summaries}
+
+    def _replay_journal(self, snapshot_seq: int, records: List[Dict[str, Any]]) -> int:
+        """
+        Applies journal events newer than the snapshot to the history records.
+
+        Args:
+            snapshot_seq: Sequence number of the last event included in the snapshot
+            records: Session records of the snapshot, updated in place
+
+        Returns:
+            Number of applied events
+        """
+        if not os.path.exists(self.journal_file):
+            return 0
+
+        sessions = {record.get("start_time"): record for record in records}
+        replayed = 0
+        # Events are applied at most once: older and repeated sequence numbers are skipped
+        applied_seq = snapshot_seq
+        with open(self.journal_file, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                    seq = event["seq"]
+                    session, time, delta = event["session"], event["time"], event["delta"]
+                except (ValueError, KeyError) as e:
+                    # A record torn by a crash mid-write can only be the last one
+                    self.logger.warning(f"⚠ Пропущена поврежденная запись журнала статистики ({line_number}): {e}")
+                    continue
+
+                self._journal_seq = max(self._journal_seq, seq)
+                if seq <= applied_seq:
+                    continue
+                applied_seq = seq
+
+                record = sessions.get(session)
+                if record is None:
+                    record = {"start_time": session, "stats": {key: 0 for key in self.current_stats}}
+                    sessions[session] = record
+                    records.append(record)
+                for key, value in delta.items():
+                    record["stats"][key] = record["stats"].get(key, 0) + value
+                record["end_time"] = time
+                record["duration_seconds"] = (datetime.datetime.fromisoformat(time) -
+                                              datetime.datetime.fromisoformat(session)).total_seconds()
+                replayed += 1
+        return replayed
+
+    def _pending_event(self) -> Optional[Dict[str, Any]]:
+        """
+        Takes the changes of the current session not yet journaled as one event.
+
+        Must be called with _lock held; the event is written by the caller.
+        """
+        delta = {key: value - self._journaled.get(key, 0)
+                 for key, value in self.current_stats.items() if value != self._journaled.get(key, 0)}
+        if not delta:
+            return None
+        self._journaled = dict(self.current_stats)
+        self._journal_seq += 1
+        return {
+            "seq": self._journal_seq,
+            "session": self.session_start.isoformat(),
+            "time": datetime.datetime.now().isoformat(),
+            "delta": delta
+        }
+
+    def _append_journal(self, event: Dict[str, Any]) -> None:
+        """Appends one event to the journal and syncs it to disk."""
+        with open(self.journal_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_events += 1
+
+    def _session_record(self, stats: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """
+        History record of the current session, or None if nothing happened in it.
+
+        Args:
+            stats: Counters of the session (current_stats or the journaled part of them)
+        """
+        if not any(value > 0 for value in stats.values()):
+            return None
+        session_end = datetime.datetime.now()
+        return {
+            "start_time": self.session_start.isoformat(),
+            "end_time": session_end.isoformat(),
+            "duration_seconds": (session_end - self.session_start).total_seconds(),
+            "stats": dict(stats)
+        }
+
+    def _snapshot_data(self) -> Dict[str, Any]:
+        """
+        Builds the snapshot of all sessions, including the current one.
+
+        The current session is taken as journaled, not as current_stats: the
+        snapshot claims every event up to journal_seq, and changes made after
+        the last event are journaled later as a delta against _journaled, so
+        counting them here too would replay them twice after a crash.
+        """
+        with self._lock:
+            history = list(self.sessions.records())
+            session_record = self._session_record(self._journaled)
+            if session_record is not None:
+                history.append(session_record)
+
+            sums = self.sessions.totals()[0] + self.archive.totals()[0]
+            total = {key: int(value) + self._journaled.get(key, 0)
+                     for key, value in zip(self.sessions.keys, sums)}
+
+            return {
+                "total": total,
+                "history": history,
+                "last_updated": datetime.datetime.now().isoformat(),
+                "journal_seq": self._journal_seq
+            }
+
+    def _write_snapshot(self, data: Dict[str, Any]) -> None:
+        """
+        Writes the snapshot atomically (temp file plus rename) and empties the journal.
+
+        The snapshot records the sequence number of the last journal event it
+        includes, so a crash between the two steps replays nothing twice.
+        """
+        self._write_json(self.stats_file, data)
+
+        with open(self.journal_file, "w", encoding="utf-8"):
+            pass
+        self._journal_events = 0
+
+    @staticmethod
+    def _write_json(path: str, data: Dict[str, Any]) -> None:
+        """Writes a JSON file atomically: temp file, fsync, rename."""
+        temp_file = path + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, path)
+
+    def flush(self, compact: bool = False) -> None:
+        """
+        Writes pending changes to the journal, optionally compacting it into the snapshot.
+
+        Args:
+            compact: Always compact (otherwise only after `compact_every` events)
+        """
+        with self._io_lock:
+            with self._lock:
+                event = self._pending_event()
+            if event is not None:
+                try:
+                    self._append_journal(event)
+                except Exception:
+                    # Keep the change pending so the next write retries it
+                    with self._lock:
+                        for key, value in event["delta"].items():
+                            self._journaled[key] -= value
+                    raise
+
+            if compact or self._journal_events >= self.compact_every:
+                # The archive goes first: archived_before hides its sessions in an older snapshot
+                archive = self._retain()
+                if archive is not None:
+                    self._write_json(self.archive_file, archive)
+                self._write_snapshot(self._snapshot_data())
+                if not compact:
+                    self.logger.debug("Журнал статистики сжат в снимок")
+
+    def _write_loop(self) -> None:
+        """Writer thread: waits for updates and writes them once the window has passed."""
+        while not self._closing.is_set():
+            self._dirty.wait()
+            # Coalesce the updates of the window into one event
+            self._closing.wait(self.write_delay)
+            self._dirty.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.error(f"Ошибка при записи журнала статистики: {e}")
 
     def save_stats(self) -> bool:
         """
-        Save statistics to file.
+        Save statistics: journal pending changes and compact the journal into the snapshot.
 
         Returns:
             True if statistics were successfully saved, False otherwise
         """
         try:
-            # Calculate total stats from history plus current session
-            total_stats = self.get_total_stats()
-
-            # Add current session to history if there are any battles
-            if sum(self.current_stats.values()) > 0:
-                session_end = datetime.datetime.now()
-
-                # Проверка, чтобы не добавлять пустые сессии или дублирующиеся записи
-                is_new_session = True
-
-                # Проверяем, существует ли уже запись с тем же временем начала
-                for record in self.history:
-                    if record.get("start_time") == self.session_start.isoformat():
-                        # Обновляем существующую запись
-                        record["end_time"] = session_end.isoformat()
-                        record["duration_seconds"] = (session_end - self.session_start).total_seconds()
-                        record["stats"] = self.current_stats.copy()
-                        is_new_session = False
-                        break
-
-                if is_new_session and any(val > 0 for val in self.current_stats.values()):
-                    session_record = {
-                        "start_time": self.session_start.isoformat(),
-                        "end_time": session_end.isoformat(),
-                        "duration_seconds": (session_end - self.session_start).total_seconds(),
-                        "stats": self.current_stats.copy()
-                    }
-
-                    self.history.append(session_record)
-
-            # Prepare data for saving
-            data = {
-                "total": total_stats,
-                "history": self.history,
-                "last_updated": datetime.datetime.now().isoformat()
-            }
-
-            # Save to file
-            with open(self.stats_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4)
+            self.flush(compact=True)
 
             self.logger.info("Статистика успешно сохранена.")
             return True
@@ -143,39 +412,60 @@ class StatsManager:
             self.logger.error(traceback.format_exc())
             return False
 
+    def close(self, timeout: float = 5.0) -> bool:
+        """
+        Saves the statistics and stops the writer thread.
+
+        Only the first call writes: the window and main.py both close the manager.
+
+        Args:
+            timeout: Maximum time to wait for the writer thread, seconds
+
+        Returns:
+            True if statistics were successfully saved
+        """
+        if self._closed:
+            return True
+        self._closed = True
+        self._closing.set()
+        self._dirty.set()
+        self._writer.join(timeout)
+        return self.save_stats()
+
     def update_stats(self, stats: Dict[str, int]) -> None:
         """
         Update the current session statistics.
 
+        Only memory is touched here: the writer thread journals the changes
+        after `write_delay` seconds, coalescing the updates of that window.
+
         Args:
             stats: Dictionary with updated statistics
         """
-        # Проверяем, изменилась ли статистика
-        stats_changed = False
-        for key, value in stats.items():
-            if key in self.current_stats and self.current_stats[key] != value:
-                self.current_stats[key] = value
-                stats_changed = True
-
-        # Если статистика изменилась, сохраняем её, но не слишком часто
-        if stats_changed:
-            # Используем счетчик для сохранения только каждые N обновлений
-            # чтобы избежать частых операций записи на диск
-            if not hasattr(self, '_update_counter'):
-                self._update_counter = 0
-
-            self._update_counter += 1
-            if self._update_counter >= 5:  # Сохраняем каждые 5 изменений
-                self.save_stats()
-                self._update_counter = 0
-                self.logger.debug("Автоматическое сохранение статистики выполнено")
+        with self._lock:
+            for key, value in stats.items():
+                if key in self.current_stats:
+                    self.current_stats[key] = value
+        self._dirty.set()
 
     def reset_current_session(self) -> None:
         """Reset the current session statistics."""
-        for key in self.current_stats:
-            self.current_stats[key] = 0
+        # Changes not yet journaled still belong to the finished session
+        try:
+            self.flush()
+        except Exception as e:
+            self.logger.error(f"Ошибка при записи журнала статистики: {e}")
 
-        self.session_start = datetime.datetime.now()
+        with self._lock:
+            session_record = self._session_record(self.current_stats)
+            if session_record is not None:
+                self.sessions.append(session_record)
+
+            for key in self.current_stats:
+                self.current_stats[key] = 0
+            self._journaled = dict(self.current_stats)
+
+            self.session_start = datetime.datetime.now()
         self.logger.info("Текущая сессия статистики сброшена.")
 
     def get_total_stats(self) -> Dict[str, int]:
@@ -185,18 +475,14 @@ class StatsManager:
         Returns:
             Dictionary with total statistics
         """
-        total = {key: 0 for key in self.current_stats}
-
-        # Add up all historical stats
-        for record in self.history:
-            if "stats" in record:
-                for key, value in record["stats"].items():
-                    if key in total:
-                        total[key] += value
+        with self._lock:
+            # Add up all historical stats, archived ones included
+            sums = self.sessions.totals()[0] + self.archive.totals()[0]
+            total = {key: int(value) for key, value in zip(self.sessions.keys, sums)}
 
-        # Add current session stats
-        for key, value in self.current_stats.items():
-            total[key] += value
+            # Add current session stats
+            for key, value in self.current_stats.items():
+                total[key] += value
 
         return total
 
@@ -214,48 +500,36 @@ class StatsManager:
 
         # Define cutoff date based on period
         if period == "day":
-            cutoff = now - datetime.timedelta(days=1)
+            cutoff = (now - datetime.timedelta(days=1)).timestamp()
         elif period == "week":
-            cutoff = now - datetime.timedelta(weeks=1)
+            cutoff = (now - datetime.timedelta(weeks=1)).timestamp()
         elif period == "month":
-            cutoff = now - datetime.timedelta(days=30)
+            cutoff = (now - datetime.timedelta(days=30)).timestamp()
         else:  # "all" or any other value
-            cutoff = datetime.datetime.min
-
-        # Filter history records by period
-        filtered_records = []
-        for record in self.history:
-            try:
-                end_time = datetime.datetime.fromisoformat(record["end_time"])
-                if end_time >= cutoff:
-                    filtered_records.append(record)
-            except (KeyError, ValueError) as e:
-                self.logger.warning(f"Ошибка обработки записи истории: {e}")
-
-        # Aggregate stats
-        aggregated = {
-            "period": period,
-            "record_count": len(filtered_records),
-            "total_duration_hours": 0,
-            "stats": {key: 0 for key in self.current_stats}
-        }
-
-        # Add up stats from filtered records
-        for record in filtered_records:
-            if "duration_seconds" in record:
-                aggregated["total_duration_hours"] += record["duration_seconds"] / 3600
-
-            if "stats" in record:
-                for key, value in record["stats"].items():
-                    if key in aggregated["stats"]:
-                        aggregated["stats"][key] += value
+            cutoff = None
+
+        with self._lock:
+            # Sessions that ended within the period, archived ones included
+            sums, duration_seconds, record_count = self.sessions.totals(cutoff)
+            archived_sums, archived_seconds, archived_count = self.archive.totals(cutoff)
+            sums = sums + archived_sums
+            duration_seconds += archived_seconds
+            record_count += archived_count
+
+            # Aggregate stats
+            aggregated = {
+                "period": period,
+                "record_count": record_count,
+                "total_duration_hours": duration_seconds / 3600,
+                "stats": {key: int(value) for key, value in zip(self.sessions.keys, sums)}
+            }
 
-        # Add current session if applicable
-        current_duration = (now - self.session_start).total_seconds() / 3600
-        aggregated["total_duration_hours"] += current_duration
+            # Add current session if applicable
+            current_duration = (now - self.session_start).total_seconds() / 3600
+            aggregated["total_duration_hours"] += current_duration
 
-        for key, value in self.current_stats.items():
-            aggregated["stats"][key] += value
+            for key, value in self.current_stats.items():
+                aggregated["stats"][key] += value
 
         # Calculate derived statistics
         stats = aggregated["stats"]
@@ -303,26 +577,18 @@ class StatsManager:
             }
             daily_stats.append(day_data)
 
-        # Process history records
-        for record in self.history:
-            try:
-                end_time = datetime.datetime.fromisoformat(record["end_time"])
-                days_ago = (now - end_time).days
-
-                if 0 <= days_ago < days:
-                    day_index = days_ago
-
-                    # Add stats to the appropriate day
-                    for key, value in record["stats"].items():
-                        if key in daily_stats[day_index]["stats"]:
-                            daily_stats[day_index]["stats"][key] += value
-            except (KeyError, ValueError) as e:
-                self.logger.warning(f"Ошибка обработки записи истории для разбивки по дням: {e}")
-
-        # Add current session stats to today (index 0)
-        if len(daily_stats) > 0:
-            for key, value in self.current_stats.items():
-                daily_stats[0]["stats"][key] += value
+        with self._lock:
+            # Sessions by whole days before now (index 0 - the last 24 hours)
+            per_day = (self.sessions.binned(now.timestamp(), 86400, days) +
+                       self.archive.binned(now.timestamp(), 86400, days))
+            for day_index, sums in enumerate(per_day):
+                for key, value in zip(self.sessions.keys, sums):
+                    daily_stats[day_index]["stats"][key] += int(value)
+
+            # Add current session stats to today (index 0)
+            if len(daily_stats) > 0:
+                for key, value in self.current_stats.items():
+                    daily_stats[0]["stats"][key] += value
 
         # Calculate additional metrics for each day
         for day in daily_stats:
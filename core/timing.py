@@ -0,0 +1,172 @@
+import time
+import bisect
+import functools
+import threading
+from collections import deque
+from typing import Dict, Tuple, Optional, List, Any
+
+import numpy as np
+
+from core.tracing import TraceRecorder, tracer
+
+
+class LatencyHistogram:
+    """
+    Latency distribution of one measured stage.
+
+    Keeps cumulative counts in fixed buckets (cheap, never grows) and a ring
+    buffer of the most recent samples for percentiles over a rolling window.
+    """
+
+    # Upper bucket bounds in milliseconds; the last bucket is unbounded
+    BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000, 120000)
+
+    __slots__ = ("counts", "count", "total_ms", "max_ms", "recent")
+
+    def __init__(self, window: int = 512):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent = deque(maxlen=window)
+
+    def add(self, value_ms: float) -> None:
+        """Adds one sample in milliseconds."""
+        self.counts[bisect.bisect_left(self.BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+        self.recent.append(value_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns totals, bucket counts and percentiles of the rolling window."""
+        data: Dict[str, Any] = {
+            "count": self.count,
+            "sum_ms": self.total_ms,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            "buckets": list(zip(self.BUCKETS_MS + (float("inf"),), self.counts)),
+        }
+        if self.recent:
+            p50, p90, p99 = np.percentile(np.fromiter(self.recent, dtype=np.float64), (50, 90, 99))
+            data.update({"p50_ms": float(p50), "p90_ms": float(p90), "p99_ms": float(p99)})
+        else:
+            data.update({"p50_ms": 0.0, "p90_ms": 0.0, "p99_ms": 0.0})
+        return data
+
+
+class Span:
+    """Context manager measuring one stage and recording it on exit."""
+
+    __slots__ = ("registry", "name", "label", "start")
+
+    def __init__(self, registry: "TimingRegistry", name: str, label: str = ""):
+        self.registry = registry
+        self.name = name
+        self.label = label
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        self.registry.record(self.name, end - self.start, self.label)
+
+        recorder = self.registry.tracer
+        if recorder is not None and recorder.enabled:
+            recorder.complete(self.name, self.start, end, self.label)
+        return False
+
+
+class TimingRegistry:
+    """
+    Thread-safe collection of latency histograms keyed by stage name and label.
+
+    Stage names are dotted ("adb.capture", "matcher.match"); the optional label
+    distinguishes instances of a stage, e.g. the template name or bot state.
+    When a trace recorder is attached, every span is also added to the timeline.
+    """
+
+    def __init__(self, window: int = 512, tracer: Optional[TraceRecorder] = None):
+        self.window = window
+        self.enabled = True
+        self.tracer = tracer
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def span(self, name: str, label: str = "") -> Span:
+        """
+        Creates a timing span.
+
+        Args:
+            name: Stage name
+            label: Optional instance label (template, state, ...)
+
+        Returns:
+            Context manager that records the elapsed time on exit
+        """
+        return Span(self, name, label)
+
+    def record(self, name: str, seconds: float, label: str = "") -> None:
+        """Records an already measured duration in seconds."""
+        if not self.enabled:
+            return
+
+        key = (name, label)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram(self.window)
+            histogram.add(seconds * 1000.0)
+
+    def snapshot(self, prefix: Optional[str] = None) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        Returns the current state of all histograms.
+
+        Args:
+            prefix: Only include stages whose name starts with this prefix
+
+        Returns:
+            Dictionary (name, label) -> histogram snapshot
+        """
+        with self._lock:
+            items = [
+                (key, histogram) for key, histogram in self._histograms.items()
+                if prefix is None or key[0].startswith(prefix)
+            ]
+            return {key: histogram.snapshot() for key, histogram in items}
+
+    def summary_lines(self, prefix: Optional[str] = None) -> List[str]:
+        """Formats the snapshot as human-readable lines sorted by total time."""
+        snapshot = self.snapshot(prefix)
+        lines = []
+        for (name, label), data in sorted(snapshot.items(), key=lambda item: -item[1]["sum_ms"]):
+            title = f"{name}[{label}]" if label else name
+            lines.append(
+                f"{title}: n={data['count']}, всего {data['sum_ms'] / 1000:.1f} с, "
+                f"p50={data['p50_ms']:.1f} мс, p90={data['p90_ms']:.1f} мс, макс={data['max_ms']:.1f} мс"
+            )
+        return lines
+
+    def reset(self) -> None:
+        """Clears all collected histograms."""
+        with self._lock:
+            self._histograms.clear()
+
+
+# Global registry used by the bot components
+timings = TimingRegistry(tracer=tracer)
+
+
+def timed(name: str, label: str = ""):
+    """Decorator that records every call of the function as a span of the global registry."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timings.span(name, label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, List
+
+
+class TraceRecorder:
+    """
+    Records a timeline of the bot run in Chrome Trace Event format.
+
+    Spans of the timing registry become complete ("X") events and state
+    transitions become instant ("i") events. Events are kept in a bounded
+    in-memory ring buffer, so recording can stay on for long runs; the buffer
+    is written on demand and opens directly in Perfetto or chrome://tracing.
+    """
+
+    def __init__(self, capacity: int = 200000):
+        self.capacity = capacity
+        self.enabled = False
+        self.events = deque(maxlen=capacity)
+
+        # Timestamps are microseconds relative to this perf_counter origin
+        self.origin = time.perf_counter()
+        self.origin_wall = time.time()
+
+        self.pid = os.getpid()
+        self._thread_names: Dict[int, str] = {}
+
+    def enable(self, capacity: Optional[int] = None) -> None:
+        """Starts recording, optionally resizing the buffer (drops recorded events)."""
+        if capacity is not None and capacity != self.capacity:
+            self.capacity = capacity
+            self.events = deque(maxlen=capacity)
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stops recording; already recorded events are kept until cleared."""
+        self.enabled = False
+
+    def clear(self) -> None:
+        """Drops all recorded events."""
+        self.events.clear()
+
+    def _thread_id(self) -> int:
+        thread = threading.current_thread()
+        tid = thread.ident or 0
+        if tid not in self._thread_names:
+            self._thread_names[tid] = thread.name
+        return tid
+
+    def _ts(self, perf_time: float) -> float:
+        return (perf_time - self.origin) * 1_000_000
+
+    def complete(self, name: str, start: float, end: float, label: str = "",
+                 args: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Records a finished span.
+
+        Args:
+            name: Stage name, its first dotted part becomes the event category
+            start: Start time from time.perf_counter()
+            end: End time from time.perf_counter()
+            label: Optional instance label appended to the event name
+            args: Optional extra arguments shown in the trace viewer
+        """
+        if not self.enabled:
+            return
+        self.events.append({
+            "name": f"{name}[{label}]" if label else name,
+            "cat": name.split(".", 1)[0],
+            "ph": "X",
+            "ts": self._ts(start),
+            "dur": (end - start) * 1_000_000,
+            "pid": self.pid,
+            "tid": self._thread_id(),
+            "args": args or {},
+        })
+
+    def instant(self, name: str, args: Optional[Dict[str, Any]] = None) -> None:
+        """Records a point-in-time event such as a state transition."""
+        if not self.enabled:
+            return
+        self.events.append({
+            "name": name,
+            "cat": name.split(".", 1)[0],
+            "ph": "i",
+            "s": "t",
+            "ts": self._ts(time.perf_counter()),
+            "pid": self.pid,
+            "tid": self._thread_id(),
+            "args": args or {},
+        })
+
+    def to_trace(self) -> Dict[str, Any]:
+        """Builds the Chrome Trace Event JSON document from the buffer."""
+        events: List[Dict[str, Any]] = [{
+            "name": "process_name", "ph": "M", "pid": self.pid, "tid": 0,
+            "args": {"name": "Age of Magic Бот"}
+        }]
+        for tid, thread_name in list(self._thread_names.items()):
+            events.append({
+                "name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+                "args": {"name": thread_name}
+            })
+        events.extend(list(self.events))
+
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "started_at": self.origin_wall,
+                "dropped_oldest": len(self.events) == self.capacity,
+            }
+        }
+
+    def dump(self, path: str) -> int:
+        """
+        Writes the buffer to a JSON file.
+
+        Args:
+            path: Output file path
+
+        Returns:
+            Number of recorded events written
+        """
+        trace = self.to_trace()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace, f)
+        return len(trace["traceEvents"])
+
+
+# Global recorder, attached to the timing registry so every span is traced
+tracer = TraceRecorder()
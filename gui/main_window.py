@@ -6,7 +6,8 @@ import logging
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QTabWidget, QStatusBar, QMessageBox,
     QVBoxLayout, QHBoxLayout, QGridLayout, QGroupBox,
-    QLabel, QPushButton, QFrame, QLineEdit, QSpinBox, QTextEdit, QTableWidgetItem, QScrollArea
+    QLabel, QPushButton, QFrame, QLineEdit, QSpinBox, QTextEdit, QTableWidgetItem, QScrollArea,
+    QCheckBox, QFileDialog
 )
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QObject
 from PyQt6.QtGui import QIcon, QPixmap
@@ -15,6 +16,7 @@ from .ui_factory import UIFactory
 from .license_dialog import LicenseDialog
 from .styles import Styles
 from .chart_widgets import LineChartWidget, BarChartWidget, PieChartWidget
+from core.tracing import tracer
 
 try:
     from .chart_widgets import LineChartWidget, BarChartWidget, PieChartWidget
@@ -864,6 +866,9 @@ class MainWindow(QMainWindow):
         except ValueError:
             self.show_error("Пожалуйста, введите числовые значения для настроек.")
             return
+        if max_refresh < 0:
+            self.show_error("Количество попыток обновления не может быть отрицательным.")
+            return
 
         # Сохраняем в конфигурацию
         config.set("bot", "battle_timeout", battle_timeout)
@@ -938,11 +943,68 @@ class MainWindow(QMainWindow):
         bot_group.setLayout(bot_layout)
         layout.addWidget(bot_group)
 
+        # Диагностика
+        diagnostics_group = UIFactory.create_group_box("Диагностика")
+        diagnostics_layout = UIFactory.create_grid_layout()
+
+        self.trace_checkbox = QCheckBox("Записывать трассировку работы бота")
+        self.trace_checkbox.setChecked(tracer.enabled)
+        self.trace_checkbox.toggled.connect(self.toggle_tracing)
+        diagnostics_layout.addWidget(self.trace_checkbox, 0, 0)
+
+        save_trace_button = UIFactory.create_primary_button(
+            "Сохранить трассировку",
+            tooltip="Сохранить временную шкалу в формате Chrome Trace (открывается в Perfetto)"
+        )
+        save_trace_button.clicked.connect(self.save_trace)
+        diagnostics_layout.addWidget(save_trace_button, 0, 1)
+
+        diagnostics_group.setLayout(diagnostics_layout)
+        layout.addWidget(diagnostics_group)
+
         # Место для будущих настроек
         layout.addStretch()
 
         tab.setLayout(layout)
 
+    def toggle_tracing(self, enabled):
+        """Включение и выключение записи трассировки."""
+        from config import config
+
+        if enabled:
+            tracer.enable(config.get("trace", "buffer_size", 200000))
+            self._py_logger.info("Запись трассировки включена")
+        else:
+            tracer.disable()
+            self._py_logger.info("Запись трассировки выключена")
+
+        config.set("trace", "enabled", enabled)
+        config.save()
+
+    def save_trace(self):
+        """Сохранение накопленной трассировки в файл."""
+        if not tracer.events:
+            self.show_error("Трассировка пуста. Включите запись и запустите бота.")
+            return
+
+        default_name = f"bot_trace_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить трассировку", default_name, "Chrome Trace (*.json)"
+        )
+        if not path:
+            return
+
+        try:
+            count = tracer.dump(path)
+            self._py_logger.info(f"Трассировка сохранена: {path} ({count} событий)")
+            QMessageBox.information(
+                self,
+                "Трассировка сохранена",
+                f"Трассировка сохранена в {path}.\nОткройте файл в https://ui.perfetto.dev"
+            )
+        except Exception as e:
+            self.show_error(f"Ошибка при сохранении трассировки: {e}")
+
     def setup_license_tab(self, tab):
         """Setup the license tab."""
         layout = UIFactory.create_vertical_layout()
@@ -1231,14 +1293,14 @@ class MainWindow(QMainWindow):
 
             if reply == QMessageBox.StandardButton.Yes:
                 self.bot_engine.stop()
-                # Гарантируем сохранение статистики
+                # Гарантируем сохранение статистики и останавливаем фоновую запись
                 if hasattr(self.bot_engine, 'stats_manager') and self.bot_engine.stats_manager is not None:
-                    self.bot_engine.stats_manager.save_stats()
+                    self.bot_engine.stats_manager.close()
                 event.accept()
             else:
                 event.ignore()
         else:
             # Сохраняем статистику даже если бот не запущен
             if hasattr(self.bot_engine, 'stats_manager') and self.bot_engine.stats_manager is not None:
-                self.bot_engine.stats_manager.save_stats()
+                self.bot_engine.stats_manager.close()
             event.accept()
\ No newline at end of file
@@ -1,6 +1,7 @@
 import os
 import sys
 import logging
+import argparse
 
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtGui import QIcon
@@ -9,6 +10,8 @@ from config import config, resource_path
 from core.logger import BotLogger
 from core.adb_controller import AdbController
 from core.image_matcher import ImageMatcher
+from core.search_regions import SearchRegionLearner
+from core.match_cache import MatchCache
 from core.bot_engine import BotEngine
 from license.fingerprint import MachineFingerprint
 from license.storage import LicenseStorage
@@ -17,6 +20,8 @@ from gui.main_window import MainWindow
 from gui.license_dialog import LicenseDialog
 from gui.styles import Styles
 from core.stats_manager import StatsManager
+from core.tracing import tracer
+from core.metrics_server import MetricsServer
 
 
 def init_logging():
@@ -35,6 +40,22 @@ def init_logging():
     return logger
 
 
+def init_tracing(trace_path=None):
+    """Enable timeline recording if requested in the config or on the command line."""
+    if trace_path or config.get("trace", "enabled", False):
+        tracer.enable(config.get("trace", "buffer_size", 200000))
+        logging.info("Запись трассировки включена")
+
+
+def parse_args():
+    """Parse the application's own command line options, leaving the rest to Qt."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--trace", metavar="PATH",
+                        help="Записывать трассировку и сохранить ее в PATH при выходе")
+    args, _ = parser.parse_known_args()
+    return args
+
+
 def init_license_system():
     """Initialize the license validation system."""
     # Get paths
@@ -55,7 +76,13 @@ def init_stats_manager():
     stats_dir = config.get("license", "directory")
 
     # Create statistics manager
-    stats_manager = StatsManager(stats_dir)
+    stats_manager = StatsManager(
+        stats_dir,
+        compact_every=config.get("stats", "compact_every", 200),
+        write_delay=config.get("stats", "write_delay", 2.0),
+        raw_days=config.get("stats", "raw_days", 90),
+        daily_days=config.get("stats", "daily_days", 365)
+    )
 
     logging.info(f"Инициализация менеджера статистики. Каталог: {stats_dir}")
     return stats_manager
@@ -83,12 +110,47 @@ def init_bot_engine():
 
     # Create components
     adb_controller = AdbController(adb_path)
-    image_matcher = ImageMatcher(template_dir)
+    search_regions = None
+    if config.get("matcher", "learn_regions", True):
+        search_regions = SearchRegionLearner(
+            regions_file=os.path.join(config.get("license", "directory"), "search_regions.json"),
+            margin=config.get("matcher", "region_margin", 20),
+            min_samples=config.get("matcher", "region_min_samples", 3),
+            verify_every=config.get("matcher", "region_verify_every", 20)
+        )
+    match_cache = None
+    if config.get("matcher", "match_cache_size", 256) > 0:
+        match_cache = MatchCache(
+            max_entries=config.get("matcher", "match_cache_size", 256),
+            max_age=config.get("matcher", "match_cache_age", 10.0)
+        )
+    image_matcher = ImageMatcher(
+        template_dir,
+        search_regions,
+        pipeline_depth=config.get("matcher", "pipeline_depth", 2),
+        max_frame_age=config.get("matcher", "max_frame_age", 2.0),
+        match_cache=match_cache,
+        prefilter_margin=config.get("matcher", "prefilter_margin", 0.9)
+    )
     bot_engine = BotEngine(adb_controller, image_matcher)
 
     return bot_engine
 
 
+def init_metrics_server(bot_engine):
+    """Start the local metrics endpoint if it is enabled in the config."""
+    if not config.get("metrics", "enabled", False):
+        return None
+
+    server = MetricsServer(
+        bot_engine,
+        host=config.get("metrics", "host", "127.0.0.1"),
+        port=config.get("metrics", "port", 9108),
+        device=config.get("metrics", "device", "")
+    )
+    return server if server.start() else None
+
+
 def setup_exception_handler(logger):
     """Set up a global exception handler to log uncaught exceptions."""
 
@@ -105,9 +167,12 @@ def setup_exception_handler(logger):
 
 def main():
     """Main application entry point."""
+    args = parse_args()
+
     # Initialize logging
     logger = init_logging()
     setup_exception_handler(logger)
+    init_tracing(args.trace)
 
     # Log application start
     logger.info("=" * 40)
@@ -144,11 +209,6 @@ def main():
             logger.error("Ошибка проверки лицензии. Выход.")
             return 1
 
-    # Initialize bot engine
-    # Initialize statistics manager
-    stats_manager = init_stats_manager()
-
-    # Стало:
     # Initialize bot engine
     bot_engine = init_bot_engine()
 
@@ -157,6 +217,9 @@ def main():
     bot_engine.stats_manager = stats_manager
     bot_engine.stats = stats_manager.current_stats
 
+    # Optional metrics endpoint for fleet monitoring
+    metrics_server = init_metrics_server(bot_engine)
+
     # Create main window
     main_window = MainWindow(bot_engine, license_validator)
 
@@ -166,7 +229,19 @@ def main():
     main_window.show()
 
     # Run application event loop
-    return app.exec()
+    exit_code = app.exec()
+
+    # Write whatever the window did not save
+    stats_manager.close()
+
+    if metrics_server:
+        metrics_server.stop()
+
+    if args.trace:
+        count = tracer.dump(args.trace)
+        logger.info(f"Трассировка сохранена: {args.trace} ({count} событий)")
+
+    return exit_code
 
 
 if __name__ == "__main__":
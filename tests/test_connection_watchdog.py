@@ -0,0 +1,66 @@
+import os
+
+import cv2
+import numpy as np
+
+from core.cancellation import CancellationToken
+from core.connection_watchdog import ConnectionWatchdog
+from core.image_matcher import ImageMatcher
+from core.state_graph import StateGraph
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_DIR = os.path.join(ROOT, "resources", "images")
+
+
+class FakeClock:
+    def monotonic(self) -> float:
+        return 100.0
+
+
+class FakeEngine:
+    """Engine whose latest frame is a prepared screen."""
+
+    def __init__(self, matcher, frame):
+        self.image_matcher = matcher
+        self.clock = FakeClock()
+        self.last_frame = (100.0, cv2.imencode(".png", frame)[1].tobytes())
+        self.wait_token = CancellationToken()
+
+    def interrupt_waits(self):
+        self.wait_token.cancel()
+
+
+def screen_with(template_name, location):
+    frame = np.random.default_rng(0).integers(60, 124, (900, 1600, 3), dtype=np.uint8)
+    template = cv2.imread(os.path.join(TEMPLATE_DIR, template_name))
+    x, y = location
+    frame[y:y + template.shape[0], x:x + template.shape[1]] = template
+    return frame
+
+
+def make_watchdog(frame):
+    templates = StateGraph.load(os.path.join(ROOT, "resources", "flow.json")).watchdog_templates
+    engine = FakeEngine(ImageMatcher(TEMPLATE_DIR), frame)
+    return engine, ConnectionWatchdog(engine, interval=5, templates=templates)
+
+
+def test_flow_gives_every_connection_template_a_region():
+    templates = StateGraph.load(os.path.join(ROOT, "resources", "flow.json")).watchdog_templates
+
+    assert set(templates) == set(ConnectionWatchdog.TEMPLATES)
+    assert all(roi is not None for roi in templates.values())
+
+
+def test_dialog_in_region_interrupts_waits():
+    engine, watchdog = make_watchdog(screen_with("waiting_for_server.png", (527, 426)))
+
+    assert watchdog.check()
+    assert watchdog.lost_event.is_set()
+    assert engine.wait_token.is_cancelled()
+
+
+def test_search_is_limited_to_the_region():
+    engine, watchdog = make_watchdog(screen_with("contact_us.png", (0, 0)))
+
+    assert not watchdog.check()
+    assert not engine.wait_token.is_cancelled()
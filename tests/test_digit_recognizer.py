@@ -0,0 +1,91 @@
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from bench import build_digits
+from core.digit_recognizer import DigitRecognizer
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def number_image(value, background=(40, 30, 20), colour=(230, 230, 230), step=22):
+    """Region with a number drawn digit by digit, so glyphs never touch."""
+    text = str(value)
+    image = np.full((40, 10 + step * len(text), 3), background, dtype=np.uint8)
+    for index, digit in enumerate(text):
+        cv2.putText(image, digit, (5 + step * index, 30), FONT, 0.9, colour, 2, cv2.LINE_AA)
+    return image
+
+
+@pytest.fixture(scope="module")
+def digits_dir(tmp_path_factory):
+    """References built by bench.build_digits from a corpus of synthetic number regions."""
+    corpus = tmp_path_factory.mktemp("corpus")
+    frames = []
+    for index, value in enumerate([1234, 5678, 90, 12]):
+        frame = np.full((200, 300, 3), (40, 30, 20), dtype=np.uint8)
+        region = number_image(value)
+        frame[50:50 + region.shape[0], 20:20 + region.shape[1]] = region
+        cv2.imwrite(str(corpus / f"frame_{index}.png"), frame)
+        frames.append({"file": f"frame_{index}.png",
+                       "numbers": [{"box": [20, 50, region.shape[1], region.shape[0]], "value": value}]})
+    # Segmentation of this region does not match its label, so it is skipped
+    frames.append({"file": "frame_0.png", "numbers": [{"box": [20, 50, 60, 40], "value": 7}]})
+    with open(corpus / "labels.json", "w", encoding="utf-8") as f:
+        json.dump({"frames": frames}, f)
+
+    output = tmp_path_factory.mktemp("digits")
+    assert build_digits.main([str(corpus), "--output", str(output), "--samples", "1"]) == 0
+    return str(output)
+
+
+def test_build_digits_writes_one_reference_per_digit(digits_dir):
+    assert sorted(name[0] for name in os.listdir(digits_dir)) == [str(digit) for digit in range(10)]
+    assert DigitRecognizer(digits_dir).available
+
+
+@pytest.mark.parametrize("value", [7, 42, 305, 9081, 66])
+def test_recognize_reads_numbers(digits_dir, value):
+    assert DigitRecognizer(digits_dir).recognize(number_image(value)) == value
+
+
+def test_recognize_handles_dark_digits_on_light_background(digits_dir):
+    image = number_image(318, background=(220, 220, 220), colour=(30, 30, 30))
+
+    assert DigitRecognizer(digits_dir).recognize(image) == 318
+
+
+def test_recognize_many_keeps_region_order(digits_dir):
+    images = [number_image(15), np.zeros((0, 0, 3), np.uint8), number_image(804), None]
+
+    assert DigitRecognizer(digits_dir).recognize_many(images) == [15, None, 804, None]
+
+
+def test_unknown_shapes_and_empty_regions_are_rejected(digits_dir):
+    recognizer = DigitRecognizer(digits_dir)
+    blank = np.full((40, 80, 3), 40, dtype=np.uint8)
+    letters = blank.copy()
+    cv2.putText(letters, "WM", (5, 30), FONT, 0.9, (230, 230, 230), 2, cv2.LINE_AA)
+
+    assert recognizer.recognize(blank) is None
+    assert recognizer.recognize(letters) is None
+    assert recognizer.recognize(np.zeros((0, 0, 3), np.uint8)) is None
+
+
+def test_segment_splits_glyphs_left_to_right(digits_dir):
+    recognizer = DigitRecognizer(digits_dir)
+
+    glyphs = recognizer.segment(recognizer.binarize(number_image(1111)))
+
+    assert len(glyphs) == 4
+
+
+def test_without_references_nothing_is_recognized(tmp_path):
+    recognizer = DigitRecognizer(str(tmp_path / "missing"))
+
+    assert not recognizer.available
+    assert recognizer.recognize(number_image(5)) is None
+    assert recognizer.recognize_many([number_image(5)]) == [None]
@@ -0,0 +1,41 @@
+import threading
+import time
+
+from bench.simulation import VirtualClock
+from core.frame_pipeline import FramePipeline
+
+
+def test_close_waits_for_the_producer():
+    release = threading.Event()
+
+    def slow_capture():
+        release.wait(0.2)
+        return b"frame"
+
+    pipeline = FramePipeline(slow_capture, interval=0.01)
+    pipeline.start()
+    producer = pipeline._thread
+
+    pipeline.close(timeout=2.0)
+
+    assert not producer.is_alive()
+    assert pipeline._thread is None
+
+
+def test_pacing_follows_a_virtual_clock():
+    clock = VirtualClock()
+    captures = []
+
+    def capture():
+        clock.advance(0.2)
+        captures.append(clock.monotonic())
+        return b"frame"
+
+    started = time.perf_counter()
+    with FramePipeline(capture, interval=30.0, clock=clock) as pipeline:
+        frames = [pipeline.next_frame(timeout=60.0) for _ in range(3)]
+
+    assert frames == [b"frame"] * 3
+    # Captures start every 30 simulated seconds without waiting for them in real time
+    assert captures[:3] == [0.2, 30.2, 60.2]
+    assert time.perf_counter() - started < 5.0
@@ -0,0 +1,51 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from core.image_matcher import ImageMatcher
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources", "images")
+TEMPLATES = sorted(name for name in os.listdir(TEMPLATE_DIR) if name.endswith(".png"))
+
+
+def frame_with(template: np.ndarray, location=(400, 300), seed: int = 0) -> np.ndarray:
+    """Reference-size frame of muted noise with the template pasted at a location."""
+    frame = np.random.default_rng(seed).integers(60, 124, (900, 1600, 3), dtype=np.uint8)
+    x, y = location
+    frame[y:y + template.shape[0], x:x + template.shape[1]] = template
+    return frame
+
+
+@pytest.mark.parametrize("template_name", TEMPLATES)
+@pytest.mark.parametrize("shift", [4, 8, -8])
+def test_prefilter_keeps_brightness_shifted_match(template_name, shift):
+    matcher = ImageMatcher(TEMPLATE_DIR, prefilter_margin=0.9)
+    frame = frame_with(matcher.load_template(template_name))
+    offset = np.full_like(frame, abs(shift))
+    shifted = cv2.add(frame, offset) if shift > 0 else cv2.subtract(frame, offset)
+
+    assert matcher.find_in_image(shifted, template_name) == (400, 300)
+
+
+@pytest.mark.parametrize("template_name, shown_name",
+                         [(absent, shown) for absent in TEMPLATES for shown in TEMPLATES if absent != shown])
+def test_prefilter_skips_full_match_of_absent_template(monkeypatch, template_name, shown_name):
+    matcher = ImageMatcher(TEMPLATE_DIR, prefilter_margin=0.9)
+    frame = frame_with(matcher.load_template(shown_name))
+    template = matcher.get_template(template_name, (frame.shape[1], frame.shape[0]))
+    matcher.template_signature(template_name, template, (frame.shape[1], frame.shape[0]))
+
+    full_size = []
+    match_template = cv2.matchTemplate
+
+    def counting_match(image, templ, method):
+        if templ.shape == template.shape:
+            full_size.append(templ.shape)
+        return match_template(image, templ, method)
+
+    monkeypatch.setattr(cv2, "matchTemplate", counting_match)
+
+    assert matcher.find_in_image(frame, template_name) is None
+    assert full_size == []
@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+
+from core.ocr_utils import OCRHelper
+
+
+class FakeRecognizer:
+    """Builtin recognizer that returns the prepared reads one by one."""
+
+    available = True
+
+    def __init__(self, reads):
+        self.reads = iter(reads)
+
+    def recognize(self, image):
+        return next(self.reads)
+
+    def binarize(self, image):
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def number_image(value):
+    image = np.full((40, 100, 3), (40, 30, 20), dtype=np.uint8)
+    cv2.putText(image, str(value), (5, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (230, 230, 230), 2, cv2.LINE_AA)
+    return image
+
+
+def tesseract_helper(tmp_path, reads):
+    """Helper whose Tesseract returns the prepared reads one by one."""
+    helper = OCRHelper(method="tesseract", digits_dir=str(tmp_path), use_worker=False)
+    helper.ocr_available = True
+    calls = iter(reads)
+    helper._recognize_tesseract = lambda image, min_val, max_val: next(calls)
+    return helper
+
+
+def test_single_tesseract_misread_is_not_cached(tmp_path):
+    helper = tesseract_helper(tmp_path, [81, 18, 18, 99])
+    image = number_image(18)
+
+    assert [helper.recognize_number(image, 10, 99) for _ in range(3)] == [81, 18, 18]
+    # Two matching reads confirm the value, Tesseract is not asked again
+    assert helper.recognize_number(image, 10, 99) == 18
+    assert helper.cache_stats()["size"] == 1
+
+
+def test_builtin_result_is_cached_at_once(tmp_path):
+    helper = OCRHelper(method="builtin", digits_dir=str(tmp_path), use_worker=False)
+    helper.digit_recognizer = FakeRecognizer([42, 24])
+    image = number_image(42)
+
+    assert helper.recognize_number(image, 10, 99) == 42
+    assert helper.recognize_number(image, 10, 99) == 42
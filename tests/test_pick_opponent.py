@@ -0,0 +1,143 @@
+import pytest
+
+from config import config
+from core.bot_engine import BotEngine, BotState
+
+OPPONENTS = [
+    {"power": (1040, 232, 170, 40), "tap": (800, 252)},
+    {"power": (1040, 402, 170, 40), "tap": (800, 422)},
+    {"power": (1040, 572, 170, 40), "tap": (800, 592)},
+]
+
+
+class FakeClock:
+    """Clock that returns from sleeps at once, optionally running a callback first."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.on_sleep = None
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds, cancel_token=None) -> bool:
+        if self.on_sleep:
+            self.on_sleep()
+        self.now += seconds
+        return cancel_token.is_cancelled() if cancel_token is not None else False
+
+
+class FakeAdb:
+    def __init__(self):
+        self.cancel_token = None
+        self.taps = []
+
+    def check_connection(self) -> bool:
+        return True
+
+    def capture_screen(self) -> bytes:
+        return b"selection"
+
+    def tap(self, x, y, add_randomness=True) -> bool:
+        self.taps.append((x, y))
+        return True
+
+
+class FakeMatcher:
+    """Matcher that reads the next prepared list of opponent powers on every call."""
+
+    def __init__(self, lists):
+        self.lists = list(lists)
+        self.reads = 0
+
+    def decode_screen(self, screen_data):
+        return screen_data
+
+    def read_numbers(self, screen_img, regions, min_val=0, max_val=10 ** 9):
+        powers = self.lists[min(self.reads, len(self.lists) - 1)]
+        self.reads += 1
+        return list(powers)
+
+
+@pytest.fixture
+def make_engine(monkeypatch):
+    def make(lists, threshold=900, attempts=3, opponents=OPPONENTS):
+        monkeypatch.setitem(config.config["bot"], "opponent_power_threshold", threshold)
+        monkeypatch.setitem(config.config["bot"], "max_refresh_attempts", attempts)
+        engine = BotEngine(FakeAdb(), FakeMatcher(lists), clock=FakeClock())
+        engine.opponents = opponents
+        engine.screen_size = (1600, 900)
+        engine.state = BotState.SELECTING_BATTLE
+        return engine
+    return make
+
+
+def refresh_point(engine):
+    return engine.click_coords["refresh_opponents"]
+
+
+def test_weak_opponent_on_first_list_is_picked(make_engine):
+    engine = make_engine([[1200, 800, 1000]])
+
+    assert engine._hook_pick_opponent(None) is None
+    assert engine.adb.taps == [(800, 422)]
+
+
+def test_list_is_refreshed_until_weak_opponent_appears(make_engine):
+    engine = make_engine([[1200, 1100, 1000], [1300, 950, 1000], [990, 1010, 850]])
+
+    engine._hook_pick_opponent(None)
+
+    refresh = refresh_point(engine)
+    assert engine.adb.taps == [refresh, refresh, (800, 592)]
+    assert engine.image_matcher.reads == 3
+
+
+def test_weakest_of_last_list_is_picked_when_attempts_run_out(make_engine):
+    engine = make_engine([[1200, 1100, 1000], [1300, 1250, 950]], attempts=1)
+
+    engine._hook_pick_opponent(None)
+
+    assert engine.adb.taps == [refresh_point(engine), (800, 592)]
+
+
+def test_negative_attempts_read_the_list_once(make_engine):
+    engine = make_engine([[1200, 1100, 1000]], attempts=-1)
+
+    engine._hook_pick_opponent(None)
+
+    assert engine.adb.taps == [(800, 592)]
+
+
+def test_nothing_is_tapped_when_no_power_is_recognised(make_engine):
+    engine = make_engine([[None, None, None]])
+
+    engine._hook_pick_opponent(None)
+
+    assert engine.adb.taps == []
+
+
+def test_cancelled_refresh_stops_selection(make_engine):
+    engine = make_engine([[1200, 1100, 1000], [800, 800, 800]])
+    engine.clock.on_sleep = engine.interrupt_waits
+
+    engine._hook_pick_opponent(None)
+
+    assert engine.adb.taps == [refresh_point(engine)]
+    assert engine.image_matcher.reads == 1
+
+
+@pytest.mark.parametrize("threshold, opponents", [(0, OPPONENTS), (900, [])])
+def test_disabled_selection_refreshes_once_after_defeat(make_engine, threshold, opponents):
+    engine = make_engine([[1200, 1100, 1000]], threshold=threshold, opponents=opponents)
+
+    engine._hook_pick_opponent(None)
+    assert engine.adb.taps == []
+
+    engine._hook_request_refresh(None)
+    engine._hook_pick_opponent(None)
+    assert engine.adb.taps == [refresh_point(engine)]
+    assert engine.image_matcher.reads == 0
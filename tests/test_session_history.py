@@ -0,0 +1,104 @@
+import datetime
+import random
+
+import numpy as np
+
+from core.session_history import SessionHistory, roll_up
+
+KEYS = ["battles_started", "victories", "defeats", "connection_losses", "errors", "keys_collected"]
+NOW = datetime.datetime(2026, 6, 15, 12, 0, 0)
+
+
+def random_records(count, days=30, seed=0):
+    """Shuffled session records that ended within the last `days` days."""
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        end = NOW - datetime.timedelta(seconds=rng.uniform(0, days * 86400))
+        duration = rng.uniform(60, 7200)
+        records.append({
+            "start_time": (end - datetime.timedelta(seconds=duration)).isoformat(),
+            "end_time": end.isoformat(),
+            "duration_seconds": duration,
+            "stats": {key: rng.randint(0, 50) for key in KEYS},
+        })
+    return records
+
+
+def summed(records):
+    return [sum(record["stats"][key] for record in records) for key in KEYS]
+
+
+def ended_after(records, moment):
+    return [record for record in records
+            if datetime.datetime.fromisoformat(record["end_time"]).timestamp() >= moment]
+
+
+def test_records_are_sorted_and_round_trip():
+    records = random_records(50)
+    history = SessionHistory.from_records(KEYS, records)
+
+    ends = [record["end_time"] for record in history.records()]
+    assert ends == sorted(ends)
+    assert sorted(record["stats"]["victories"] for record in history.records()) == \
+        sorted(record["stats"]["victories"] for record in records)
+    assert all(record["sessions"] == 1 for record in history.records())
+
+
+def test_invalid_records_are_skipped():
+    records = random_records(3) + [{"start_time": "yesterday", "end_time": None, "stats": {}}]
+
+    assert len(SessionHistory.from_records(KEYS, records)) == 3
+
+
+def test_totals_match_a_plain_loop():
+    records = random_records(200)
+    history = SessionHistory.from_records(KEYS, records)
+
+    for days in (None, 1, 7, 30):
+        since = None if days is None else (NOW - datetime.timedelta(days=days)).timestamp()
+        selected = records if since is None else ended_after(records, since)
+        sums, duration, sessions = history.totals(since)
+
+        assert list(sums) == summed(selected)
+        assert np.isclose(duration, sum(record["duration_seconds"] for record in selected))
+        assert sessions == len(selected)
+
+
+def test_binned_matches_a_plain_loop():
+    records = random_records(200, days=10)
+    history = SessionHistory.from_records(KEYS, records)
+    now = NOW.timestamp()
+
+    per_day = history.binned(now, 86400, 7)
+
+    for day in range(7):
+        selected = [record for record in records
+                    if day * 86400 <= now - datetime.datetime.fromisoformat(record["end_time"]).timestamp()
+                    < (day + 1) * 86400]
+        assert list(per_day[day]) == summed(selected)
+
+
+def test_append_keeps_order_and_take_before_removes_oldest():
+    records = random_records(20)
+    history = SessionHistory(KEYS)
+    for record in records:
+        history.append(record)
+
+    cutoff = (NOW - datetime.timedelta(days=10)).timestamp()
+    taken = history.take_before(cutoff)
+
+    assert len(taken) + len(history) == 20
+    assert summed(taken) == summed([record for record in records if record not in ended_after(records, cutoff)])
+    assert list(history.totals()[0]) == summed(ended_after(records, cutoff))
+
+
+def test_roll_up_keeps_counts_and_session_numbers():
+    records = random_records(100, days=60)
+
+    daily = roll_up(records, "day", KEYS)
+    monthly = roll_up(daily, "month", KEYS)
+
+    assert summed(daily) == summed(records) == summed(monthly)
+    assert sum(summary["sessions"] for summary in monthly) == 100
+    assert len({summary["period"] for summary in daily}) == len(daily)
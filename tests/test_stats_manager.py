@@ -0,0 +1,197 @@
+import datetime
+import json
+import os
+import random
+
+import pytest
+
+from core.stats_manager import StatsManager
+
+
+@pytest.fixture
+def open_stats(tmp_path):
+    """Opens stats managers on one directory; their writer threads are stopped afterwards without saving."""
+    managers = []
+
+    def open_manager(**kwargs):
+        kwargs.setdefault("write_delay", 60.0)
+        manager = StatsManager(str(tmp_path), **kwargs)
+        managers.append(manager)
+        return manager
+
+    yield open_manager
+
+    for manager in managers:
+        manager._closing.set()
+        manager._dirty.set()
+        manager._writer.join(5)
+
+
+def journal_lines(manager):
+    with open(manager.journal_file, encoding="utf-8") as f:
+        return [line for line in f.read().splitlines() if line]
+
+
+def test_journaled_changes_survive_a_crash(open_stats):
+    crashed = open_stats()
+    crashed.update_stats({"victories": 3, "keys_collected": 30})
+    crashed.flush()
+    crashed.update_stats({"victories": 5, "keys_collected": 50})
+    crashed.flush()
+    assert len(journal_lines(crashed)) == 2
+
+    restarted = open_stats()
+
+    assert restarted.get_total_stats()["victories"] == 5
+    assert restarted.get_total_stats()["keys_collected"] == 50
+    assert len(restarted.sessions) == 1
+    # The journal was folded into the snapshot at load
+    assert journal_lines(restarted) == []
+
+
+def test_torn_last_journal_line_is_ignored(open_stats):
+    crashed = open_stats()
+    crashed.update_stats({"victories": 2})
+    crashed.flush()
+    with open(crashed.journal_file, "a", encoding="utf-8") as f:
+        f.write('{"seq": 2, "session": "2026-')
+
+    restarted = open_stats()
+    assert restarted.get_total_stats()["victories"] == 2
+
+    # New events are not glued to the torn record
+    restarted.update_stats({"victories": 1})
+    restarted.flush()
+    assert open_stats().get_total_stats()["victories"] == 3
+
+
+def test_repeated_journal_event_is_applied_once(open_stats):
+    crashed = open_stats()
+    crashed.update_stats({"defeats": 4})
+    crashed.flush()
+    line = journal_lines(crashed)[-1]
+    with open(crashed.journal_file, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+    assert open_stats().get_total_stats()["defeats"] == 4
+
+
+def test_journal_is_compacted_into_the_snapshot(open_stats):
+    stats = open_stats(compact_every=2)
+    for victories in (1, 2, 3):
+        stats.update_stats({"victories": victories})
+        stats.flush()
+
+    with open(stats.stats_file, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    assert snapshot["journal_seq"] == 2
+    assert snapshot["history"][-1]["stats"]["victories"] == 2
+    assert [json.loads(line)["seq"] for line in journal_lines(stats)] == [3]
+
+    assert open_stats().get_total_stats()["victories"] == 3
+
+
+def test_change_after_last_event_is_not_counted_twice(open_stats):
+    stats = open_stats()
+    stats.update_stats({"victories": 1})
+    stats.flush()
+    # Changed after the last event but before the compaction
+    stats.update_stats({"victories": 2})
+    stats._write_snapshot(stats._snapshot_data())
+    stats.flush()
+
+    assert open_stats().get_total_stats()["victories"] == 2
+
+
+def test_save_without_journal_leaves_no_pending_events(open_stats):
+    stats = open_stats()
+    stats.update_stats({"battles_started": 7})
+    assert stats.save_stats()
+
+    assert os.path.getsize(stats.journal_file) == 0
+    assert open_stats().get_total_stats()["battles_started"] == 7
+
+
+def test_writer_journals_updates_after_the_delay(open_stats):
+    stats = open_stats(write_delay=0.05)
+    stats.update_stats({"victories": 1})
+    stats.update_stats({"victories": 2})
+
+    stats._writer.join(0.5)
+    # Both updates of the window went into one event
+    assert [json.loads(line)["delta"] for line in journal_lines(stats)] == [{"victories": 2}]
+
+
+def test_close_flushes_pending_updates(open_stats):
+    stats = open_stats()
+    stats.update_stats({"keys_collected": 12})
+    assert stats.close()
+    assert not stats._writer.is_alive()
+
+    assert open_stats().get_total_stats()["keys_collected"] == 12
+
+
+def test_second_close_does_not_rewrite_the_snapshot(open_stats):
+    stats = open_stats()
+    stats.update_stats({"victories": 1})
+    stats.close()
+    modified = os.stat(stats.stats_file).st_mtime_ns
+
+    assert stats.close()
+    assert os.stat(stats.stats_file).st_mtime_ns == modified
+
+
+def write_snapshot(directory, days, count=300, seed=1):
+    """Snapshot with sessions that ended within the last `days` days."""
+    rng = random.Random(seed)
+    now = datetime.datetime.now()
+    history = []
+    for _ in range(count):
+        end = now - datetime.timedelta(seconds=rng.uniform(60, days * 86400))
+        duration = rng.uniform(60, 7200)
+        history.append({
+            "start_time": (end - datetime.timedelta(seconds=duration)).isoformat(),
+            "end_time": end.isoformat(),
+            "duration_seconds": duration,
+            "stats": {"battles_started": rng.randint(0, 40), "victories": rng.randint(0, 20),
+                      "defeats": rng.randint(0, 20), "connection_losses": rng.randint(0, 3),
+                      "errors": rng.randint(0, 2), "keys_collected": rng.randint(0, 300)},
+        })
+    history.sort(key=lambda record: record["end_time"])
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "bot_stats.json"), "w", encoding="utf-8") as f:
+        json.dump({"history": history, "journal_seq": 0}, f)
+
+
+def comparable(period_stats):
+    return {key: value for key, value in period_stats.items() if key not in ("total_duration_hours",
+                                                                             "battles_per_hour", "keys_per_hour")}
+
+
+def test_archiving_keeps_aggregates(tmp_path):
+    for name in ("raw", "archived"):
+        write_snapshot(str(tmp_path / name), days=200)
+
+    raw = StatsManager(str(tmp_path / "raw"), raw_days=0)
+    archived = StatsManager(str(tmp_path / "archived"), raw_days=40, daily_days=60)
+    try:
+        assert len(archived.sessions) < len(raw.sessions)
+        assert {summary["summary"] for summary in archived.archive_summaries} == {"day", "month"}
+
+        # Periods shorter than raw_days only see individual sessions
+        assert archived.get_total_stats() == raw.get_total_stats()
+        assert archived.get_daily_stats(7) == raw.get_daily_stats(7)
+        for period in ("day", "week", "month", "all"):
+            expected = raw.get_stats_by_period(period)
+            actual = archived.get_stats_by_period(period)
+            assert comparable(actual) == comparable(expected)
+            assert actual["total_duration_hours"] == pytest.approx(expected["total_duration_hours"], abs=1e-3)
+
+        # The archive is read back on the next start
+        reloaded = StatsManager(str(tmp_path / "archived"), raw_days=40, daily_days=60)
+        assert reloaded.get_total_stats() == raw.get_total_stats()
+        assert reloaded.get_stats_by_period("all")["record_count"] == 300
+        reloaded.close()
+    finally:
+        raw.close()
+        archived.close()